@@ -1,33 +1,160 @@
 """Common dependencies for API routes."""
-from fastapi import Depends, HTTPException
+import secrets
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.core.security import oauth2_scheme
 from app.models.user import UserEx
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> UserEx:
-    """Get current authenticated user from JWT token."""
-    credentials_exception = HTTPException(
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as most routes need it: who, and which company."""
+    id: Optional[int]
+    email: str
+    company_id: Optional[str]
+
+
+# Token subject (email) -> Principal
+_principal_cache = TTLCache(settings.AUTH_PRINCIPAL_CACHE_SIZE, settings.AUTH_PRINCIPAL_CACHE_TTL)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Claims of a valid access token, or None."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(UserEx).filter(UserEx.email == username).first()
+        return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+
+def _cached_principal(payload: dict) -> Optional[Principal]:
+    principal = _principal_cache.get(payload["sub"])
+    # A token issued after a company change carries the new company; trust
+    # it over an entry cached before the change (possibly on another worker)
+    if principal is not None and ("cid" not in payload or payload["cid"] == principal.company_id):
+        return principal
+    return None
+
+
+def _cache_principal(row) -> Optional[Principal]:
+    if row is None:
+        return None
+    principal = Principal(id=row.id, email=row.email, company_id=row.company_id)
+    _principal_cache.set(row.email, principal)
+    return principal
+
+
+def _principal_query(email: str):
+    return select(UserEx.id, UserEx.email, UserEx.company_id).where(UserEx.email == email)
+
+
+def resolve_principal(payload: dict, db: Session) -> Optional[Principal]:
+    """Look up the token's user, through the principal cache."""
+    principal = _cached_principal(payload)
+    if principal is not None:
+        return principal
+    return _cache_principal(db.execute(_principal_query(payload["sub"])).first())
+
+
+async def resolve_principal_async(payload: dict, db: AsyncSession) -> Optional[Principal]:
+    """resolve_principal for an async session."""
+    principal = _cached_principal(payload)
+    if principal is not None:
+        return principal
+    return _cache_principal((await db.execute(_principal_query(payload["sub"]))).first())
+
+
+def invalidate_principal(email: str) -> None:
+    """Forget a cached principal; call after changing the user's row or team membership."""
+    _principal_cache.invalidate(email)
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Authenticated principal, checked against the users table (cached for a short TTL)."""
+    payload = decode_token(token)
+    principal = await resolve_principal_async(payload, db) if payload else None
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+async def get_claims_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Authenticated principal for read-only routes.
+
+    With AUTH_TRUST_TOKEN_CLAIMS on, the signed uid/cid claims are used as
+    they are and no lookup happens; a company change then shows up when the
+    user gets a new token (accepting an invitation returns one) or the old
+    one expires. Otherwise the same as get_current_principal.
+    """
+    payload = decode_token(token)
+    if payload is None:
+        raise _credentials_exception()
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and "cid" in payload:
+        return Principal(id=payload.get("uid"), email=payload["sub"], company_id=payload["cid"])
+    principal = await resolve_principal_async(payload, db)
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> UserEx:
+    """Get current authenticated user from JWT token.
+
+    Loads the full row; routes that only need the user's id, email or
+    company should depend on get_current_principal instead.
+    """
+    user = authenticate_token(token, db)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
+
+
+def authenticate_token(token: str, db: Session) -> Optional[UserEx]:
+    """Resolve a JWT access token to its user, or None if invalid."""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return db.query(UserEx).filter(UserEx.email == payload["sub"]).first()
+
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)) -> None:
+    """Guard for metrics routes: the X-Metrics-Token must match METRICS_TOKEN.
+
+    Without a configured token the routes are closed, except with DEBUG on
+    for local development.
+    """
+    if not settings.METRICS_TOKEN:
+        if settings.DEBUG:
+            return
+        raise HTTPException(status_code=403, detail="Metrics are disabled")
+    if x_metrics_token is None or not secrets.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid metrics token")
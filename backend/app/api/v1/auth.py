@@ -4,40 +4,42 @@ import uuid
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.database import get_async_db
+from app.core.security import password_hasher, create_access_token, user_token_claims
 from app.models.user import UserEx
 from app.models.company import CompanyEx
 from app.models.team import TeamMemberEx
 from app.schemas.user import UserCreate, Token
+from app.services.company_service import store_company_score
 
 router = APIRouter()
 
 
 @router.post("/signup")
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user - stores pending registration until email verification."""
     # Check if user already exists
-    existing_user = db.query(UserEx).filter(UserEx.email == user.email).first()
+    existing_user = (await db.scalars(select(UserEx.id).where(UserEx.email == user.email))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Check if there's already a pending registration
     from app.models.pending_user import PendingUserEx
-    existing_pending = db.query(PendingUserEx).filter(PendingUserEx.email == user.email).first()
+    existing_pending = (await db.scalars(select(PendingUserEx).where(PendingUserEx.email == user.email))).first()
     if existing_pending:
         # Delete old pending registration
-        db.delete(existing_pending)
-        db.commit()
+        await db.delete(existing_pending)
+        await db.commit()
     
     # Create pending registration
     from datetime import datetime, timedelta
     import secrets
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     verification_token = secrets.token_urlsafe(32)
     
     pending_user = PendingUserEx(
@@ -51,23 +53,22 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(pending_user)
-    db.commit()
-    db.refresh(pending_user)
     
-    # Send verification email
+    # Queue verification email; it goes out with this commit
     from app.services.email_service import email_service
+    from app.services.email_outbox import email_outbox
     
     base_url = settings.FRONTEND_URL
     verification_link = f"{base_url}/verify-email?token={verification_token}"
     
-    email_sent = email_service.send_verification_email(
+    email_service.queue_verification_email(
+        db,
         to_email=user.email,
         to_name=user.full_name,
         verification_link=verification_link
     )
-    
-    if not email_sent:
-        print(f"Warning: Failed to send verification email to {user.email}")
+    await db.commit()
+    email_outbox.notify()
     
     return {
         "message": "회원가입 요청이 접수되었습니다. 이메일을 확인하여 계정을 활성화해주세요.",
@@ -77,14 +78,16 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Login and get access token."""
-    user = db.query(UserEx).filter(UserEx.email == form_data.username).first()
+    user = (await db.scalars(select(UserEx).where(UserEx.email == form_data.username))).first()
     
     # If user not found in verified users, check pending
     if not user:
         from app.models.pending_user import PendingUserEx
-        pending = db.query(PendingUserEx).filter(PendingUserEx.email == form_data.username).first()
+        pending = (await db.scalars(
+            select(PendingUserEx.id).where(PendingUserEx.email == form_data.username)
+        )).first()
         if pending:
             raise HTTPException(
                 status_code=401,
@@ -92,32 +95,40 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await password_hasher.verify(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash predates the current Argon2 parameters
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     # No need to check email_verified - only verified users exist in DB
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=user_token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/verify-email")
-def verify_email(token: str, db: Session = Depends(get_db)):
+async def verify_email(token: str, db: AsyncSession = Depends(get_async_db)):
     """Verify email address and create actual user account."""
     from app.models.pending_user import PendingUserEx
     from datetime import datetime
     
     # Find pending registration
-    pending_user = db.query(PendingUserEx).filter(
-        PendingUserEx.verification_token == token
-    ).first()
+    pending_user = (await db.scalars(
+        select(PendingUserEx).where(PendingUserEx.verification_token == token)
+    )).first()
     
     if not pending_user:
         raise HTTPException(
@@ -127,18 +138,18 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     
     # Check if expired (24 hours)
     if datetime.utcnow() > pending_user.expires_at:
-        db.delete(pending_user)
-        db.commit()
+        await db.delete(pending_user)
+        await db.commit()
         raise HTTPException(
             status_code=410,
             detail="Verification link has expired. Please sign up again."
         )
     
     # Check if user already exists (shouldn't happen, but just in case)
-    existing_user = db.query(UserEx).filter(UserEx.email == pending_user.email).first()
+    existing_user = (await db.scalars(select(UserEx.id).where(UserEx.email == pending_user.email))).first()
     if existing_user:
-        db.delete(pending_user)
-        db.commit()
+        await db.delete(pending_user)
+        await db.commit()
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
@@ -154,8 +165,11 @@ def verify_email(token: str, db: Session = Depends(get_db)):
         founded_date=datetime.now().strftime("%Y-%m-%d"),
         sector="IT/Software",
         address="Seoul, Korea",
-        ceo=pending_user.full_name
+        ceo=pending_user.full_name,
+        financials=[],
+        projects=[]
     )
+    store_company_score(db_company)
     db.add(db_company)
     
     # 2. Create User (already verified)
@@ -180,9 +194,9 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     db.add(db_member)
     
     # 4. Delete pending registration
-    db.delete(pending_user)
+    await db.delete(pending_user)
     
-    db.commit()
+    await db.commit()
     
     return {
         "message": "이메일 인증이 완료되었습니다! 계정이 생성되었으며 이제 로그인할 수 있습니다.",
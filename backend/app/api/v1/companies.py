@@ -1,10 +1,10 @@
 """Company routes."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import UserEx
+from app.core.database import get_async_db, get_async_read_db, get_db
+from app.api.deps import Principal, get_claims_principal, get_current_principal
 from app.models.company import CompanyEx
 from app.schemas.company import (
     CompanyCreate, 
@@ -13,48 +13,62 @@ from app.schemas.company import (
     FinancialCreate, 
     FinancialBase,
     ProjectCreate,
-    ProjectBase
+    ProjectBase,
+    SectorBenchmarkResponse,
+    ImportResult
 )
-from app.services.company_service import calculate_company_score
+from app.services.benchmark_service import company_benchmark, update_sector_benchmarks
+from app.services.company_service import company_response, get_company_async, rescore_company, store_company_score
 
 router = APIRouter()
 
 
+def _refresh_company(db: Session, company_id: str) -> CompanyEx:
+    """Rescore a changed company and update its sector benchmarks; the caller commits."""
+    db_company = rescore_company(db, company_id)
+    update_sector_benchmarks(db, db_company)
+    return db_company
+
+
 @router.post("/", response_model=CompanyResponse)
-def create_company(company: CompanyCreate, db: Session = Depends(get_db)):
+async def create_company(company: CompanyCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new company."""
-    db_company = CompanyEx(**company.dict())
+    # Empty collections are loaded ones, so the response needs no lazy load
+    db_company = CompanyEx(**company.dict(), financials=[], projects=[])
+    store_company_score(db_company)
     try:
         db.add(db_company)
-        db.commit()
-        db.refresh(db_company)
-    except Exception as e:
-        db.rollback()
+        await db.commit()
+    except Exception:
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Company might already exist")
-    return db_company
+    return company_response(db_company)
 
 
 @router.get("/me", response_model=CompanyResponse)
-def read_my_company(current_user: UserEx = Depends(get_current_user), db: Session = Depends(get_db)):
+async def read_my_company(
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
     """Get current user's company information."""
     if not current_user.company_id:
         raise HTTPException(status_code=404, detail="No company associated with user")
     
-    db_company = db.query(CompanyEx).filter(CompanyEx.id == current_user.company_id).first()
+    db_company = await get_company_async(db, current_user.company_id)
     if not db_company:
         raise HTTPException(status_code=404, detail="Company not found")
         
-    return calculate_company_score(db_company)
+    return company_response(db_company)
 
 
 @router.put("/me", response_model=CompanyResponse)
-def update_my_company(
+async def update_my_company(
     company_update: CompanyUpdate, 
-    current_user: UserEx = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user's company information."""
-    db_company = db.query(CompanyEx).filter(CompanyEx.id == current_user.company_id).first()
+    db_company = await db.get(CompanyEx, current_user.company_id)
     if not db_company:
         raise HTTPException(status_code=404, detail="Company not found")
     
@@ -62,48 +76,106 @@ def update_my_company(
     for key, value in update_data.items():
         setattr(db_company, key, value)
     
-    db.commit()
-    db.refresh(db_company)
-    return calculate_company_score(db_company)
+    db_company = await db.run_sync(_refresh_company, current_user.company_id)
+    await db.commit()
+    return company_response(db_company)
 
 
 @router.post("/me/financials", response_model=FinancialBase)
-def add_financial(
+async def add_financial(
     financial: FinancialCreate, 
-    current_user: UserEx = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add financial data to current user's company."""
     from app.models.company import FinancialEx
     
     db_financial = FinancialEx(**financial.dict(), company_id=current_user.company_id)
     db.add(db_financial)
-    db.commit()
-    db.refresh(db_financial)
+    await db.run_sync(_refresh_company, current_user.company_id)
+    await db.commit()
     return db_financial
 
 
 @router.post("/me/projects", response_model=ProjectBase)
-def add_project(
+async def add_project(
     project: ProjectCreate, 
-    current_user: UserEx = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add project history to current user's company."""
     from app.models.company import ProjectHistoryEx
     
     db_project = ProjectHistoryEx(**project.dict(), company_id=current_user.company_id)
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
+    await db.run_sync(_refresh_company, current_user.company_id)
+    await db.commit()
     return db_project
 
 
+# The imports stay sync handlers on the sync session: parsing the file is
+# blocking, CPU-bound work that belongs on the threadpool, not the event loop
+def _import_file(file: UploadFile, schema, model, company_id: str, db: Session) -> dict:
+    """Import an uploaded CSV/XLSX file of rows, then refresh the company's score and benchmarks."""
+    from app.services.import_service import ImportFormatError, detect_format, import_rows, iter_rows
+    
+    try:
+        file_format = detect_format(file.filename, file.content_type)
+        result = import_rows(db, iter_rows(file.file, file_format), schema, model, company_id)
+    except ImportFormatError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if result["imported"]:
+        _refresh_company(db, company_id)
+    db.commit()
+    return result
+
+
+@router.post("/me/financials/import", response_model=ImportResult)
+def import_financials(
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Import financial data from a CSV or XLSX file (one row per year, FinancialCreate columns)."""
+    from app.models.company import FinancialEx
+    
+    return _import_file(file, FinancialCreate, FinancialEx, current_user.company_id, db)
+
+
+@router.post("/me/projects/import", response_model=ImportResult)
+def import_projects(
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Import project history from a CSV or XLSX file (ProjectCreate columns)."""
+    from app.models.company import ProjectHistoryEx
+    
+    return _import_file(file, ProjectCreate, ProjectHistoryEx, current_user.company_id, db)
+
+
+@router.get("/me/benchmark", response_model=SectorBenchmarkResponse)
+async def read_my_benchmark(
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Current user's company against its sector peers, per metric."""
+    if not current_user.company_id:
+        raise HTTPException(status_code=404, detail="No company associated with user")
+    
+    benchmark = await db.run_sync(company_benchmark, current_user.company_id)
+    if benchmark is None:
+        raise HTTPException(status_code=404, detail="No financial or project data to benchmark yet")
+    return benchmark
+
+
 @router.get("/{company_id}", response_model=CompanyResponse)
-def read_company(company_id: str, db: Session = Depends(get_db)):
+async def read_company(company_id: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get company by ID."""
-    db_company = db.query(CompanyEx).filter(CompanyEx.id == company_id).first()
+    db_company = await get_company_async(db, company_id)
     if db_company is None:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    return calculate_company_score(db_company)
+    return company_response(db_company)
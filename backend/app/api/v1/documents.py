@@ -1,83 +1,283 @@
 """Document routes."""
-from typing import List
+from typing import List, Optional
 import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.core.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import UserEx
+from app.core.database import get_async_db, get_async_read_db, get_read_db
+from app.api.deps import Principal, get_claims_principal, get_current_principal
 from app.models.document import DocumentEx
-from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse
+from app.schemas.document import (
+    DocumentCreate,
+    DocumentUpdate,
+    DocumentPatch,
+    DocumentPatchResponse,
+    DocumentResponse,
+    DocumentListItem,
+    DocumentSearchHit,
+    DocumentRevisionInfo,
+    DocumentRevisionResponse,
+    DocumentDiffResponse,
+)
+from app.services.document_service import set_document_content, encode_cursor, decode_cursor
+from app.services.search_service import index_document, search_documents
+from app.services.revision_service import record_revision, list_revisions, get_revision
+from app.services.text_delta import DeltaError, apply_ops, apply_unified_diff, unified_diff
 
 router = APIRouter()
 
 
 @router.post("/", response_model=DocumentResponse)
 @router.post("", response_model=DocumentResponse, include_in_schema=False)
-def create_document(
+async def create_document(
     doc: DocumentCreate,
-    current_user: UserEx = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new document."""
     now = datetime.datetime.now().isoformat()
     db_doc = DocumentEx(
         title=doc.title, 
-        content=doc.content, 
         company_id=current_user.company_id,
-        created_at=now
+        created_at=now,
+        revision=1
     )
+    set_document_content(db_doc, doc.content)
     db.add(db_doc)
-    db.commit()
-    db.refresh(db_doc)
+    await db.flush()
+    await db.run_sync(_record_save, db_doc, None, current_user.email)
+    await db.commit()
     return db_doc
 
 
-@router.get("/", response_model=List[DocumentResponse])
-@router.get("", response_model=List[DocumentResponse], include_in_schema=False)
-def get_documents(current_user: UserEx = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all documents for current user's company."""
-    return db.query(DocumentEx).filter(DocumentEx.company_id == current_user.company_id).all()
+@router.get("/", response_model=List[DocumentListItem])
+@router.get("", response_model=List[DocumentListItem], include_in_schema=False)
+async def get_documents(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """List document summaries for current user's company, newest first.
+    
+    Pass the X-Next-Cursor response header back as ``cursor`` to get the next page.
+    """
+    query = select(DocumentEx).where(DocumentEx.company_id == current_user.company_id)
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        created_at, last_id = position
+        query = query.where(or_(
+            DocumentEx.created_at < created_at,
+            and_(DocumentEx.created_at == created_at, DocumentEx.id < last_id)
+        ))
+    
+    docs = (await db.scalars(
+        query.order_by(DocumentEx.created_at.desc(), DocumentEx.id.desc()).limit(limit + 1)
+    )).all()
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1].created_at, docs[-1].id)
+    return docs
+
+
+@router.get("/search", response_model=List[DocumentSearchHit])
+def search_company_documents(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_claims_principal),
+    db: Session = Depends(get_read_db)
+):
+    """Full-text search over the company's document titles and content.
+
+    A sync route, so it runs in the threadpool: building and scoring the
+    in-memory index is CPU work that would otherwise stall the event loop.
+    """
+    hits = search_documents(db, current_user.company_id, q, limit)
+    return [
+        DocumentSearchHit(id=h.document_id, title=h.title, created_at=h.created_at, score=h.score, snippet=h.snippet)
+        for h in hits
+    ]
 
 
 @router.get("/{doc_id}", response_model=DocumentResponse)
-def get_document(
+async def get_document(
     doc_id: int,
-    current_user: UserEx = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get a specific document."""
-    doc = db.query(DocumentEx).filter(
+    return await _get_company_document(db, doc_id, current_user.company_id, with_content=True)
+
+
+async def _get_company_document(
+    db: AsyncSession, doc_id: int, company_id: str, with_content: bool = False
+) -> DocumentEx:
+    """Load a document owned by the company or raise 404."""
+    query = select(DocumentEx).where(
         DocumentEx.id == doc_id,
-        DocumentEx.company_id == current_user.company_id
-    ).first()
+        DocumentEx.company_id == company_id
+    )
+    if with_content:
+        # Deferred content cannot be lazy-loaded on an async session
+        query = query.options(undefer(DocumentEx.content))
+    doc = (await db.scalars(query)).first()
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     return doc
 
 
+def _record_save(db: Session, doc: DocumentEx, previous_content: Optional[str], author: str) -> None:
+    """Record the saved revision and reindex the document; the caller commits."""
+    record_revision(db, doc, previous_content, author=author)
+    index_document(db, doc)
+
+
 @router.put("/{doc_id}", response_model=DocumentResponse)
-def update_document(
+async def update_document(
     doc_id: int,
     doc_update: DocumentUpdate,
-    current_user: UserEx = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a document."""
-    db_doc = db.query(DocumentEx).filter(
-        DocumentEx.id == doc_id,
-        DocumentEx.company_id == current_user.company_id
-    ).first()
-    if not db_doc:
-        raise HTTPException(status_code=404, detail="Document not found")
+    db_doc = await _get_company_document(db, doc_id, current_user.company_id, with_content=True)
     
+    previous_title = db_doc.title
+    previous_content = db_doc.content or ""
     if doc_update.title:
         db_doc.title = doc_update.title
     if doc_update.content:
-        db_doc.content = doc_update.content
+        set_document_content(db_doc, doc_update.content)
     
-    db.commit()
-    db.refresh(db_doc)
+    if db_doc.title != previous_title or (db_doc.content or "") != previous_content:
+        await db.run_sync(_record_save, db_doc, previous_content, current_user.email)
+    
+    await _commit_revision(db)
     return db_doc
+
+
+@router.patch("/{doc_id}", response_model=DocumentPatchResponse)
+async def patch_document(
+    doc_id: int,
+    patch: DocumentPatch,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Apply an incremental edit (delta ops or unified diff) to a known revision."""
+    if patch.ops is not None and patch.diff is not None:
+        raise HTTPException(status_code=422, detail="Send either ops or diff, not both")
+    
+    db_doc = await _get_company_document(db, doc_id, current_user.company_id, with_content=True)
+    if db_doc.revision != patch.base_revision:
+        _raise_conflict(patch.base_revision, db_doc.revision)
+    
+    previous_title = db_doc.title
+    previous_content = db_doc.content or ""
+    content = previous_content
+    try:
+        if patch.ops is not None:
+            content = apply_ops(previous_content, patch.ops)
+        elif patch.diff is not None:
+            content = apply_unified_diff(previous_content, patch.diff)
+    except DeltaError as e:
+        raise HTTPException(status_code=400, detail=f"Patch does not apply to revision {db_doc.revision}: {e}")
+    
+    if patch.title:
+        db_doc.title = patch.title
+    if content != previous_content:
+        set_document_content(db_doc, content)
+    
+    if db_doc.title != previous_title or content != previous_content:
+        await db.run_sync(_record_save, db_doc, previous_content, current_user.email)
+        await _commit_revision(db, patch.base_revision)
+    
+    return DocumentPatchResponse(id=db_doc.id, revision=db_doc.revision, size=db_doc.size or 0)
+
+
+def _raise_conflict(base_revision: int, current_revision: Optional[int]):
+    """409 for a save based on an outdated revision."""
+    detail = f"Document was modified since revision {base_revision}"
+    if current_revision is not None:
+        detail += f" (current revision is {current_revision}); fetch it and reapply your changes"
+    raise HTTPException(
+        status_code=409,
+        detail=detail,
+        headers={"X-Document-Revision": str(current_revision)} if current_revision is not None else None
+    )
+
+
+async def _commit_revision(db: AsyncSession, base_revision: Optional[int] = None):
+    """Commit a document save, turning a lost race with another save into 409."""
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        if base_revision is not None:
+            _raise_conflict(base_revision, None)
+        raise HTTPException(status_code=409, detail="Document was modified by another save; reload and try again")
+
+
+@router.get("/{doc_id}/revisions", response_model=List[DocumentRevisionInfo])
+async def get_document_revisions(
+    doc_id: int,
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """List a document's revisions, newest first."""
+    await _get_company_document(db, doc_id, current_user.company_id)
+    return await db.run_sync(list_revisions, doc_id)
+
+
+@router.get("/{doc_id}/revisions/diff", response_model=DocumentDiffResponse)
+async def diff_document_revisions(
+    doc_id: int,
+    from_rev: int,
+    to_rev: int,
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Unified diff between two revisions of a document."""
+    await _get_company_document(db, doc_id, current_user.company_id)
+    old = await db.run_sync(get_revision, doc_id, from_rev)
+    new = await db.run_sync(get_revision, doc_id, to_rev)
+    if old is None or new is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    
+    return DocumentDiffResponse(
+        from_revision=from_rev,
+        to_revision=to_rev,
+        diff=unified_diff(old[1], new[1], f"revision {from_rev}", f"revision {to_rev}")
+    )
+
+
+@router.get("/{doc_id}/revisions/{revision}", response_model=DocumentRevisionResponse)
+async def get_document_revision(
+    doc_id: int,
+    revision: int,
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get a revision's full content, rebuilt from the nearest snapshot."""
+    await _get_company_document(db, doc_id, current_user.company_id)
+    result = await db.run_sync(get_revision, doc_id, revision)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    
+    db_revision, content = result
+    return DocumentRevisionResponse(
+        revision=db_revision.revision,
+        title=db_revision.title,
+        is_snapshot=db_revision.is_snapshot,
+        size=db_revision.size,
+        created_by=db_revision.created_by,
+        created_at=db_revision.created_at,
+        content=content
+    )
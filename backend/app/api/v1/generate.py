@@ -6,11 +6,10 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.core.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import UserEx
-from app.models.company import CompanyEx
+from app.api.deps import Principal, get_current_principal
 from app.models.rd_notice import RDNoticeEx
 from app.schemas.document import GenerateRequest, GenerateResponse
+from app.services.company_service import get_company
 
 router = APIRouter()
 
@@ -23,12 +22,12 @@ class RDProposalRequest(BaseModel):
 @router.post("/rd-proposal", response_model=GenerateResponse)
 def generate_rd_proposal(
     req: RDProposalRequest, 
-    current_user: UserEx = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Generate AI proposal content based on R&D notice and company data."""
     # Get company data
-    company = db.query(CompanyEx).filter(CompanyEx.id == current_user.company_id).first()
+    company = get_company(db, current_user.company_id)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
@@ -44,10 +43,11 @@ def generate_rd_proposal(
     company_name = company.name
     sector = company.sector
     founded_year = company.founded_date.split('-')[0] if company.founded_date else "2020"
-    revenue = company.financials[0].revenue if company.financials else 0
-    debt_ratio = company.financials[0].debt_ratio if company.financials else 0
-    patents_count = 0  # In production, this would query a patents table
-    projects_count = len(company.projects) if company.projects else 0
+    latest_financial = company.latest_financial
+    revenue = latest_financial.revenue if latest_financial else 0
+    debt_ratio = latest_financial.debt_ratio if latest_financial else 0
+    patents_count = company.patents_registered or 0
+    projects_count = len(company.projects)
     
     # Extract R&D notice info
     notice_title = rd_notice.title
@@ -216,7 +216,7 @@ def generate_rd_proposal(
 @router.post("/", response_model=GenerateResponse)
 def generate_proposal(req: GenerateRequest, db: Session = Depends(get_db)):
     """Generate AI proposal content based on company data."""
-    db_company = db.query(CompanyEx).filter(CompanyEx.id == req.company_id).first()
+    db_company = get_company(db, req.company_id)
     if not db_company:
         raise HTTPException(status_code=404, detail="Company not found")
 
@@ -227,8 +227,8 @@ def generate_proposal(req: GenerateRequest, db: Session = Depends(get_db)):
     company_name = db_company.name
     sector = db_company.sector
     revenue = 0
-    if db_company.financials:
-        revenue = db_company.financials[0].revenue
+    if db_company.latest_financial:
+        revenue = db_company.latest_financial.revenue
 
     # Mock LLM Output Generation
     generated_text = f"""
@@ -0,0 +1,14 @@
+"""Process metrics routes."""
+from fastapi import APIRouter, Depends
+
+from app.api.deps import require_metrics_token
+from app.core.metrics import metrics
+from app.core.query_stats import recent_n_plus_one
+
+router = APIRouter()
+
+
+@router.get("/db", dependencies=[Depends(require_metrics_token)])
+async def database_metrics():
+    """Per-request query counts and database time of this worker process, and recent N+1 detections."""
+    return {**metrics.snapshot("db."), "n_plus_one": list(recent_n_plus_one)}
@@ -2,51 +2,50 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.api.deps import get_current_user
-from app.models.user import UserEx
-from app.models.company import CompanyEx
+from app.core.database import get_async_read_db
+from app.api.deps import Principal, get_claims_principal
 from app.schemas.rd_notice import RDNoticeResponse
+from app.services.company_service import get_company_async
 from app.services.rd_service import get_rd_recommendations
 
 router = APIRouter()
 
 
-def _get_recommendations_impl(
-    current_user: UserEx = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def _get_recommendations_impl(
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> List[RDNoticeResponse]:
     """Internal implementation for recommendations."""
     print(f"[DEBUG] Recommendations requested by user: {current_user.email}")
     print(f"[DEBUG] User company_id: {current_user.company_id}")
     
-    company = db.query(CompanyEx).filter(CompanyEx.id == current_user.company_id).first()
+    company = await get_company_async(db, current_user.company_id)
     if not company:
         print("[DEBUG] Company not found!")
         raise HTTPException(status_code=404, detail="Company info not found. Please complete profile.")
     
     print(f"[DEBUG] Found company: {company.name}")
-    recommendations = get_rd_recommendations(company, db)
+    recommendations = await db.run_sync(lambda session: get_rd_recommendations(company, session))
     print(f"[DEBUG] Returning {len(recommendations)} recommendations")
     
     return recommendations
 
 
 @router.get("/", response_model=List[RDNoticeResponse])
-def get_recommendations_with_slash(
-    current_user: UserEx = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_recommendations_with_slash(
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get R&D recommendations (with trailing slash)."""
-    return _get_recommendations_impl(current_user, db)
+    return await _get_recommendations_impl(current_user, db)
 
 
 @router.get("", response_model=List[RDNoticeResponse])
-def get_recommendations_without_slash(
-    current_user: UserEx = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_recommendations_without_slash(
+    current_user: Principal = Depends(get_claims_principal),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get R&D recommendations (without trailing slash)."""
-    return _get_recommendations_impl(current_user, db)
+    return await _get_recommendations_impl(current_user, db)
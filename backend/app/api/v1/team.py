@@ -1,16 +1,22 @@
 """Team member routes."""
+from datetime import timedelta
 from typing import List
 import secrets
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.config import settings
-from app.api.deps import get_current_user
+from app.api.deps import Principal, get_claims_principal, get_current_user, invalidate_principal
+from app.core.security import create_access_token, user_token_claims
 from app.models.user import UserEx
 from app.models.team import TeamMemberEx
-from app.schemas.team import TeamMemberCreate, TeamMemberResponse, InvitationAccept
+from app.schemas.team import (
+    TeamMemberCreate, TeamMemberResponse, InvitationAccept,
+    BulkInviteRequest, BulkInviteResponse, BulkInviteResult,
+)
 
 router = APIRouter()
 
@@ -49,12 +55,15 @@ def invite_member(
         # Resend invitation if pending
         invitation_token = existing_invitation.invitation_token
         db_member = existing_invitation
+        if not db_member.name:
+            db_member.name = invited_user.full_name or member.email
     else:
         # Generate unique invitation token
         invitation_token = secrets.token_urlsafe(32)
         
         db_member = TeamMemberEx(
-            name=invited_user.full_name,
+            # users.full_name is optional; the member list needs a name
+            name=invited_user.full_name or member.email,
             email=member.email,
             role=member.role,
             company_id=current_user.company_id,
@@ -62,11 +71,10 @@ def invite_member(
             invitation_token=invitation_token
         )
         db.add(db_member)
-        db.commit()
-        db.refresh(db_member)
     
-    # Send invitation email
+    # Queue invitation email; it goes out with this commit
     from app.services.email_service import email_service
+    from app.services.email_outbox import email_outbox
     from app.models.company import CompanyEx
     
     company = db.query(CompanyEx).filter(CompanyEx.id == current_user.company_id).first()
@@ -76,21 +84,123 @@ def invite_member(
     base_url = settings.FRONTEND_URL
     invitation_link = f"{base_url}/accept-invite?token={invitation_token}"
     
-    # Send email
-    email_sent = email_service.send_team_invitation(
+    email_service.queue_team_invitation(
+        db,
         to_email=member.email,
-        to_name=invited_user.full_name,
-        inviter_name=current_user.full_name,
+        to_name=invited_user.full_name or member.email,
+        inviter_name=current_user.full_name or current_user.email,
         company_name=company_name,
         invitation_link=invitation_link
     )
-    
-    if not email_sent:
-        print(f"Warning: Failed to send invitation email to {member.email}")
+    db.commit()
+    db.refresh(db_member)
+    email_outbox.notify()
     
     return db_member
 
 
+@router.post("/invite/bulk", response_model=BulkInviteResponse)
+def invite_members_bulk(
+    request: BulkInviteRequest,
+    current_user: UserEx = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Invite many existing users at once; each email gets its own result.
+
+    Users and existing invitations are looked up in one query each, and the
+    new invitations and their emails are inserted in one transaction.
+    """
+    from app.services.email_service import email_service
+    from app.services.email_outbox import email_outbox
+    from app.models.company import CompanyEx
+    
+    emails = list(dict.fromkeys(item.email for item in request.invitations))
+    users = {
+        user.email: user
+        for user in db.query(UserEx.email, UserEx.full_name, UserEx.company_id).filter(UserEx.email.in_(emails))
+    }
+    existing = {
+        invitation.email: invitation
+        for invitation in db.query(TeamMemberEx).filter(
+            TeamMemberEx.company_id == current_user.company_id,
+            TeamMemberEx.email.in_(emails)
+        )
+    }
+    company_name = db.query(CompanyEx.name).filter(CompanyEx.id == current_user.company_id).scalar() or "회사"
+    base_url = settings.FRONTEND_URL
+    
+    outcomes = []  # (email, status, error detail, invitation token)
+    new_members = []
+    emails_to_queue = []
+    seen = set()
+    for item in request.invitations:
+        if item.email in seen:
+            outcomes.append((item.email, "error", "요청에 중복된 이메일입니다.", None))
+            continue
+        seen.add(item.email)
+        
+        invited_user = users.get(item.email)
+        if invited_user is None:
+            outcomes.append((item.email, "error", "해당 이메일로 가입된 사용자가 없습니다. 먼저 회원가입을 완료해야 합니다.", None))
+            continue
+        if invited_user.company_id:
+            outcomes.append((item.email, "error", "이미 다른 팀에 소속된 사용자입니다.", None))
+            continue
+        
+        invitation = existing.get(item.email)
+        if invitation is not None:
+            if invitation.status == "Active":
+                outcomes.append((item.email, "error", "이미 팀 멤버입니다.", None))
+                continue
+            invitation_token, status = invitation.invitation_token, "resent"
+            if not invitation.name:
+                invitation.name = invited_user.full_name or item.email
+        else:
+            invitation_token, status = secrets.token_urlsafe(32), "invited"
+            new_members.append({
+                # users.full_name is optional; the member list needs a name
+                "name": invited_user.full_name or item.email,
+                "email": item.email,
+                "role": item.role,
+                "company_id": current_user.company_id,
+                "status": "Pending",
+                "invitation_token": invitation_token,
+            })
+        
+        emails_to_queue.append((item.email, *email_service.team_invitation_content(
+            to_name=invited_user.full_name or item.email,
+            inviter_name=current_user.full_name or current_user.email,
+            company_name=company_name,
+            invitation_link=f"{base_url}/accept-invite?token={invitation_token}"
+        )))
+        outcomes.append((item.email, status, None, invitation_token))
+    
+    # Multi-row inserts; the new invitations are read back by token for their ids
+    if new_members:
+        db.execute(insert(TeamMemberEx), new_members)
+    email_service.queue_emails(db, emails_to_queue)
+    invitations = {invitation.invitation_token: invitation for invitation in existing.values()}
+    if new_members:
+        invitations.update(
+            (invitation.invitation_token, invitation)
+            for invitation in db.query(TeamMemberEx).filter(
+                TeamMemberEx.invitation_token.in_([row["invitation_token"] for row in new_members])
+            )
+        )
+    results = [
+        BulkInviteResult(
+            email=email, status=status, detail=detail,
+            member=TeamMemberResponse.model_validate(invitations[token]) if token is not None else None
+        )
+        for email, status, detail, token in outcomes
+    ]
+    db.commit()
+    email_outbox.notify()
+    
+    failed = sum(1 for result in results if result.status == "error")
+    return BulkInviteResponse(results=results, invited=len(results) - failed, failed=failed)
+
+
 @router.post("/accept-invite")
 def accept_invitation(
     invite: InvitationAccept,
@@ -122,12 +232,23 @@ def accept_invitation(
     member.invitation_token = None  # Clear token after use
     
     db.commit()
+    invalidate_principal(current_user.email)
     
-    return {"message": "초대를 성공적으로 수락했습니다.", "email": member.email}
+    # The old token names the previous company; hand out one with the new one
+    access_token = create_access_token(
+        data=user_token_claims(current_user),
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "message": "초대를 성공적으로 수락했습니다.",
+        "email": member.email,
+        "access_token": access_token,
+        "token_type": "bearer",
+    }
 
 
 @router.get("/", response_model=List[TeamMemberResponse])
 @router.get("", response_model=List[TeamMemberResponse], include_in_schema=False)
-def get_team_members(current_user: UserEx = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_team_members(current_user: Principal = Depends(get_claims_principal), db: Session = Depends(get_read_db)):
     """Get all team members for current user's company."""
     return db.query(TeamMemberEx).filter(TeamMemberEx.company_id == current_user.company_id).all()
@@ -1,73 +1,843 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Set, Tuple, Union
+import asyncio
 import json
+import time
+
+from app.api.deps import decode_token, require_metrics_token, resolve_principal
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics, summarize
+from app.models.document import DocumentEx
+from app.services.backplane import Backplane, create_backplane
+from app.services.collab_service import (
+    DocumentState,
+    PersistJob,
+    load_document_state,
+    persist_documents,
+)
+from app.services.text_delta import DeltaError, Op, diff_ops
+
+try:
+    import msgpack
+except ImportError:  # optional: clients fall back to JSON frames
+    msgpack = None
 
 router = APIRouter()
 
-class ConnectionManager:
+# Close codes (4000-4999 are reserved for applications)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_NOT_FOUND = 4404
+CLOSE_TOO_SLOW = 4408
+CLOSE_IDLE = 4410
+# Standard "internal error": a write to the connection failed
+CLOSE_SEND_FAILED = 1011
+
+# Messages a client cannot miss without its text diverging
+EDIT_MESSAGE_TYPES = {"op", "content", "sync", "ack"}
+
+# Subprotocols a client may offer to pick its frame encoding
+SUBPROTOCOL_MSGPACK = "rnd.msgpack"
+SUBPROTOCOL_JSON = "rnd.json"
+
+# Messages where only the latest per sender matters; merged per tick
+COALESCED_TYPES = {"cursor", "presence"}
+
+# Non-edit messages a client may send to the rest of its room. Anything else
+# is dropped: edit, sync and catch-up messages only ever come from the server
+RELAYED_TYPES = COALESCED_TYPES | {"selection", "chat"}
+
+# A flush claimed by a worker that never reports back is taken over after this
+FLUSH_CLAIM_TIMEOUT = 30.0
+
+
+class Frame:
+    """An outbound message, encoded at most once per encoding however many clients get it."""
+
+    __slots__ = ("message", "_encoded")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self._encoded: Dict[str, Union[str, bytes]] = {}
+
+    def encode(self, encoding: str) -> Union[str, bytes]:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "msgpack":
+                data = msgpack.packb(self.message, use_bin_type=True)
+            else:
+                data = json.dumps(self.message, separators=(",", ":"), ensure_ascii=False)
+            self._encoded[encoding] = data
+        return data
+
+
+def negotiate_encoding(websocket: WebSocket) -> Tuple[str, Optional[str]]:
+    """Frame encoding and subprotocol to accept, from the subprotocols the client offered."""
+    offered = websocket.scope.get("subprotocols") or []
+    if SUBPROTOCOL_MSGPACK in offered and msgpack is not None:
+        return "msgpack", SUBPROTOCOL_MSGPACK
+    return "json", SUBPROTOCOL_JSON if SUBPROTOCOL_JSON in offered else None
+
+
+def decode_frame(frame: dict) -> dict:
+    """Message of a received websocket frame, text (JSON) or binary (MessagePack)."""
+    if frame.get("bytes") is not None:
+        if msgpack is None:
+            raise ValueError("Binary frames are not supported")
+        message = msgpack.unpackb(frame["bytes"], raw=False)
+    else:
+        message = json.loads(frame.get("text") or "")
+    if not isinstance(message, dict):
+        raise ValueError("Message must be an object")
+    return message
+
+
+class Client:
+    """One connected editor, with its own outbound queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, room_id: str, user_data: dict, protocol: str, encoding: str = "json"):
+        self.websocket = websocket
+        self.room_id = room_id
+        self.user_data = user_data
+        # "content": receives the full text after every edit (original protocol)
+        # "ops": receives deltas with sequence numbers
+        self.protocol = protocol
+        # "json" text frames or "msgpack" binary frames
+        self.encoding = encoding
+        # Text and sequence number this client was last sent, so its
+        # full-content saves can be turned into a delta
+        self.shadow_text = ""
+        self.shadow_seq = 0
+        # Messages waiting to be written; broadcasts never wait on the network
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.WS_SEND_QUEUE_SIZE))
+        self.sender: Optional[asyncio.Task] = None
+        self.closed = False
+        # Any frame from the client counts, heartbeat pongs included
+        self.last_seen = time.monotonic()
+        # A content client's edit travelling through the backplane; saves
+        # arriving meanwhile are merged into one, the latest winning
+        self.in_flight = False
+        self.pending_content: Optional[dict] = None
+
+
+class RoomLoad:
+    """A room being opened: waits for a peer's snapshot or the database."""
+
     def __init__(self):
+        self.hello_id: Optional[str] = None
+        # Our hello came back: later room events are part of our history
+        self.hello_seen = False
+        self.buffer: List[dict] = []
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class FlushClaim:
+    """A write of the room's text at one point of the shared event order."""
+
+    def __init__(self, event_id: str, origin: str, seq: int, text: str):
+        self.id = event_id
+        self.origin = origin
+        self.seq = seq
+        self.text = text
+        self.started = time.monotonic()
+
+
+class ConnectionManager:
+    """Rooms of connected editors, kept in step with other workers over a backplane.
+
+    Edits are not applied when received: they are published to the
+    backplane and applied when they come back, so every worker applies the
+    same edits in the same order. Cursor and presence messages go straight
+    to local clients and are relayed to other workers.
+    """
+
+    def __init__(self, backplane: Optional[Backplane] = None):
         # Room ID (document_id) -> List of WebSockets
         self.active_connections: Dict[str, Set[WebSocket]] = {}
-        # Track user info per connection for cursors
-        self.user_info: Dict[WebSocket, dict] = {}
-
-    async def connect(self, websocket: WebSocket, room_id: str, user_data: dict):
-        await websocket.accept()
-        if room_id not in self.active_connections:
-            self.active_connections[room_id] = set()
-        self.active_connections[room_id].add(websocket)
-        self.user_info[websocket] = user_data
-        
+        # Per-connection user info and protocol state
+        self.clients: Dict[WebSocket, Client] = {}
+        # Room ID -> authoritative document state
+        self.documents: Dict[str, DocumentState] = {}
+        self.backplane = backplane
+        self._started = False
+        self._loading: Dict[str, RoomLoad] = {}
+        # Edit event ID -> (sending client, content it sent)
+        self._pending_edits: Dict[str, Tuple[Client, Optional[str]]] = {}
+        # Room ID -> flush in progress
+        self._flush_claims: Dict[str, FlushClaim] = {}
+        # Flush event ID -> completion, for flushes this worker asked for
+        self._flush_waiters: Dict[str, asyncio.Future] = {}
+        self._writes: List[Tuple[str, FlushClaim, PersistJob]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Room ID -> (sender, message type) -> latest cursor/presence message
+        self._coalesced: Dict[str, Dict[Tuple[WebSocket, str], dict]] = {}
+        self._coalesce_scheduled = False
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    async def _ensure_backplane(self):
+        if self.backplane is None:
+            self.backplane = create_backplane()
+        if not self._started:
+            self._started = True
+            await self.backplane.start(self._on_events)
+
+    async def get_state(self, room_id: str) -> Optional[DocumentState]:
+        """The room's document state, from a peer worker or the database on first use."""
+        state = self.documents.get(room_id)
+        if state is not None:
+            return state
+        await self._ensure_backplane()
+        load = self._loading.get(room_id)
+        if load is None:
+            load = RoomLoad()
+            self._loading[room_id] = load
+            load.hello_id = self.backplane.publish({"kind": "hello", "room": room_id})
+            self._spawn(self._load_room(room_id, load))
+        return await asyncio.shield(load.ready)
+
+    async def _load_room(self, room_id: str, load: RoomLoad):
+        """Fall back to the database when no peer answers the hello."""
+        try:
+            if self.backplane.shared:
+                try:
+                    await asyncio.wait_for(asyncio.shield(load.ready), settings.WS_BACKPLANE_SNAPSHOT_TIMEOUT)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+            state = await run_in_threadpool(load_document_state, int(room_id))
+            if load.ready.done():
+                return
+            if state is None:
+                del self._loading[room_id]
+                load.ready.set_result(None)
+                return
+            self._install(room_id, load, state)
+        except Exception as e:
+            if not load.ready.done():
+                self._loading.pop(room_id, None)
+                load.ready.set_exception(e)
+
+    def _install(self, room_id: str, load: RoomLoad, state: DocumentState):
+        self.documents[room_id] = state
+        del self._loading[room_id]
+        for event in load.buffer:
+            self._apply_event(room_id, state, event)
+        load.ready.set_result(state)
+        self._ensure_flusher()
+
+    async def connect(self, websocket: WebSocket, room_id: str, user_data: dict, protocol: str = "content",
+                      session: Optional[str] = None, since: Optional[int] = None) -> bool:
+        """Join a room and accept the connection; False if the document does not exist.
+
+        The room's state is read and the connection registered with no await
+        in between: an idle room is dropped only while it has no connections,
+        so it cannot disappear under a joining client. Messages queued while
+        the accept is in flight go out once it completes, after the handshake.
+        """
+        state = self.documents.get(room_id)
+        while state is None:
+            if await self.get_state(room_id) is None:
+                return False
+            # Loaded, but possibly dropped again before this task resumed
+            state = self.documents.get(room_id)
+
+        encoding, subprotocol = negotiate_encoding(websocket)
+        client = Client(websocket, room_id, user_data, protocol, encoding)
+        client.shadow_text, client.shadow_seq = state.text, state.seq
+        self.clients[websocket] = client
+        self.active_connections.setdefault(room_id, set()).add(websocket)
+        metrics.counter("ws.connections_opened").inc()
+        self._send_handshake(client, state, session, since)
+
         # Notify others in the room that a new user joined
-        await self.broadcast(room_id, {
+        self.broadcast(room_id, {
             "type": "presence",
             "action": "join",
             "user": user_data
         }, exclude=websocket)
 
-    def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].remove(websocket)
-            if not self.active_connections[room_id]:
+        try:
+            await websocket.accept(subprotocol=subprotocol)
+        except BaseException:
+            await self.disconnect(websocket)
+            raise
+        if not client.closed:
+            client.sender = asyncio.create_task(self._sender(client))
+            self._ensure_heartbeat()
+        return True
+
+    async def disconnect(self, websocket: WebSocket) -> Optional[dict]:
+        """Forget a connection, tell its room and release the room if it is now empty.
+
+        Safe to call more than once; returns the user info on the first call.
+        """
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            # Never registered, or already gone; make sure no room still lists it
+            for room_id in [room_id for room_id, sockets in self.active_connections.items() if websocket in sockets]:
+                self._remove_connection(room_id, websocket)
+            return None
+        client.closed = True
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+
+        room_id = client.room_id
+        self._remove_connection(room_id, websocket)
+        # A cursor sent after the leave would linger on the other screens
+        pending = self._coalesced.get(room_id)
+        if pending:
+            for key in [key for key in pending if key[0] == websocket]:
+                del pending[key]
+
+        self.broadcast(room_id, {
+            "type": "presence",
+            "action": "leave",
+            "user": client.user_data
+        })
+        await self.release_room(room_id)
+        return client.user_data
+
+    def _remove_connection(self, room_id: str, websocket: WebSocket):
+        connections = self.active_connections.get(room_id)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
                 del self.active_connections[room_id]
-        
-        user_data = self.user_info.pop(websocket, None)
-        return user_data
-
-    async def broadcast(self, room_id: str, message: dict, exclude: WebSocket = None):
-        if room_id in self.active_connections:
-            for connection in self.active_connections[room_id]:
-                if connection != exclude:
-                    try:
-                        await connection.send_json(message)
-                    except:
-                        # Handle broken connections
-                        pass
+
+    def broadcast(self, room_id: str, message: dict, exclude: WebSocket = None):
+        """Queue a message for everyone in the room, on this worker and the others."""
+        self._broadcast_local(room_id, message, exclude)
+        if self.backplane is not None:
+            self.backplane.publish({"kind": "relay", "room": room_id, "message": message})
+
+    def _broadcast_local(self, room_id: str, message: dict, exclude: WebSocket = None):
+        frame = Frame(message)
+        for connection in list(self.active_connections.get(room_id, ())):
+            if connection != exclude:
+                self._enqueue(self.clients[connection], frame)
+
+    def handle_message(self, room_id: str, websocket: WebSocket, message: dict):
+        """Dispatch a message received from a client."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        client.last_seen = time.monotonic()
+        metrics.counter("ws.messages_in").inc()
+        kind = message.get("type")
+        if kind == "pong":
+            return
+        if kind in ("content", "op"):
+            # Edits go through the authoritative document state; never coalesced or dropped
+            self.apply_edit(room_id, websocket, message)
+        elif kind in RELAYED_TYPES:
+            # Broadcast to everyone else in the same document room
+            self.relay(room_id, websocket, message)
+        else:
+            metrics.counter("ws.messages_rejected").inc()
+
+    def relay(self, room_id: str, websocket: WebSocket, message: dict):
+        """Pass a client's non-edit message to the rest of the room.
+
+        Cursor and presence updates are held until the next tick and only
+        the latest one per sender is sent; anything else goes out at once.
+        """
+        if message.get("type") not in COALESCED_TYPES or settings.WS_COALESCE_INTERVAL <= 0:
+            self.broadcast(room_id, message, exclude=websocket)
+            return
+        room = self._coalesced.setdefault(room_id, {})
+        key = (websocket, message["type"])
+        if key in room:
+            metrics.counter("ws.coalesced").inc()
+        room[key] = message
+        if not self._coalesce_scheduled:
+            self._coalesce_scheduled = True
+            asyncio.get_running_loop().call_later(settings.WS_COALESCE_INTERVAL, self._flush_coalesced)
+
+    def _flush_coalesced(self):
+        self._coalesce_scheduled = False
+        pending, self._coalesced = self._coalesced, {}
+        for room_id, messages in pending.items():
+            for (websocket, _), message in messages.items():
+                self.broadcast(room_id, message, exclude=websocket)
+
+    def _enqueue(self, client: Client, frame: Union[Frame, dict]):
+        if client.closed:
+            return
+        if not isinstance(frame, Frame):
+            frame = Frame(frame)
+        try:
+            client.queue.put_nowait((frame, time.monotonic()))
+        except asyncio.QueueFull:
+            self._overflow(client, frame)
+
+    def _overflow(self, client: Client, frame: Frame):
+        """Handle a client that cannot keep up with its room."""
+        if settings.WS_OVERFLOW_POLICY == "disconnect":
+            client.closed = True
+            metrics.counter("ws.evicted_slow").inc()
+            self._spawn(self._evict(client, CLOSE_TOO_SLOW))
+        elif frame.message.get("type") in EDIT_MESSAGE_TYPES:
+            # Edits cannot be skipped: replace the backlog with the current text
+            metrics.counter("ws.dropped").inc(client.queue.qsize())
+            metrics.counter("ws.resyncs").inc()
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            state = self.documents.get(client.room_id)
+            if state is not None:
+                self._send_state(client, state)
+        else:
+            # Cursor and presence updates are dropped; later ones supersede them
+            metrics.counter("ws.dropped").inc()
+
+    async def _sender(self, client: Client):
+        """Write one connection's queued messages; a failed send closes and removes it."""
+        sent = metrics.counter("ws.messages_out")
+        latency = metrics.histogram("ws.send_latency_ms")
+        try:
+            while True:
+                frame, queued_at = await client.queue.get()
+                data = frame.encode(client.encoding)
+                if isinstance(data, bytes):
+                    await client.websocket.send_bytes(data)
+                else:
+                    await client.websocket.send_text(data)
+                sent.inc()
+                # Time from queueing to written, as seen by the recipient
+                latency.observe((time.monotonic() - queued_at) * 1000)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            metrics.counter("ws.send_failures").inc()
+            client.closed = True
+            # Closing ends the route's receive loop too, so the socket is not left open
+            await self._evict(client, CLOSE_SEND_FAILED)
+
+    async def _evict(self, client: Client, code: int):
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        try:
+            await client.websocket.close(code=code)
+        except Exception:
+            pass
+        await self.disconnect(client.websocket)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def apply_edit(self, room_id: str, websocket: WebSocket, message: dict):
+        """Publish a client's edit; it is merged into the room state when it comes back."""
+        state = self.documents[room_id]
+        client = self.clients[websocket]
+        content = None
+        try:
+            if message.get("type") == "op":
+                ops = message.get("ops") or []
+                base_seq = int(message.get("base_seq", state.seq))
+            else:
+                content = message.get("content")
+                if not isinstance(content, str):
+                    raise DeltaError("content must be a string")
+                if client.in_flight:
+                    client.pending_content = message
+                    return
+                ops = diff_ops(client.shadow_text, content)
+                base_seq = client.shadow_seq
+        except (DeltaError, TypeError, ValueError) as e:
+            # The client diverged from the server; replace its text
+            self._send_state(client, state, error=str(e))
+            return
+
+        event_id = self.backplane.publish({
+            "kind": "edit",
+            "room": room_id,
+            "ops": ops,
+            "base_seq": base_seq,
+            "author": client.user_data.get("email"),
+            "user": message.get("user"),
+        })
+        self._pending_edits[event_id] = (client, content)
+        client.in_flight = content is not None
+
+    def broadcast_edit(self, room_id: str, state: DocumentState, ops: List[Op], user: Optional[dict] = None,
+                       exclude: WebSocket = None):
+        """Queue an applied edit for local clients: deltas to ops clients, full text to the rest."""
+        op_message = Frame({"type": "op", "seq": state.seq, "ops": ops, "user": user})
+        content_message = Frame({"type": "content", "seq": state.seq, "content": state.text, "user": user})
+        for connection in list(self.active_connections.get(room_id, ())):
+            if connection == exclude:
+                continue
+            client = self.clients[connection]
+            if client.protocol == "ops":
+                self._enqueue(client, op_message)
+            else:
+                client.shadow_text, client.shadow_seq = state.text, state.seq
+                self._enqueue(client, content_message)
+
+    def _send_handshake(self, client: Client, state: DocumentState, session: Optional[str], since: Optional[int]):
+        """First message of a connection: what the client missed, or the whole text.
+
+        An ops client reconnecting with the room's session and its last seq
+        gets only the operations after it ("catchup"), as long as the room's
+        log still reaches back and they are smaller than the text. Everyone
+        else gets the current text ("sync", or "content" for content clients).
+        Later edits follow on the same queue, so nothing falls in between.
+        """
+        if client.protocol == "ops" and session == state.session and since is not None:
+            missed = state.ops_since(since)
+            if missed is not None and _ops_size(missed) < len(state.text):
+                client.shadow_text, client.shadow_seq = state.text, state.seq
+                self._enqueue(client, {
+                    "type": "catchup",
+                    "session": state.session,
+                    "seq": state.seq,
+                    "ops": [{"seq": seq, "ops": ops} for seq, ops in missed],
+                })
+                return
+        self._send_state(client, state)
+
+    def _send_state(self, client: Client, state: DocumentState, error: Optional[str] = None):
+        """Replace a client's copy with the authoritative text."""
+        message = {
+            "type": "sync" if client.protocol == "ops" else "content",
+            "session": state.session,
+            "seq": state.seq,
+            "content": state.text,
+        }
+        if error:
+            message["error"] = error
+        client.shadow_text, client.shadow_seq = state.text, state.seq
+        self._enqueue(client, message)
+
+    # Backplane events, handled in the same order on every worker
+
+    def _on_events(self, events: List[dict]):
+        for event in events:
+            try:
+                self._on_event(event)
+            except Exception as e:
+                print(f"[ERROR] Failed to handle {event.get('kind')} event: {e}")
+        if self._writes:
+            writes, self._writes = self._writes, []
+            self._spawn(self._write(writes))
+
+    def _on_event(self, event: dict):
+        kind, room_id = event["kind"], event["room"]
+        own = self.backplane.is_own(event)
+        if kind == "relay":
+            # Delivered locally when sent
+            if not own:
+                self._broadcast_local(room_id, event["message"])
+            return
+
+        state = self.documents.get(room_id)
+        if kind == "hello":
+            if own and room_id in self._loading:
+                self._loading[room_id].hello_seen = True
+            elif not own and state is not None:
+                claim = self._flush_claims.get(room_id)
+                self.backplane.publish({
+                    "kind": "snapshot",
+                    "room": room_id,
+                    "to": event["origin"],
+                    "hello": event["id"],
+                    "state": state.to_snapshot(),
+                    "claim": claim and {"id": claim.id, "origin": claim.origin, "seq": claim.seq, "text": claim.text},
+                })
+            return
+
+        if kind == "snapshot":
+            load = self._loading.get(room_id)
+            if event["to"] == self.backplane.worker_id and load is not None and load.hello_id == event["hello"] \
+                    and not load.ready.done():
+                claim = event.get("claim")
+                if claim:
+                    self._flush_claims[room_id] = FlushClaim(claim["id"], claim["origin"], claim["seq"], claim["text"])
+                self._install(room_id, load, DocumentState.from_snapshot(event["state"]))
+            return
+
+        if state is not None:
+            self._apply_event(room_id, state, event)
+        else:
+            load = self._loading.get(room_id)
+            if load is not None and load.hello_seen:
+                load.buffer.append(event)
+
+    def _apply_event(self, room_id: str, state: DocumentState, event: dict):
+        kind = event["kind"]
+        if kind == "edit":
+            self._on_edit(room_id, state, event)
+        elif kind == "flush":
+            self._on_flush(room_id, state, event)
+        elif kind == "persisted":
+            self._on_persisted(room_id, state, event)
+
+    def _on_edit(self, room_id: str, state: DocumentState, event: dict):
+        client, content = self._pending_edits.pop(event["id"], (None, None))
+        if client is not None and client.closed:
+            client = None
+        try:
+            ops = state.apply(event["ops"], event["base_seq"], event.get("author"))
+        except (DeltaError, TypeError, ValueError) as e:
+            metrics.counter("collab.edits_rejected").inc()
+            if client is not None:
+                # The client diverged from the room; replace its text
+                self._send_state(client, state, error=str(e))
+                self._edit_done(client)
+            return
+
+        metrics.counter("collab.edits_applied").inc()
+        exclude = None
+        if client is not None:
+            exclude = client.websocket
+            if client.protocol == "ops":
+                self._enqueue(client, {"type": "ack", "seq": state.seq})
+            elif state.text != content:
+                # Merged with concurrent edits: the sender needs the result
+                self._send_state(client, state)
+            client.shadow_text, client.shadow_seq = state.text, state.seq
+        self.broadcast_edit(room_id, state, ops, user=event.get("user"), exclude=exclude)
+        if client is not None:
+            self._edit_done(client)
+
+    def _edit_done(self, client: Client):
+        client.in_flight = False
+        message, client.pending_content = client.pending_content, None
+        if message is not None and not client.closed:
+            self.apply_edit(client.room_id, client.websocket, message)
+
+    def _on_flush(self, room_id: str, state: DocumentState, event: dict):
+        """Claim the write of the room's text as of this point in the order."""
+        own = self.backplane.is_own(event)
+        claim = self._flush_claims.get(room_id)
+        if not state.dirty or (claim is not None and time.monotonic() - claim.started < FLUSH_CLAIM_TIMEOUT):
+            # Clean, or another worker's flush got there first
+            if own:
+                self._resolve_flush(event["id"])
+            return
+        claim = FlushClaim(event["id"], event["origin"], state.seq, state.text)
+        self._flush_claims[room_id] = claim
+        if own:
+            self._writes.append((room_id, claim, PersistJob(
+                document_id=state.document_id,
+                seq=state.seq,
+                text=state.text,
+                base_text=state.persisted_text,
+                base_revision=state.persisted_revision,
+                author=state.last_author,
+            )))
+
+    async def _write(self, writes: List[Tuple[str, FlushClaim, PersistJob]]):
+        """Write claimed rooms in one batch and report the outcome to every worker."""
+        try:
+            started = time.monotonic()
+            results = await run_in_threadpool(persist_documents, [job for _, _, job in writes])
+            metrics.histogram("collab.flush_ms").observe((time.monotonic() - started) * 1000)
+        except Exception as e:
+            results = [e] * len(writes)
+        for (room_id, claim, job), result in zip(writes, results):
+            event = {"kind": "persisted", "room": room_id, "flush": claim.id}
+            if isinstance(result, Exception):
+                # Left dirty; retried on a later flush
+                print(f"[ERROR] Failed to save document {job.document_id}: {result}")
+                event["error"] = str(result)
+            else:
+                written, revision, external = result
+                event["revision"] = revision
+                if external:
+                    # Someone saved through the REST API meanwhile
+                    event["external"] = external
+                    event["text"] = written
+            self.backplane.publish(event)
+
+    def _on_persisted(self, room_id: str, state: DocumentState, event: dict):
+        claim = self._flush_claims.get(room_id)
+        if claim is None or claim.id != event["flush"]:
+            return
+        del self._flush_claims[room_id]
+        if "error" not in event:
+            base_text = state.persisted_text
+            state.persisted_text = event.get("text", claim.text)
+            state.persisted_revision = event["revision"]
+            if event.get("external"):
+                # Show the REST change in the room; every worker merges it at the same point
+                ops = state.merge_external(event["external"], base_text)
+                self.broadcast_edit(room_id, state, ops)
+            elif state.seq == claim.seq:
+                state.dirty_since = None
+        self._resolve_flush(event["flush"])
+
+    def _resolve_flush(self, flush_id: str):
+        waiter = self._flush_waiters.pop(flush_id, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    # Heartbeats
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        """Ping every client each interval and close the ones silent for too long.
+
+        Half-open connections (a phone that lost its network) never report a
+        disconnect; without this they would hold their room and queue forever.
+        """
+        while self.clients:
+            await asyncio.sleep(settings.WS_PING_INTERVAL)
+            now = time.monotonic()
+            ping = Frame({"type": "ping"})
+            for client in list(self.clients.values()):
+                if client.closed:
+                    continue
+                if now - client.last_seen > settings.WS_IDLE_TIMEOUT:
+                    client.closed = True
+                    metrics.counter("ws.evicted_idle").inc()
+                    self._spawn(self._evict(client, CLOSE_IDLE))
+                else:
+                    self._enqueue(client, ping)
+            self._drop_idle_rooms()
+
+    def stats(self) -> dict:
+        """Rooms, connections and queue depths on this worker."""
+        per_room = {room_id: len(connections) for room_id, connections in self.active_connections.items()}
+        return {
+            "worker": self.backplane.worker_id if self.backplane is not None else None,
+            "rooms": len(per_room),
+            "loaded_documents": len(self.documents),
+            "connections": len(self.clients),
+            "connections_per_room": per_room,
+            "queue_depth": summarize([client.queue.qsize() for client in self.clients.values()]),
+            "dirty_rooms": sum(1 for state in self.documents.values() if state.dirty),
+        }
+
+    # Write-behind
+
+    def _ensure_flusher(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while self.documents:
+            await asyncio.sleep(settings.COLLAB_FLUSH_INTERVAL / 2)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"[ERROR] Collaborative flush failed: {e}")
+            self._drop_idle_rooms()
+
+    async def flush(self, force: bool = False, room_ids: Optional[List[str]] = None):
+        """Write dirty rooms to the database: one write per document per interval.
+
+        Any worker holding a room may ask; the first request in the shared
+        order wins and its worker writes. Waits until the writes are done.
+        """
+        now = time.monotonic()
+        waiters = []
+        for room_id in room_ids if room_ids is not None else list(self.documents):
+            state = self.documents.get(room_id)
+            if state is None or not state.dirty:
+                continue
+            claim = self._flush_claims.get(room_id)
+            if claim is not None and now - claim.started < FLUSH_CLAIM_TIMEOUT:
+                continue
+            if force or state.due_for_flush(now):
+                flush_id = self.backplane.publish({"kind": "flush", "room": room_id})
+                waiter = asyncio.get_running_loop().create_future()
+                self._flush_waiters[flush_id] = waiter
+                waiters.append(waiter)
+        if waiters:
+            await asyncio.wait(waiters, timeout=FLUSH_CLAIM_TIMEOUT)
+
+    async def release_room(self, room_id: str):
+        """Save and drop the state of a room nobody here is editing anymore."""
+        if room_id in self.active_connections or room_id not in self.documents:
+            return
+        await self.flush(force=True, room_ids=[room_id])
+        self._drop_idle_rooms()
+
+    def _drop_idle_rooms(self):
+        """Forget saved states of rooms without connections on this worker."""
+        for room_id, state in list(self.documents.items()):
+            if room_id not in self.active_connections and room_id not in self._flush_claims and not state.dirty:
+                del self.documents[room_id]
+
+    async def shutdown(self):
+        """Write every unsaved room before the process exits."""
+        if self.backplane is None:
+            return
+        await self.flush(force=True)
+        await self.backplane.close()
+
 
 manager = ConnectionManager()
 
+
+def _ops_size(missed: List[Tuple[int, List[Op]]]) -> int:
+    """Rough size of a catch-up: inserted characters plus one per retain/delete."""
+    return sum(len(op) if isinstance(op, str) else 1 for _, ops in missed for op in ops)
+
+
+def _authorize(token: Optional[str], document_id: str) -> Tuple[Optional[str], int]:
+    """Check the token's user may edit the document: (email, 0) or (None, close code)."""
+    if not token or not document_id.isdigit():
+        return None, CLOSE_UNAUTHORIZED if not token else CLOSE_NOT_FOUND
+    db = SessionLocal()
+    try:
+        payload = decode_token(token)
+        principal = resolve_principal(payload, db) if payload else None
+        if principal is None:
+            return None, CLOSE_UNAUTHORIZED
+        company_id = db.query(DocumentEx.company_id).filter(DocumentEx.id == int(document_id)).scalar()
+        if company_id is None or company_id != principal.company_id:
+            return None, CLOSE_NOT_FOUND
+        return principal.email, 0
+    finally:
+        db.close()
+
+
 @router.websocket("/ws/docs/{document_id}")
 async def document_websocket(
-    websocket: WebSocket, 
-    document_id: str, 
-    user_email: str = "Anonymous"
+    websocket: WebSocket,
+    document_id: str,
+    token: Optional[str] = None,
+    protocol: str = "content",
+    session: Optional[str] = None,
+    since: Optional[int] = None
 ):
-    user_data = {"email": user_email, "id": str(id(websocket))}
-    await manager.connect(websocket, document_id, user_data)
-    
+    email, close_code = await run_in_threadpool(_authorize, token, document_id)
+    if email is None:
+        await websocket.close(code=close_code)
+        return
+    user_data = {"email": email, "id": str(id(websocket))}
+    if not await manager.connect(websocket, document_id, user_data, "ops" if protocol == "ops" else "content",
+                                 session=session, since=since):
+        await websocket.close(code=CLOSE_NOT_FOUND)
+        return
+
     try:
         while True:
             # Receive message from client (could be text update or cursor move)
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            # Broadcast to everyone else in the same document room
-            await manager.broadcast(document_id, message, exclude=websocket)
-            
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            try:
+                message = decode_frame(frame)
+            except ValueError:
+                continue
+            manager.handle_message(document_id, websocket, message)
+
     except WebSocketDisconnect:
-        user_data = manager.disconnect(websocket, document_id)
-        await manager.broadcast(document_id, {
-            "type": "presence",
-            "action": "leave",
-            "user": user_data
-        })
+        pass
+    finally:
+        await manager.disconnect(websocket)
+
+
+@router.get("/ws/metrics", dependencies=[Depends(require_metrics_token)])
+async def websocket_metrics():
+    """Live collaboration metrics of this worker process."""
+    return {**manager.stats(), **metrics.snapshot(("ws.", "collab.", "backplane."))}
@@ -0,0 +1,62 @@
+"""
+Transparent compression codec for large text columns.
+
+Every encoded payload starts with a one-byte tag naming the codec that
+produced it, so rows written with different codecs (or before compression
+was enabled) can always be decoded regardless of the current setting.
+"""
+import zlib
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+RAW = b"r"
+ZLIB = b"z"
+ZSTD = b"s"
+
+# Payloads shorter than this are stored raw - compression would not pay off
+MIN_COMPRESS_SIZE = 64
+
+
+def _codec() -> bytes:
+    if settings.DOCUMENT_CODEC == "zstd" and zstandard is not None:
+        return ZSTD
+    return ZLIB
+
+
+def compress_text(text: str) -> bytes:
+    """Encode and compress text, prefixed with its codec tag."""
+    data = text.encode("utf-8")
+    if len(data) < MIN_COMPRESS_SIZE:
+        return RAW + data
+
+    codec = _codec()
+    if codec == ZSTD:
+        packed = zstandard.ZstdCompressor(level=settings.DOCUMENT_COMPRESSION_LEVEL).compress(data)
+    else:
+        packed = zlib.compress(data, settings.DOCUMENT_COMPRESSION_LEVEL)
+
+    # Incompressible input (already packed media, short random strings)
+    if len(packed) >= len(data):
+        return RAW + data
+    return codec + packed
+
+
+def decompress_text(blob: bytes) -> str:
+    """Inverse of compress_text."""
+    codec, payload = blob[:1], blob[1:]
+    if codec == RAW:
+        data = payload
+    elif codec == ZLIB:
+        data = zlib.decompress(payload)
+    elif codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Document was stored with zstd but the zstandard package is not installed")
+        data = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raise ValueError(f"Unknown compression codec tag: {codec!r}")
+    return data.decode("utf-8")
@@ -1,16 +1,88 @@
 """
 Database configuration and session management.
+
+Two engines share one schema: the sync engine (SessionLocal / get_db) for
+threadpool routes, scripts and background workers, and the async engine
+(AsyncSessionLocal / get_async_db) for ``async def`` routes, whose queries
+wait on the event loop instead of holding a worker thread.
+
+With DATABASE_REPLICA_URL set, read-only routes take their session from
+get_read_db / get_async_read_db, which hand out a replica session unless
+the client wrote recently: for DB_REPLICA_STICKY_SECONDS after a write
+request its reads stay on the primary, so they see their own changes
+despite replication lag. Everything else uses the primary.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.query_stats import instrument_engine
+
+# Sync driver -> its asyncio counterpart
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+# Methods that never write; any other request marks its client as a recent writer
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARY_COOKIE = "db_primary"
+
+
+def async_database_url(url: str) -> str:
+    """The same database as ``url``, through an asyncio driver."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> dict:
+    """Pool settings from Settings; SQLite keeps its own pool defaults."""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    return options
+
 
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+_async_primary_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(_async_primary_url, **engine_options(_async_primary_url))
+# Objects stay loaded after commit: lazy loads cannot happen once the
+# route returns and the response is serialized outside the session
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(settings.DATABASE_REPLICA_URL, **engine_options(settings.DATABASE_REPLICA_URL))
+    _async_replica_url = async_database_url(settings.DATABASE_REPLICA_URL)
+    async_replica_engine = create_async_engine(_async_replica_url, **engine_options(_async_replica_url))
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+
+for _engine in (engine, async_engine.sync_engine, replica_engine, async_replica_engine.sync_engine):
+    instrument_engine(_engine)
+
+# Authorization header -> True, for clients that sent a write request recently
+_recent_writers = TTLCache(settings.DB_REPLICA_STICKY_CLIENTS, settings.DB_REPLICA_STICKY_SECONDS)
+
 
 def get_db():
     """Dependency for getting database session."""
@@ -19,3 +91,73 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session.
+
+    Services written against the sync Session API run inside it with
+    ``await db.run_sync(service, *args)``; their I/O still goes through the
+    async driver.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def reads_from_replica(request: Request) -> bool:
+    """Whether this request's reads may be served by the replica."""
+    if replica_engine is engine or request.method not in SAFE_METHODS:
+        return False
+    if request.cookies.get(PRIMARY_COOKIE):
+        return False
+    authorization = request.headers.get("authorization")
+    return not (authorization and _recent_writers.get(authorization))
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes: the replica, or the primary right after a write."""
+    db = ReplicaSessionLocal() if reads_from_replica(request) else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """get_read_db for async routes."""
+    session_factory = AsyncReplicaSessionLocal if reads_from_replica(request) else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+
+class ReadAfterWriteMiddleware:
+    """Keep a client's reads on the primary for a while after it writes.
+
+    Write requests mark the client twice: by its Authorization header in
+    this process, and with a short-lived cookie that reaches the other
+    workers when the client sends cookies back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cookie = (
+            f"{PRIMARY_COOKIE}=1; Max-Age={max(1, round(settings.DB_REPLICA_STICKY_SECONDS))}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or replica_engine is engine or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                _recent_writers.set(value.decode("latin-1"), True)
+                break
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
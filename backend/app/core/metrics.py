@@ -0,0 +1,136 @@
+"""In-process metrics: counters with recent rates, and latency histograms.
+
+Each worker process keeps its own registry; scrape every worker to see the
+whole deployment. Safe to update from the event loop and from threadpool
+threads.
+"""
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+# Milliseconds
+DEFAULT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Seconds of history behind Counter.rate()
+RATE_WINDOW = 60
+
+
+class Counter:
+    """Monotonic count, with per-second buckets for the recent rate."""
+
+    def __init__(self):
+        self.total = 0
+        self._seconds: Deque[Tuple[int, int]] = deque()  # (second, count)
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1) -> None:
+        second = int(time.monotonic())
+        with self._lock:
+            self.total += n
+            if self._seconds and self._seconds[-1][0] == second:
+                self._seconds[-1] = (second, self._seconds[-1][1] + n)
+            else:
+                self._seconds.append((second, n))
+                while self._seconds and self._seconds[0][0] <= second - RATE_WINDOW:
+                    self._seconds.popleft()
+
+    def rate(self, window: int = RATE_WINDOW) -> float:
+        """Average per second over the last ``window`` seconds."""
+        since = int(time.monotonic()) - window
+        with self._lock:
+            return sum(count for second, count in self._seconds if second > since) / window
+
+    def snapshot(self) -> dict:
+        return {"total": self.total, "rate_1m": round(self.rate(), 3)}
+
+
+class Histogram:
+    """Counts of observations per bucket upper bound, with estimated quantiles."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = list(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket: above every bound
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None when empty)."""
+        with self._lock:
+            if self.count == 0:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.bounds, self.counts):
+                seen += count
+                if seen >= rank:
+                    return bound
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "mean": round(total / count, 3) if count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    """Named counters, histograms and gauges (callables read when scraped)."""
+
+    def __init__(self):
+        self.counters: Dict[str, Counter] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.gauges: Dict[str, Callable[[], object]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str) -> Counter:
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram(buckets))
+        return histogram
+
+    def gauge(self, name: str, read: Callable[[], object]) -> None:
+        self.gauges[name] = read
+
+    def snapshot(self, prefix: Union[str, Tuple[str, ...]] = "") -> dict:
+        """Current values of every metric whose name starts with ``prefix`` (or one of several)."""
+        return {
+            "gauges": {name: read() for name, read in list(self.gauges.items()) if name.startswith(prefix)},
+            "counters": {name: c.snapshot() for name, c in list(self.counters.items()) if name.startswith(prefix)},
+            "histograms": {name: h.snapshot() for name, h in list(self.histograms.items()) if name.startswith(prefix)},
+        }
+
+
+metrics = MetricsRegistry()
+
+
+def summarize(values: List[int]) -> dict:
+    """Total/max/mean of a list of sizes, for gauges over many queues."""
+    if not values:
+        return {"count": 0, "total": 0, "max": 0, "mean": 0}
+    return {"count": len(values), "total": sum(values), "max": max(values), "mean": round(sum(values) / len(values), 2)}
@@ -0,0 +1,195 @@
+"""Per-request SQL instrumentation.
+
+Cursor events on every engine add each statement to the stats of the
+request being handled: statement count, total database time, the slowest
+statements, and how often each distinct statement ran. A statement that
+runs DB_N_PLUS_ONE_THRESHOLD times or more in one request is flagged as
+a likely N+1 (a query per row of an earlier result), with the route
+that issued it.
+
+QueryStatsMiddleware reports each request's stats as X-DB-* response
+headers when DEBUG is on, and always to the metrics registry under
+``db.`` (served by /metrics/db). query_budget() checks them from tests
+and scripts.
+"""
+import heapq
+import time
+from collections import Counter as StatementCounter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SLOWEST_KEPT = 3
+HEADER_STATEMENT_LENGTH = 200
+RECENT_N_PLUS_ONE = 50
+
+# Statements per request
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+class QueryStats:
+    """The statements one request issued."""
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest: List[Tuple[float, int, str]] = []  # min-heap of (ms, sequence, statement)
+        self.statements: StatementCounter = StatementCounter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] += 1
+        entry = (elapsed_ms, self.count, statement)
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, entry)
+        elif elapsed_ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def slowest_statements(self) -> List[Tuple[float, str]]:
+        """(ms, statement) of the slowest statements, slowest first."""
+        return [(ms, statement) for ms, _, statement in sorted(self.slowest, reverse=True)]
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(statement, times) for statements run at least ``threshold`` times."""
+        threshold = threshold or settings.DB_N_PLUS_ONE_THRESHOLD
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Callbacks given each finished request's stats (query_budget)
+_observers: List[Callable[[QueryStats], None]] = []
+
+# (route, statement, times) of recent N+1 detections in this process
+recent_n_plus_one: Deque[dict] = deque(maxlen=RECENT_N_PLUS_ONE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the statement's execution context, so a failed statement leaves nothing behind
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - context._query_started) * 1000)
+
+
+def instrument_engine(engine) -> None:
+    """Record an engine's statements in the current request's stats.
+
+    Takes a sync Engine; for an async one pass ``async_engine.sync_engine``.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _one_line(statement: str) -> str:
+    text = " ".join(statement.split())
+    if len(text) > HEADER_STATEMENT_LENGTH:
+        text = text[:HEADER_STATEMENT_LENGTH - 3] + "..."
+    return text
+
+
+def _report(stats: QueryStats) -> None:
+    metrics.counter("db.requests").inc()
+    metrics.counter("db.queries").inc(stats.count)
+    metrics.histogram("db.queries_per_request", COUNT_BUCKETS).observe(stats.count)
+    metrics.histogram("db.time_ms").observe(stats.total_ms)
+    if stats.route:
+        metrics.histogram(f"db.route.{stats.route}.queries", COUNT_BUCKETS).observe(stats.count)
+
+    for statement, times in stats.repeated():
+        metrics.counter("db.n_plus_one").inc()
+        recent_n_plus_one.append({"route": stats.route, "statement": _one_line(statement), "times": times})
+        print(f"[WARN] Possible N+1 in {stats.route}: statement ran {times} times: {_one_line(statement)}")
+
+    for observer in list(_observers):
+        observer(stats)
+
+
+def route_template(scope) -> Optional[str]:
+    """The matched route as "METHOD /path/{param}", or None if no route matched.
+
+    The route's own path template, so metrics get one series per route
+    rather than per URL.
+    """
+    route = scope.get("route")
+    if route is None:
+        return None
+    # A route of an included router has a path relative to the router's
+    # prefix; FastAPI keeps the full one on the matched route's context
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or route.path
+    return f"{scope['method']} {path}"
+
+
+class QueryStatsMiddleware:
+    """Collect the statements each HTTP request issues and report them when it finishes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.DB_QUERY_STATS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(stats.count).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.total_ms:.1f}".encode()))
+                for ms, statement in stats.slowest_statements():
+                    headers.append((b"x-db-slowest", f"{ms:.1f}ms {_one_line(statement)}".encode("utf-8")))
+                repeated = stats.repeated()
+                if repeated:
+                    headers.append((b"x-db-n-plus-one", str(len(repeated)).encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            stats.route = route_template(scope)
+            _report(stats)
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: Optional[int] = None):
+    """Fail if a request handled inside the block issues more than ``max_queries`` statements.
+
+        with query_budget(3):
+            client.get("/companies/me", headers=auth)
+
+    With ``max_repeats``, also fail when one statement runs more than that
+    many times in a request. Yields the list of each request's QueryStats.
+    """
+    seen: List[QueryStats] = []
+    _observers.append(seen.append)
+    try:
+        yield seen
+    finally:
+        _observers.remove(seen.append)
+
+    problems = []
+    for stats in seen:
+        if stats.count > max_queries:
+            problems.append(f"{stats.route}: {stats.count} queries (budget {max_queries})")
+        if max_repeats is not None:
+            for statement, times in stats.repeated(max_repeats + 1):
+                problems.append(f"{stats.route}: ran {times} times (max {max_repeats}): {_one_line(statement)}")
+    if problems:
+        raise AssertionError("Query budget exceeded:\n" + "\n".join(problems))
@@ -1,17 +1,27 @@
 """
 Security utilities for authentication and authorization.
 """
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from passlib.context import CryptContext
 from jose import jwt
+from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordBearer
 
 from app.core.config import settings
 
-# Use argon2 instead of bcrypt for Python 3.14 compatibility
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Use argon2 instead of bcrypt for Python 3.14 compatibility.
+# Hashes made with other cost parameters still verify and are flagged for rehash.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
@@ -25,6 +35,80 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; on success also return a new hash if the stored one uses old parameters."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs Argon2 in a dedicated process pool so it never occupies the
+    request threadpool or the event loop.
+
+    At most PASSWORD_HASH_WORKERS hashes run at once. Up to
+    PASSWORD_HASH_QUEUE_SIZE more wait for a worker, each for at most
+    PASSWORD_HASH_QUEUE_TIMEOUT seconds; anything beyond that is refused with
+    503 so a login burst cannot pile up unbounded work.
+    """
+
+    def __init__(self):
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+
+    def _pool(self) -> Optional[Executor]:
+        if self._executor is None and settings.PASSWORD_HASH_WORKERS > 0:
+            self._executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(max(settings.PASSWORD_HASH_WORKERS, 1))
+        if self._slots.locked():
+            if self._waiting >= settings.PASSWORD_HASH_QUEUE_SIZE:
+                raise _busy_exception()
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), settings.PASSWORD_HASH_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise _busy_exception()
+            finally:
+                self._waiting -= 1
+        else:
+            await self._slots.acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash or None) - store the new hash when one is returned."""
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+password_hasher = PasswordHasher()
+
+
+def user_token_claims(user) -> dict:
+    """Claims identifying a user: subject (email), user id and company id."""
+    return {"sub": user.email, "uid": user.id, "cid": user.company_id}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -0,0 +1,120 @@
+"""Quantile sketch for distributions maintained one value at a time.
+
+Values are counted in logarithmic buckets (the DDSketch layout): any
+quantile it reports is within ``relative_accuracy`` of a value actually
+added. Unlike sampling sketches it supports removal, so a stored
+distribution can follow values that change (remove the old one, add the
+new one), and it serializes to a small JSON dict.
+"""
+import math
+from typing import Dict, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Values closer to zero than this are counted as zero
+MIN_MAGNITUDE = 1e-9
+
+
+class QuantileSketch:
+    """Counts per log bucket, for positive and negative values separately."""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Midpoint (in relative terms) of the bucket's range
+        return 2 * self.gamma ** key / (1 + self.gamma)
+
+    def _bucket(self, value: float):
+        """(store, key), or (None, None) for zero."""
+        if abs(value) < MIN_MAGNITUDE:
+            return None, None
+        if value > 0:
+            return self.positive, self._key(value)
+        return self.negative, self._key(-value)
+
+    def add(self, value: float, n: int = 1) -> None:
+        store, key = self._bucket(value)
+        if store is None:
+            self.zero += n
+        else:
+            store[key] = store.get(key, 0) + n
+        self.count += n
+
+    def remove(self, value: float) -> None:
+        """Remove one occurrence of a value added earlier (no-op if its bucket is empty)."""
+        store, key = self._bucket(value)
+        if store is None:
+            if self.zero > 0:
+                self.zero -= 1
+                self.count -= 1
+            return
+        if store.get(key, 0) > 0:
+            store[key] -= 1
+            if store[key] == 0:
+                del store[key]
+            self.count -= 1
+
+    def rank(self, value: float) -> Optional[float]:
+        """Share (0-1) of values below ``value``; values in its bucket count half."""
+        if self.count == 0:
+            return None
+        store, key = self._bucket(value)
+        if store is None:
+            below, same = sum(self.negative.values()), self.zero
+        elif store is self.positive:
+            below = sum(self.negative.values()) + self.zero
+            below += sum(count for k, count in self.positive.items() if k < key)
+            same = self.positive.get(key, 0)
+        else:
+            # Larger magnitude = smaller negative value
+            below = sum(count for k, count in self.negative.items() if k > key)
+            same = self.negative.get(key, 0)
+        return (below + same / 2) / self.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile ``q`` (0-1)."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "a": self.relative_accuracy,
+            "p": {str(k): v for k, v in self.positive.items()},
+            "n": {str(k): v for k, v in self.negative.items()},
+            "z": self.zero,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> "QuantileSketch":
+        if not data:
+            return cls()
+        sketch = cls(data.get("a", DEFAULT_RELATIVE_ACCURACY))
+        sketch.positive = {int(k): v for k, v in data.get("p", {}).items()}
+        sketch.negative = {int(k): v for k, v in data.get("n", {}).items()}
+        sketch.zero = data.get("z", 0)
+        sketch.count = sketch.zero + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
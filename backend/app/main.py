@@ -3,9 +3,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
-from app.core.database import Base, engine, SessionLocal
+from app.core.database import Base, ReadAfterWriteMiddleware, engine, SessionLocal
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.security import password_hasher
+from app.services.email_outbox import email_outbox
 from app.services.data_sync import init_rd_notices_if_empty
-from app.api.v1 import auth, companies, documents, team, generate, recommendations, users
+from app.api.v1 import auth, companies, documents, team, generate, recommendations, users, websocket, metrics
 
 # Create FastAPI app
 app = FastAPI(title="R&D SaaS Platform API")
@@ -19,6 +22,8 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],
 )
+app.add_middleware(ReadAfterWriteMiddleware)
+app.add_middleware(QueryStatsMiddleware)
 
 
 # Startup event
@@ -31,6 +36,20 @@ def startup():
     db.close()
 
 
+@app.on_event("startup")
+async def start_background_workers():
+    """Start delivering queued emails."""
+    email_outbox.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Save collaborative edits that are still pending and stop the background workers."""
+    await websocket.manager.shutdown()
+    await email_outbox.stop()
+    password_hasher.shutdown()
+
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(companies.router, prefix="/companies", tags=["companies"])
@@ -39,8 +58,8 @@ app.include_router(team.router, prefix="/team", tags=["team"])
 app.include_router(generate.router, prefix="/generate", tags=["generate"])
 app.include_router(recommendations.router, prefix="/recommendations", tags=["recommendations"])
 app.include_router(users.router, prefix="/users", tags=["users"])
-from app.api.v1 import websocket
 app.include_router(websocket.router, tags=["websocket"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
 
 # Root endpoint
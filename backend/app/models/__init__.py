@@ -1,16 +1,24 @@
 """Database models."""
 from app.models.user import UserEx
-from app.models.company import CompanyEx, FinancialEx, ProjectHistoryEx
-from app.models.document import DocumentEx
+from app.models.company import CompanyEx, FinancialEx, ProjectHistoryEx, PatentEx
+from app.models.document import DocumentEx, DocumentRevisionEx, DocumentSearchEx
 from app.models.team import TeamMemberEx
 from app.models.rd_notice import RDNoticeEx
+from app.models.email_outbox import EmailOutboxEx
+from app.models.benchmark import CompanyMetricsEx, SectorBenchmarkEx
 
 __all__ = [
     "UserEx",
     "CompanyEx",
     "FinancialEx",
     "ProjectHistoryEx",
+    "PatentEx",
     "DocumentEx",
+    "DocumentRevisionEx",
+    "DocumentSearchEx",
     "TeamMemberEx",
     "RDNoticeEx",
+    "EmailOutboxEx",
+    "CompanyMetricsEx",
+    "SectorBenchmarkEx",
 ]
@@ -0,0 +1,30 @@
+"""Sector benchmark models."""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+
+from app.core.database import Base
+
+
+class CompanyMetricsEx(Base):
+    """The values a company currently contributes to its sector's distributions."""
+    __tablename__ = "company_metrics"
+
+    company_id = Column(String(36), ForeignKey("companies.id"), primary_key=True)
+    sector = Column(String(100), index=True)
+    revenue = Column(Float, nullable=True)
+    operating_profit = Column(Float, nullable=True)
+    debt_ratio = Column(Float, nullable=True)
+    growth = Column(Float, nullable=True)  # Revenue change vs the previous year, %
+    project_success_rate = Column(Float, nullable=True)  # %
+
+
+class SectorBenchmarkEx(Base):
+    """Distribution of one metric across a sector's companies."""
+    __tablename__ = "sector_benchmarks"
+
+    sector = Column(String(100), primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    sketch = Column(Text, nullable=False)  # QuantileSketch.to_dict() as JSON
+    count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
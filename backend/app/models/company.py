@@ -1,5 +1,5 @@
 """Company-related models."""
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -7,6 +7,10 @@ from app.core.database import Base
 
 class CompanyEx(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        # Ranking and filtering companies by stored score
+        Index("ix_companies_score_total", "score_total"),
+    )
 
     id = Column(String(36), primary_key=True, index=True)
     name = Column(String(100))
@@ -15,15 +19,38 @@ class CompanyEx(Base):
     sector = Column(String(100))
     founded_date = Column(String(20))
     business_id = Column(String(50))  # Add business ID field
+
+    # Suitability score, recomputed whenever the company, its financials or
+    # its projects change (company_service.rescore_company)
+    score_total = Column(Integer, nullable=True)
+    score_grade = Column(String(2), nullable=True)
+    score_financial = Column(Integer, nullable=True)
+    score_technology = Column(Integer, nullable=True)
+    score_experience = Column(Integer, nullable=True)
+
+    # Patent counts by status, kept by patent_service whenever patents are loaded
+    patents_registered = Column(Integer, default=0, nullable=False, server_default="0")
+    patents_pending = Column(Integer, default=0, nullable=False, server_default="0")
     
-    financials = relationship("FinancialEx", back_populates="company")
+    # Newest year first, so financials[0] is the latest
+    financials = relationship("FinancialEx", back_populates="company", order_by="FinancialEx.year.desc()")
     projects = relationship("ProjectHistoryEx", back_populates="company")
     documents = relationship("DocumentEx", back_populates="company")
+    patents = relationship("PatentEx", back_populates="company")
     members = relationship("TeamMemberEx", back_populates="company")
 
+    @property
+    def latest_financial(self):
+        """Financials of the most recent year, or None."""
+        return self.financials[0] if self.financials else None
+
 
 class FinancialEx(Base):
     __tablename__ = "financials"
+    __table_args__ = (
+        # A company's financials by year (company reads, latest-year lookups)
+        Index("ix_financials_company_year", "company_id", "year"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(String(36), ForeignKey("companies.id"))
@@ -39,6 +66,10 @@ class FinancialEx(Base):
 
 class ProjectHistoryEx(Base):
     __tablename__ = "project_histories"
+    __table_args__ = (
+        # A company's project history (company reads, rescoring)
+        Index("ix_project_histories_company", "company_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(String(36), ForeignKey("companies.id"))
@@ -49,3 +80,23 @@ class ProjectHistoryEx(Base):
     result = Column(String(20))
     
     company = relationship("CompanyEx", back_populates="projects")
+
+
+class PatentEx(Base):
+    """A patent (application or registration) held by a company."""
+    __tablename__ = "patents"
+    __table_args__ = (
+        # Recounting a company's patents by status
+        Index("ix_patents_company_status", "company_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(String(36), ForeignKey("companies.id"), nullable=False)
+    application_number = Column(String(30), unique=True, nullable=False)
+    registration_number = Column(String(30), nullable=True)
+    title = Column(String(500))
+    status = Column(String(20), nullable=False)  # registered, pending, expired, rejected, withdrawn
+    application_date = Column(String(20))
+    registration_date = Column(String(20), nullable=True)
+
+    company = relationship("CompanyEx", back_populates="patents")
@@ -1,17 +1,73 @@
-"""Document model."""
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+"""Document models."""
+from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, Index, UniqueConstraint, DDL, event
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
+from sqlalchemy.orm import relationship, deferred
 
 from app.core.database import Base
+from app.models.types import CompressedText
 
 
 class DocumentEx(Base):
     __tablename__ = "documents"
-    
+    __table_args__ = (
+        # Keyset pagination of a company's documents, newest first
+        Index("ix_documents_company_created", "company_id", "created_at", "id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200))
-    content = Column(String(10000))
+    # Compressed and deferred: only loaded when a single document is opened
+    content = deferred(Column(CompressedText))
     company_id = Column(String(36), ForeignKey("companies.id"))
     created_at = Column(String(50))
-    
+    revision = Column(Integer, default=1, nullable=False)
+    # Listing summary, maintained on write so listings never touch content
+    size = Column(Integer, default=0)
+    preview = Column(String(200), default="")
+
     company = relationship("CompanyEx", back_populates="documents")
+
+    # Saves set the next revision themselves (record_revision); the UPDATE
+    # also matches the revision it was loaded at, so a concurrent save of
+    # the same base fails with StaleDataError instead of overwriting
+    __mapper_args__ = {"version_id_col": revision, "version_id_generator": False}
+
+
+class DocumentRevisionEx(Base):
+    """One saved revision: a full snapshot or a delta against the previous revision."""
+    __tablename__ = "document_revisions"
+    __table_args__ = (
+        UniqueConstraint("document_id", "revision", name="uq_document_revision"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    revision = Column(Integer, nullable=False)
+    title = Column(String(200))
+    is_snapshot = Column(Boolean, default=False, nullable=False)
+    # Snapshot text, or a text_delta-encoded delta against revision - 1
+    data = deferred(Column(CompressedText))
+    size = Column(Integer)  # Content length after this revision
+    created_by = Column(String(100))
+    created_at = Column(String(50))
+
+
+class DocumentSearchEx(Base):
+    """Plain-text copy of a document for the MySQL FULLTEXT search backend."""
+    __tablename__ = "document_search"
+
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    company_id = Column(String(36), index=True)
+    title = Column(String(200))
+    body = Column(Text().with_variant(MEDIUMTEXT(), "mysql"))
+
+
+# The ngram parser splits Korean text into bi-grams (ngram_token_size=2)
+event.listen(
+    DocumentSearchEx.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE document_search "
+        "ADD FULLTEXT INDEX ft_document_search (title, body) WITH PARSER ngram"
+    ).execute_if(dialect="mysql"),
+)
@@ -0,0 +1,29 @@
+"""Outgoing email model."""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+
+from app.core.database import Base
+
+
+class EmailOutboxEx(Base):
+    """An email waiting to be sent, or the record of one that was."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Sender's scan for due messages
+        Index("ix_email_outbox_status_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(100), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_content = Column(Text, nullable=False)
+    text_content = Column(Text, nullable=True)
+    status = Column(String(20), default="Pending", nullable=False)  # Pending, Sending, Sent, Failed
+    attempts = Column(Integer, default=0, nullable=False)
+    # Next try for Pending; end of the sender's lease for Sending
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = Column(String(32), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
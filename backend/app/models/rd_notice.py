@@ -1,11 +1,15 @@
 """R&D Notice model."""
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index
 
 from app.core.database import Base
 
 
 class RDNoticeEx(Base):
     __tablename__ = "rd_notices"
+    __table_args__ = (
+        # Notices for a sector
+        Index("ix_rd_notices_sector", "sector"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200))
@@ -1,5 +1,5 @@
 """Team member model."""
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -7,6 +7,12 @@ from app.core.database import Base
 
 class TeamMemberEx(Base):
     __tablename__ = "team_members"
+    __table_args__ = (
+        # Team listing, and matching invitees against a company's members
+        Index("ix_team_members_company_email", "company_id", "email"),
+        # A person's memberships and invitations across companies
+        Index("ix_team_members_email", "email"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100))
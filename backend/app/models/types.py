@@ -0,0 +1,29 @@
+"""Custom column types."""
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.types import TypeDecorator
+
+from app.core.compression import compress_text, decompress_text
+
+
+class CompressedText(TypeDecorator):
+    """Text stored as a compressed blob; reads and writes plain str."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        # MySQL BLOB caps at 64KB, LONGBLOB at 4GB
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(bytes(value))
@@ -1,5 +1,5 @@
 """Company schemas."""
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -71,3 +71,31 @@ class CompanyResponse(CompanyBase):
 
     class Config:
         from_attributes = True
+
+
+class BenchmarkMetric(BaseModel):
+    value: Optional[float] = None
+    percentile: Optional[float] = None  # Share of sector peers below this company, 0-100
+    decile: Optional[int] = None  # 1 (lowest) to 10 (highest)
+    peers: int = 0
+    p25: Optional[float] = None
+    median: Optional[float] = None
+    p75: Optional[float] = None
+    higher_is_better: bool = True
+
+
+class SectorBenchmarkResponse(BaseModel):
+    sector: str
+    metrics: Dict[str, BenchmarkMetric]
+
+
+class ImportRowError(BaseModel):
+    row: int  # Row number in the file, header = 1
+    errors: List[str]
+
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
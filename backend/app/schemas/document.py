@@ -1,5 +1,5 @@
 """Document schemas."""
-from typing import Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 
@@ -20,14 +20,76 @@ class DocumentUpdate(BaseModel):
     content: Optional[str] = None
 
 
+class DocumentPatch(BaseModel):
+    """Incremental update against a known revision.
+
+    Send either ``ops`` (retain/delete/insert delta, see text_delta) or
+    ``diff`` (unified diff), optionally with a new title.
+    """
+    base_revision: int
+    title: Optional[str] = None
+    ops: Optional[List[Union[int, str]]] = None
+    diff: Optional[str] = None
+
+
+class DocumentPatchResponse(BaseModel):
+    id: int
+    revision: int
+    size: int
+
+
 class DocumentResponse(DocumentBase):
     id: int
     created_at: Optional[str] = None
+    revision: int = 1
     
     class Config:
         from_attributes = True
 
 
+class DocumentListItem(BaseModel):
+    """Document entry in listings - content is only served by GET /documents/{id}."""
+    id: int
+    title: str
+    company_id: str
+    created_at: Optional[str] = None
+    size: int = 0
+    preview: str = ""
+
+    class Config:
+        from_attributes = True
+
+
+class DocumentSearchHit(BaseModel):
+    id: int
+    title: str
+    created_at: Optional[str] = None
+    score: float
+    snippet: str
+
+
+class DocumentRevisionInfo(BaseModel):
+    revision: int
+    title: Optional[str] = None
+    is_snapshot: bool
+    size: Optional[int] = None
+    created_by: Optional[str] = None
+    created_at: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DocumentRevisionResponse(DocumentRevisionInfo):
+    content: str
+
+
+class DocumentDiffResponse(BaseModel):
+    from_revision: int
+    to_revision: int
+    diff: str
+
+
 class GenerateRequest(BaseModel):
     company_id: str
     section: Optional[str] = "all"
@@ -1,5 +1,10 @@
 """Team member schemas."""
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+# Invitations accepted in one bulk request
+BULK_INVITE_MAX = 200
 
 
 class TeamMemberBase(BaseModel):
@@ -23,3 +28,25 @@ class TeamMemberResponse(TeamMemberBase):
     
     class Config:
         from_attributes = True
+
+
+class BulkInviteItem(BaseModel):
+    email: str
+    role: str = "Member"
+
+
+class BulkInviteRequest(BaseModel):
+    invitations: List[BulkInviteItem] = Field(..., min_length=1, max_length=BULK_INVITE_MAX)
+
+
+class BulkInviteResult(BaseModel):
+    email: str
+    status: str  # "invited", "resent" or "error"
+    detail: Optional[str] = None
+    member: Optional[TeamMemberResponse] = None
+
+
+class BulkInviteResponse(BaseModel):
+    results: List[BulkInviteResult]
+    invited: int
+    failed: int
@@ -0,0 +1,210 @@
+"""Pub/sub backplane connecting the WebSocket managers of several workers.
+
+Every worker publishes its room events to the backplane and receives all
+events back, its own included, in one order shared by every worker. The
+collaborative rooms rely on that order: each worker applies the same edits
+in the same sequence, so their copies of a document never diverge.
+
+- ``InProcessBackplane`` delivers within one process. On its own it serves a
+  single worker; several instances sharing a ``LocalBroker`` stand in for
+  separate workers in tests.
+- ``RedisBackplane`` uses one Redis pub/sub channel (requires the ``redis``
+  package). Redis delivers a channel's messages to all subscribers in the
+  order it received them.
+
+Outgoing events are stamped with an ID and the worker's ID, and events
+published within ``WS_BACKPLANE_BATCH_WINDOW`` seconds travel as one batch.
+"""
+import asyncio
+import itertools
+import json
+import uuid
+from collections import deque
+from typing import Callable, Deque, List, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional: only needed for WS_BACKPLANE="redis"
+    aioredis = None
+
+# Event IDs remembered to drop redelivered events
+SEEN_IDS = 10000
+
+EventHandler = Callable[[List[dict]], None]
+
+
+class Backplane:
+    """Stamps and batches outgoing events; subclasses carry the batches."""
+
+    # Whether other workers can be listening
+    shared = True
+
+    def __init__(self, batch_window: Optional[float] = None):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.batch_window = settings.WS_BACKPLANE_BATCH_WINDOW if batch_window is None else batch_window
+        self._ids = itertools.count(1)
+        self._pending: List[dict] = []
+        self._scheduled = False
+        self._handler: Optional[EventHandler] = None
+        self._seen: Set[str] = set()
+        self._seen_order: Deque[str] = deque()
+
+    async def start(self, handler: EventHandler) -> None:
+        """Start receiving; ``handler`` is called with each batch, in order."""
+        self._handler = handler
+        await self._open()
+
+    def publish(self, event: dict) -> str:
+        """Queue an event for every worker and return its ID. Does not block."""
+        event["id"] = f"{self.worker_id}:{next(self._ids)}"
+        event["origin"] = self.worker_id
+        self._pending.append(event)
+        if not self._scheduled:
+            self._scheduled = True
+            loop = asyncio.get_running_loop()
+            if self.batch_window > 0:
+                loop.call_later(self.batch_window, self._flush)
+            else:
+                loop.call_soon(self._flush)
+        return event["id"]
+
+    def is_own(self, event: dict) -> bool:
+        return event.get("origin") == self.worker_id
+
+    def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        self._scheduled = False
+        if batch:
+            metrics.counter("backplane.events_out").inc(len(batch))
+            metrics.counter("backplane.batches_out").inc()
+            self._send(batch)
+
+    def _deliver(self, batch: List[dict]) -> None:
+        fresh = []
+        for event in batch:
+            if event["id"] in self._seen:
+                continue
+            self._seen.add(event["id"])
+            self._seen_order.append(event["id"])
+            if len(self._seen_order) > SEEN_IDS:
+                self._seen.discard(self._seen_order.popleft())
+            fresh.append(event)
+        metrics.counter("backplane.events_in").inc(len(fresh))
+        if fresh and self._handler is not None:
+            self._handler(fresh)
+
+    async def _open(self) -> None:
+        raise NotImplementedError
+
+    def _send(self, batch: List[dict]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalBroker:
+    """Fans batches out to in-process backplanes in publish order."""
+
+    def __init__(self):
+        self.subscribers: List["InProcessBackplane"] = []
+
+    def publish(self, batch: List[dict]) -> None:
+        for subscriber in list(self.subscribers):
+            subscriber._inbox.put_nowait(batch)
+
+
+class InProcessBackplane(Backplane):
+    """Backplane within one process; pass a shared ``LocalBroker`` to link managers."""
+
+    def __init__(self, broker: Optional[LocalBroker] = None, batch_window: Optional[float] = None):
+        super().__init__(batch_window)
+        self.shared = broker is not None
+        self.broker = broker or LocalBroker()
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def _open(self) -> None:
+        self.broker.subscribers.append(self)
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        while True:
+            batch = await self._inbox.get()
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                print(f"[ERROR] Backplane event handling failed: {e}")
+
+    def _send(self, batch: List[dict]) -> None:
+        self.broker.publish(batch)
+
+    async def close(self) -> None:
+        if self in self.broker.subscribers:
+            self.broker.subscribers.remove(self)
+        if self._reader is not None:
+            self._reader.cancel()
+
+
+class RedisBackplane(Backplane):
+    """Backplane over a Redis pub/sub channel."""
+
+    def __init__(self, url: str, channel: str, batch_window: Optional[float] = None):
+        if aioredis is None:
+            raise RuntimeError("WS_BACKPLANE=redis requires the redis package")
+        super().__init__(batch_window)
+        self.url = url
+        self.channel = channel
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._client = None
+        self._pubsub = None
+
+    async def _open(self) -> None:
+        self._client = aioredis.from_url(self.url)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._write())]
+
+    async def _read(self) -> None:
+        async for message in self._pubsub.listen():
+            if message["type"] != "message":
+                continue
+            try:
+                self._deliver(json.loads(message["data"]))
+            except Exception as e:
+                print(f"[ERROR] Backplane event handling failed: {e}")
+
+    async def _write(self) -> None:
+        # One writer keeps this worker's batches in publish order
+        while True:
+            batch = await self._outbox.get()
+            payload = json.dumps(batch, separators=(",", ":"), ensure_ascii=False)
+            while True:
+                try:
+                    await self._client.publish(self.channel, payload)
+                    break
+                except Exception as e:
+                    print(f"[ERROR] Backplane publish failed, retrying: {e}")
+                    await asyncio.sleep(1)
+
+    def _send(self, batch: List[dict]) -> None:
+        self._outbox.put_nowait(batch)
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+        if self._client is not None:
+            await self._client.close()
+
+
+def create_backplane() -> Backplane:
+    """Backplane selected by WS_BACKPLANE."""
+    if settings.WS_BACKPLANE == "redis":
+        return RedisBackplane(settings.REDIS_URL, settings.WS_BACKPLANE_CHANNEL)
+    return InProcessBackplane()
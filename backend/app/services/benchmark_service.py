@@ -0,0 +1,195 @@
+"""Sector peer benchmarks.
+
+Each company contributes one value per metric (from its latest financial
+year and its project history) to its sector's distribution. The
+distributions are kept as quantile sketches in ``sector_benchmarks`` and
+updated in the same transaction as the financial/project change, by
+removing the company's previous value and adding the new one. Reading a
+company's position is then two small queries, however many peers it has.
+"""
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only, selectinload
+
+from app.core.sketch import QuantileSketch
+from app.models.benchmark import CompanyMetricsEx, SectorBenchmarkEx
+from app.models.company import CompanyEx
+
+# Metric -> whether a higher value is better
+METRICS = {
+    "revenue": True,
+    "operating_profit": True,
+    "debt_ratio": False,
+    "growth": True,
+    "project_success_rate": True,
+}
+
+# Metrics with a fixed range; sketch quantiles (bucket midpoints) are clamped to it
+BOUNDS = {"project_success_rate": (0.0, 100.0)}
+
+
+def company_metric_values(company: CompanyEx) -> Dict[str, Optional[float]]:
+    """Current metric values of a company loaded with financials and projects."""
+    values: Dict[str, Optional[float]] = dict.fromkeys(METRICS)
+    latest = company.latest_financial
+    if latest is not None:
+        values["revenue"] = latest.revenue
+        values["operating_profit"] = latest.operating_profit
+        values["debt_ratio"] = latest.debt_ratio
+        if len(company.financials) > 1:
+            previous = company.financials[1]
+            if previous.revenue and latest.revenue is not None:
+                values["growth"] = (latest.revenue - previous.revenue) / abs(previous.revenue) * 100
+    if company.projects:
+        successful = sum(1 for p in company.projects if p.result == "성공")
+        values["project_success_rate"] = successful / len(company.projects) * 100
+    return values
+
+
+def _load_sketches(db: Session, sector: str, metrics: List[str], for_update: bool = False) -> Dict[str, SectorBenchmarkEx]:
+    query = db.query(SectorBenchmarkEx).filter(
+        SectorBenchmarkEx.sector == sector, SectorBenchmarkEx.metric.in_(metrics)
+    ).order_by(SectorBenchmarkEx.metric)
+    if for_update:
+        query = query.with_for_update()
+    return {row.metric: row for row in query}
+
+
+def _create_sketches(db: Session, sector: str, metrics: List[str]) -> None:
+    """Insert empty sketch rows, skipping any another transaction created first."""
+    for metric in metrics:
+        try:
+            with db.begin_nested():
+                db.add(SectorBenchmarkEx(sector=sector, metric=metric, sketch="{}", count=0))
+        except IntegrityError:
+            # Lost the race for the sector's first value; that row is used instead
+            pass
+
+
+def _apply(db: Session, sector: str, changes: Dict[str, tuple]) -> None:
+    """Apply {metric: (old value or None, new value or None)} to a sector's sketches."""
+    if not sector or not changes:
+        return
+    rows = _load_sketches(db, sector, sorted(changes), for_update=True)
+    missing = sorted(set(changes) - set(rows))
+    if missing:
+        _create_sketches(db, sector, missing)
+        rows.update(_load_sketches(db, sector, missing, for_update=True))
+    for metric, (old, new) in changes.items():
+        row = rows[metric]
+        sketch = QuantileSketch.from_dict(json.loads(row.sketch))
+        if old is not None:
+            sketch.remove(old)
+        if new is not None:
+            sketch.add(new)
+        row.sketch = json.dumps(sketch.to_dict(), separators=(",", ":"))
+        row.count = sketch.count
+
+
+def update_sector_benchmarks(db: Session, company: CompanyEx) -> None:
+    """Bring the sector distributions in line with a company's current data.
+
+    Call in the transaction that changed the company, its financials or
+    its projects, with the company loaded with both (rescore_company
+    returns it that way).
+    """
+    values = company_metric_values(company)
+    current = db.query(CompanyMetricsEx).filter(CompanyMetricsEx.company_id == company.id).with_for_update().first()
+    if current is None:
+        current = CompanyMetricsEx(company_id=company.id, sector=None)
+        db.add(current)
+    old_values = {metric: getattr(current, metric) for metric in METRICS}
+
+    if current.sector != company.sector:
+        # Moved sectors: leave the old distributions entirely
+        _apply(db, current.sector, {m: (v, None) for m, v in old_values.items() if v is not None})
+        _apply(db, company.sector, {m: (None, v) for m, v in values.items() if v is not None})
+    else:
+        _apply(db, company.sector, {
+            m: (old_values[m], values[m]) for m in METRICS if old_values[m] != values[m]
+        })
+
+    current.sector = company.sector
+    for metric, value in values.items():
+        setattr(current, metric, value)
+
+
+def company_benchmark(db: Session, company_id: str) -> Optional[dict]:
+    """Where a company sits in its sector on each metric, or None if it has no metrics yet."""
+    current = db.query(CompanyMetricsEx).filter(CompanyMetricsEx.company_id == company_id).first()
+    if current is None or not current.sector:
+        return None
+    rows = _load_sketches(db, current.sector, list(METRICS))
+    metrics = {}
+    for metric, higher_is_better in METRICS.items():
+        value = getattr(current, metric)
+        row = rows.get(metric)
+        sketch = QuantileSketch.from_dict(json.loads(row.sketch)) if row is not None else QuantileSketch()
+        percentile = decile = None
+        if value is not None and sketch.count:
+            percentile = round(sketch.rank(value) * 100, 1)
+            decile = min(int(percentile // 10) + 1, 10)
+        low, high = BOUNDS.get(metric, (float("-inf"), float("inf")))
+        p25, median, p75 = (
+            None if q is None else min(max(q, low), high)
+            for q in (sketch.quantile(0.25), sketch.quantile(0.5), sketch.quantile(0.75))
+        )
+        metrics[metric] = {
+            "value": value,
+            "percentile": percentile,
+            "decile": decile,
+            "peers": sketch.count,
+            "p25": p25,
+            "median": median,
+            "p75": p75,
+            "higher_is_better": higher_is_better,
+        }
+    return {"sector": current.sector, "metrics": metrics}
+
+
+def rebuild_sector_benchmarks(db: Session, batch_size: int = 200) -> int:
+    """Recompute every company's metrics and all sector distributions from scratch.
+
+    Reads only the company columns the metrics use, so migrations can run
+    it before later migrations add their company columns.
+    """
+    db.query(SectorBenchmarkEx).delete()
+    db.query(CompanyMetricsEx).delete()
+    sketches: Dict[tuple, QuantileSketch] = {}
+    processed = 0
+    last_id = ""
+    while True:
+        companies = (
+            db.query(CompanyEx)
+            .options(
+                load_only(CompanyEx.id, CompanyEx.sector),
+                selectinload(CompanyEx.financials),
+                selectinload(CompanyEx.projects),
+            )
+            .filter(CompanyEx.id > last_id)
+            .order_by(CompanyEx.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not companies:
+            break
+        for company in companies:
+            values = company_metric_values(company)
+            db.add(CompanyMetricsEx(company_id=company.id, sector=company.sector, **values))
+            if not company.sector:
+                continue
+            for metric, value in values.items():
+                if value is not None:
+                    sketches.setdefault((company.sector, metric), QuantileSketch()).add(value)
+        db.flush()
+        db.expunge_all()
+        processed += len(companies)
+        last_id = companies[-1].id
+    for (sector, metric), sketch in sketches.items():
+        db.add(SectorBenchmarkEx(
+            sector=sector, metric=metric,
+            sketch=json.dumps(sketch.to_dict(), separators=(",", ":")), count=sketch.count
+        ))
+    return processed
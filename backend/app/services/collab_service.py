@@ -0,0 +1,201 @@
+"""Authoritative collaborative document state with write-behind persistence.
+
+Each live document room owns a ``DocumentState``: the current text, a
+sequence number bumped on every accepted edit, and a bounded log of recent
+operations. Edits made against an older sequence number are transformed
+over the logged operations before they are applied (operational
+transformation), so concurrent edits merge instead of overwriting each
+other.
+
+The state is written to ``DocumentEx`` on a debounced schedule by
+``persist_documents`` rather than once per keystroke. When several workers
+serve a room, each holds a copy and applies the same edits in the order
+given by the backplane (see ``app.services.backplane``).
+"""
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import DocumentEx
+from app.services.document_service import set_document_content
+from app.services.revision_service import record_revision
+from app.services.search_service import index_document
+from app.services.text_delta import DeltaError, Op, apply_ops, diff_ops, transform
+
+
+class StaleBaseError(DeltaError):
+    """The edit's base sequence number is older than the operation log reaches."""
+
+
+class DocumentState:
+    """In-memory authoritative text of one document."""
+
+    def __init__(self, document_id: int, text: str, revision: int):
+        self.document_id = document_id
+        self.text = text
+        self.seq = 0
+        # Sequence numbers only mean something within one session of the room
+        self.session = uuid.uuid4().hex[:12]
+        # (seq, length of the text the op applied to, op)
+        self.log: Deque[Tuple[int, int, List[Op]]] = deque(maxlen=settings.COLLAB_OPLOG_SIZE)
+
+        # What the database holds, for write-behind and merging REST saves
+        self.persisted_text = text
+        self.persisted_revision = revision
+        self.dirty_since: Optional[float] = None
+        self.last_edit: Optional[float] = None
+        self.last_author: Optional[str] = None
+
+    def apply(self, ops: List[Op], base_seq: int, author: Optional[str] = None) -> List[Op]:
+        """Apply an edit made against ``base_seq`` and return it as applied."""
+        if base_seq > self.seq:
+            raise DeltaError(f"Base sequence {base_seq} is ahead of the document ({self.seq})")
+        if base_seq < self.seq:
+            if not self.log or self.log[0][0] > base_seq + 1:
+                raise StaleBaseError(f"Base sequence {base_seq} is too old to merge")
+            for seq, base_length, logged in self.log:
+                if seq > base_seq:
+                    ops = transform(ops, logged, base_length)
+
+        new_text = apply_ops(self.text, ops)
+        self.seq += 1
+        self.log.append((self.seq, len(self.text), ops))
+        self.text = new_text
+
+        now = time.monotonic()
+        if self.dirty_since is None:
+            self.dirty_since = now
+        self.last_edit = now
+        if author:
+            self.last_author = author
+        return ops
+
+    def ops_since(self, seq: int) -> Optional[List[Tuple[int, List[Op]]]]:
+        """Operations applied after ``seq`` as (seq, ops), or None if the log no longer reaches back."""
+        if seq == self.seq:
+            return []
+        if seq > self.seq or not self.log or self.log[0][0] > seq + 1:
+            return None
+        return [(entry_seq, ops) for entry_seq, _, ops in self.log if entry_seq > seq]
+
+    def merge_external(self, external: List[Op], base_text: str) -> List[Op]:
+        """Apply a change saved outside the room (REST) against ``base_text``."""
+        room_edits = diff_ops(base_text, self.text)
+        return self.apply(transform(external, room_edits, len(base_text)), self.seq)
+
+    def to_snapshot(self) -> dict:
+        """JSON-serializable copy, for handing the room to another worker."""
+        return {
+            "document_id": self.document_id,
+            "text": self.text,
+            "seq": self.seq,
+            "session": self.session,
+            "log": [list(entry) for entry in self.log],
+            "persisted_text": self.persisted_text,
+            "persisted_revision": self.persisted_revision,
+            "dirty": self.dirty,
+            "last_author": self.last_author,
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "DocumentState":
+        state = cls(data["document_id"], data["persisted_text"], data["persisted_revision"])
+        state.text = data["text"]
+        state.seq = data["seq"]
+        state.session = data["session"]
+        state.log.extend(tuple(entry) for entry in data["log"])
+        state.last_author = data.get("last_author")
+        if data.get("dirty"):
+            state.dirty_since = state.last_edit = time.monotonic()
+        return state
+
+    @property
+    def dirty(self) -> bool:
+        return self.dirty_since is not None
+
+    def due_for_flush(self, now: float) -> bool:
+        """Flush once edits pause for an interval, or when they have been pending too long."""
+        if self.dirty_since is None:
+            return False
+        return (now - self.last_edit >= settings.COLLAB_FLUSH_INTERVAL
+                or now - self.dirty_since >= settings.COLLAB_FLUSH_MAX_DELAY)
+
+
+def load_document_state(document_id: int) -> Optional[DocumentState]:
+    """Load a document's current text into a new state (blocking; run in a thread)."""
+    db = SessionLocal()
+    try:
+        doc = db.get(DocumentEx, document_id)
+        if doc is None:
+            return None
+        return DocumentState(document_id, doc.content or "", doc.revision)
+    finally:
+        db.close()
+
+
+@dataclass
+class PersistJob:
+    """Snapshot of a room's state to write."""
+    document_id: int
+    seq: int
+    text: str
+    base_text: str
+    base_revision: int
+    author: Optional[str]
+
+
+PersistResult = Union[Tuple[str, int, Optional[List[Op]]], Exception]
+
+
+def persist_documents(jobs: List[PersistJob]) -> List[PersistResult]:
+    """Write a batch of rooms to the database in one session (blocking; run in a thread).
+
+    Each document commits on its own, so one failure does not hold back
+    the rest; failures are returned in place of results.
+    """
+    db = SessionLocal()
+    try:
+        results: List[PersistResult] = []
+        for job in jobs:
+            try:
+                results.append(_persist(db, job))
+            except Exception as e:
+                db.rollback()
+                results.append(e)
+        return results
+    finally:
+        db.close()
+
+
+def _persist(db, job: PersistJob) -> Tuple[str, int, Optional[List[Op]]]:
+    """Write one room's text.
+
+    ``base_text``/``base_revision`` are what the room last read or wrote.
+    If the document was saved through the REST API since then, that change
+    is merged with the room's edits instead of being overwritten.
+
+    Returns the text written, its revision, and the external change as a
+    delta against ``base_text`` (None if there was none).
+    """
+    doc = db.get(DocumentEx, job.document_id)
+    if doc is None:
+        raise LookupError(f"Document {job.document_id} no longer exists")
+
+    text = job.text
+    current = doc.content or ""
+    external = None
+    if doc.revision != job.base_revision and current != job.base_text:
+        external = diff_ops(job.base_text, current)
+        room_edits = diff_ops(job.base_text, text)
+        text = apply_ops(current, transform(room_edits, external, len(job.base_text)))
+
+    if text != current:
+        set_document_content(doc, text)
+        record_revision(db, doc, current, author=job.author)
+        index_document(db, doc)
+        db.commit()
+    return text, doc.revision, external
@@ -1,4 +1,10 @@
 """Company service for business logic."""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
 from app.models.company import CompanyEx
 from app.schemas.company import (
     CompanyResponse,
@@ -9,26 +15,50 @@ from app.schemas.company import (
 )
 
 
-def calculate_company_score(db_company: CompanyEx) -> CompanyResponse:
+def _company_query(company_id: str, for_update: bool):
+    query = (
+        select(CompanyEx)
+        .options(selectinload(CompanyEx.financials), selectinload(CompanyEx.projects))
+        .where(CompanyEx.id == company_id)
+        .execution_options(populate_existing=True)
+    )
+    if for_update:
+        query = query.with_for_update()
+    return query
+
+
+def get_company(db: Session, company_id: str, for_update: bool = False) -> Optional[CompanyEx]:
+    """Load a company with its financials and projects (one batched query each)."""
+    return db.scalars(_company_query(company_id, for_update)).first()
+
+
+async def get_company_async(db: AsyncSession, company_id: str, for_update: bool = False) -> Optional[CompanyEx]:
+    """get_company for an async session."""
+    return (await db.scalars(_company_query(company_id, for_update))).first()
+
+
+def calculate_company_score(db_company: CompanyEx) -> Score:
     """Calculate company suitability score based on financials, tech, and experience."""
-    
+
     # 1. Financial Score (Max 30)
-    financial_score = 25 
-    if db_company.financials and len(db_company.financials) > 0:
-        latest_financial = db_company.financials[0]
+    financial_score = 25
+    latest_financial = db_company.latest_financial
+    if latest_financial is not None:
         if latest_financial.debt_ratio < 100:
              financial_score = 28
         elif latest_financial.debt_ratio > 300:
              financial_score = 15
 
-    # 2. Tech Score (Max 40)
-    tech_score = 35
+    # 2. Tech Score (Max 40): base 20, +3 per registered and +1 per pending patent
+    registered = db_company.patents_registered or 0
+    pending = db_company.patents_pending or 0
+    tech_score = 20 + min(registered * 3 + pending, 20)
 
     # 3. Experience Score (Max 30)
-    exp_score = 10 
+    exp_score = 10
     if len(db_company.projects) > 0:
         exp_score = 25
-    
+
     total = financial_score + tech_score + exp_score
     grade = "B"
     if total >= 80:
@@ -36,6 +66,76 @@ def calculate_company_score(db_company: CompanyEx) -> CompanyResponse:
     elif total >= 70:
         grade = "A"
 
+    return Score(
+        total=total,
+        grade=grade,
+        breakdown=ScoreBreakdown(
+            financial=financial_score,
+            technology=tech_score,
+            experience=exp_score
+        )
+    )
+
+
+def patent_grade(registered: int) -> str:
+    """Letter grade for a company's registered patent count."""
+    if registered >= 10:
+        return "S"
+    if registered >= 5:
+        return "A"
+    if registered >= 1:
+        return "B"
+    return "-"
+
+
+def patent_summary(db_company: CompanyEx) -> dict:
+    """Patent counts from the company's stored aggregates."""
+    registered = db_company.patents_registered or 0
+    return {"registered": registered, "pending": db_company.patents_pending or 0, "grade": patent_grade(registered)}
+
+
+def store_company_score(db_company: CompanyEx) -> Score:
+    """Recompute the score and write it to the company's score columns."""
+    score = calculate_company_score(db_company)
+    db_company.score_total = score.total
+    db_company.score_grade = score.grade
+    db_company.score_financial = score.breakdown.financial
+    db_company.score_technology = score.breakdown.technology
+    db_company.score_experience = score.breakdown.experience
+    return score
+
+
+def rescore_company(db: Session, company_id: str) -> Optional[CompanyEx]:
+    """Update the stored score after the company, its financials or its projects change.
+
+    Call before committing the change, in the same transaction. The company
+    row is locked, so concurrent writers to one company rescore one after
+    the other and the last one sees every row.
+    """
+    db.flush()
+    db_company = get_company(db, company_id, for_update=True)
+    if db_company is not None:
+        store_company_score(db_company)
+    return db_company
+
+
+def stored_company_score(db_company: CompanyEx) -> Score:
+    """The score as last stored; computed on the fly for rows not yet backfilled."""
+    if db_company.score_total is None:
+        return calculate_company_score(db_company)
+    return Score(
+        total=db_company.score_total,
+        grade=db_company.score_grade,
+        breakdown=ScoreBreakdown(
+            financial=db_company.score_financial,
+            technology=db_company.score_technology,
+            experience=db_company.score_experience
+        )
+    )
+
+
+def company_response(db_company: CompanyEx) -> CompanyResponse:
+    """Company with its financials, projects and stored score."""
     return CompanyResponse(
         id=db_company.id,
         name=db_company.name,
@@ -53,14 +153,6 @@ def calculate_company_score(db_company: CompanyEx) -> CompanyResponse:
             ) for f in db_company.financials
         ],
         projects=[ProjectBase(title=p.title, result=p.result) for p in db_company.projects],
-        patents={"registered": 5, "pending": 2, "grade": "A"},
-        score=Score(
-            total=total,
-            grade=grade,
-            breakdown=ScoreBreakdown(
-                financial=financial_score,
-                technology=tech_score,
-                experience=exp_score
-            )
-        )
+        patents=patent_summary(db_company),
+        score=stored_company_score(db_company)
     )
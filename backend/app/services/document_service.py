@@ -0,0 +1,41 @@
+"""Document content helpers."""
+import base64
+import html
+import re
+from typing import Optional, Tuple
+
+from app.models.document import DocumentEx
+
+PREVIEW_LENGTH = 200
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def make_preview(content: str, length: Optional[int] = PREVIEW_LENGTH) -> str:
+    """Plain-text preview of editor HTML or markdown (whole text if length is None)."""
+    text = html.unescape(_TAG_RE.sub(" ", content or ""))
+    return _SPACE_RE.sub(" ", text).strip()[:length]
+
+
+def set_document_content(doc: DocumentEx, content: str) -> None:
+    """Set the body and refresh the listing summary derived from it."""
+    doc.content = content
+    doc.size = len(content or "")
+    doc.preview = make_preview(content)
+
+
+def encode_cursor(created_at: str, doc_id: int) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a document."""
+    raw = f"{created_at or ''}|{doc_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """Inverse of encode_cursor; None if the cursor is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, doc_id = raw.rsplit("|", 1)
+        return created_at, int(doc_id)
+    except (ValueError, UnicodeError):
+        return None
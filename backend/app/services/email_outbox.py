@@ -0,0 +1,263 @@
+"""Background delivery of the email outbox.
+
+Request handlers add rows to ``email_outbox`` (EmailService.queue_*) in
+their own transaction and return; every worker process runs an
+``EmailOutbox`` sender that picks up due messages and delivers them over a
+small pool of SMTP connections kept open between messages.
+
+Several processes can share the table: a sender claims a batch by stamping
+it with its own token and a lease, so each message goes to one sender, and
+a message whose sender died is picked up again once the lease runs out.
+Temporary failures are retried with exponential backoff up to
+EMAIL_MAX_ATTEMPTS; rejected recipients and other permanent errors are
+marked Failed immediately.
+"""
+import asyncio
+import queue
+import random
+import smtplib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from app.models.email_outbox import EmailOutboxEx
+from app.services.email_service import EmailService, email_service
+
+# Seconds a claimed message is reserved for its sender
+SEND_LEASE = 300
+
+
+class SMTPConnection:
+    """One authenticated SMTP connection, reopened when it drops or idles out."""
+
+    def __init__(self, service: EmailService):
+        self.service = service
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def send(self, message) -> None:
+        if self._server is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_TIMEOUT:
+            self.close()
+        reused = self._server is not None
+        if self._server is None:
+            self._server = self.service.connect()
+        self._last_used = time.monotonic()
+        try:
+            self._server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            if not reused:
+                raise
+            # The server closed an idle connection; one retry on a fresh one
+            self._server = self.service.connect()
+            self._server.send_message(message)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # Connection is still usable; reset the failed transaction
+            try:
+                self._server.rset()
+            except smtplib.SMTPException:
+                self.close()
+            raise
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                self._server.close()
+            self._server = None
+
+
+class SMTPPool:
+    """Fixed set of connections; a send borrows one for its duration."""
+
+    def __init__(self, service: EmailService, size: int):
+        self.connections = [SMTPConnection(service) for _ in range(max(size, 1))]
+        self._idle: "queue.Queue[SMTPConnection]" = queue.Queue()
+        for connection in self.connections:
+            self._idle.put(connection)
+
+    def send(self, message) -> None:
+        connection = self._idle.get()
+        try:
+            connection.send(message)
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        for connection in self.connections:
+            connection.close()
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether retrying cannot help (the server rejected the message itself)."""
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False  # Fixable by configuration; keep retrying
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before attempt ``attempts + 1``, with jitter."""
+    delay = min(settings.EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailOutbox:
+    """Delivers due outbox messages from a background task."""
+
+    def __init__(self, service: EmailService = email_service, session_factory=SessionLocal):
+        self.service = service
+        self.session_factory = session_factory
+        self.pool: Optional[SMTPPool] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        size = max(settings.EMAIL_SMTP_POOL_SIZE, 1)
+        self.pool = SMTPPool(self.service, size)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self) -> None:
+        """Check the outbox now; call after committing queued emails. Safe from any thread."""
+        if self._loop is None or self._wake is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        self._loop = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                delivered = await self.deliver_due()
+            except Exception as e:
+                print(f"[ERROR] Email outbox delivery failed: {e}")
+                delivered = 0
+            if delivered >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue  # More may be waiting
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.EMAIL_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def deliver_due(self) -> int:
+        """Send one batch of due messages; returns how many were attempted."""
+        loop = asyncio.get_running_loop()
+        batch = await loop.run_in_executor(None, self._claim)
+        if not batch:
+            return 0
+        results = await asyncio.gather(*(loop.run_in_executor(self._executor, self._send, message) for message in batch))
+        await loop.run_in_executor(None, self._record, batch, results)
+        return len(batch)
+
+    def _claim(self) -> List[EmailOutboxEx]:
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = (EmailOutboxEx.status.in_(("Pending", "Sending")), EmailOutboxEx.next_attempt_at <= now)
+        db = self.session_factory()
+        try:
+            ids = [
+                row.id for row in db.query(EmailOutboxEx.id)
+                .filter(*due)
+                .order_by(EmailOutboxEx.next_attempt_at)
+                .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+            ]
+            if not ids:
+                return []
+            # Conditional on still being due: a competing sender's claim wins
+            db.query(EmailOutboxEx).filter(EmailOutboxEx.id.in_(ids), *due).update(
+                {
+                    EmailOutboxEx.status: "Sending",
+                    EmailOutboxEx.claim_token: token,
+                    EmailOutboxEx.next_attempt_at: now + timedelta(seconds=SEND_LEASE),
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            batch = db.query(EmailOutboxEx).filter(EmailOutboxEx.claim_token == token).all()
+            db.expunge_all()
+            return batch
+        finally:
+            db.close()
+
+    def _send(self, message: EmailOutboxEx) -> Optional[Exception]:
+        started = time.perf_counter()
+        try:
+            self.pool.send(self.service.build_message(
+                message.to_email, message.subject, message.html_content, message.text_content
+            ))
+        except Exception as e:
+            return e
+        finally:
+            metrics.histogram("email.send_ms").observe((time.perf_counter() - started) * 1000)
+        return None
+
+    def _record(self, batch: List[EmailOutboxEx], results: List[Optional[Exception]]) -> None:
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            for message, error in zip(batch, results):
+                attempts = message.attempts + 1
+                values = {EmailOutboxEx.attempts: attempts, EmailOutboxEx.claim_token: None}
+                if error is None:
+                    values.update({EmailOutboxEx.status: "Sent", EmailOutboxEx.sent_at: now, EmailOutboxEx.last_error: None})
+                    metrics.counter("email.sent").inc()
+                elif is_permanent(error) or attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                    values.update({EmailOutboxEx.status: "Failed", EmailOutboxEx.last_error: str(error)[:500]})
+                    metrics.counter("email.failed").inc()
+                    print(f"Failed to send email to {message.to_email} after {attempts} attempt(s). Error: {error}")
+                else:
+                    values.update({
+                        EmailOutboxEx.status: "Pending",
+                        EmailOutboxEx.last_error: str(error)[:500],
+                        EmailOutboxEx.next_attempt_at: now + timedelta(seconds=retry_delay(attempts)),
+                    })
+                    metrics.counter("email.retried").inc()
+                # Only while the claim is still ours (the lease may have passed to another sender)
+                db.query(EmailOutboxEx).filter(
+                    EmailOutboxEx.id == message.id, EmailOutboxEx.claim_token == message.claim_token
+                ).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+email_outbox = EmailOutbox()
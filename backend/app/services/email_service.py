@@ -2,95 +2,47 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from datetime import datetime
+from html import escape
+from string import Template
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.models.email_outbox import EmailOutboxEx
 
 
-class EmailService:
-    """Service for sending emails using Gmail SMTP."""
-    
-    def __init__(self):
-        self.smtp_host = settings.SMTP_HOST
-        self.smtp_port = settings.SMTP_PORT
-        self.smtp_user = settings.SMTP_USER
-        self.smtp_password = settings.SMTP_PASSWORD
-        self.from_email = settings.FROM_EMAIL or settings.SMTP_USER
-        self.from_name = settings.FROM_NAME
-    
-    def send_email(
-        self,
-        to_email: str,
-        subject: str,
-        html_content: str,
-        text_content: Optional[str] = None
-    ) -> bool:
-        """Send an email."""
-        try:
-            # Create message
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = f"{self.from_name} <{self.from_email}>"
-            msg["To"] = to_email
-            
-            # Add text and HTML parts
-            if text_content:
-                part1 = MIMEText(text_content, "plain")
-                msg.attach(part1)
-            
-            part2 = MIMEText(html_content, "html")
-            msg.attach(part2)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                if self.smtp_user and self.smtp_password:
-                    server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-            
-            print(f"Email sent successfully to {to_email}")
-            return True
-        except Exception as e:
-            print(f"Failed to send email to {to_email}. Error: {e}")
-            return False
-    
-    def send_team_invitation(
-        self,
-        to_email: str,
-        to_name: str,
-        inviter_name: str,
-        company_name: str,
-        invitation_link: str
-    ) -> bool:
-        """Send team invitation email."""
-        subject = f"{inviter_name}님이 {company_name} 팀에 초대했습니다"
-        
-        html_content = f"""
+# Compiled once at import; rendering is a single substitution per recipient
+TEAM_INVITATION_SUBJECT = Template("$inviter_name님이 $company_name 팀에 초대했습니다")
+
+TEAM_INVITATION_HTML = Template("""
         <!DOCTYPE html>
         <html>
         <head>
             <style>
-                body {{
+                body {
                     font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
                     line-height: 1.6;
                     color: #333;
                     max-width: 600px;
                     margin: 0 auto;
                     padding: 20px;
-                }}
-                .header {{
+                }
+                .header {
                     background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                     color: white;
                     padding: 30px;
                     border-radius: 10px 10px 0 0;
                     text-align: center;
-                }}
-                .content {{
+                }
+                .content {
                     background: #f9fafb;
                     padding: 30px;
                     border-radius: 0 0 10px 10px;
-                }}
-                .button {{
+                }
+                .button {
                     display: inline-block;
                     padding: 12px 30px;
                     background: #667eea;
@@ -99,13 +51,13 @@ class EmailService:
                     border-radius: 6px;
                     font-weight: 600;
                     margin: 20px 0;
-                }}
-                .footer {{
+                }
+                .footer {
                     text-align: center;
                     margin-top: 30px;
                     color: #6b7280;
                     font-size: 14px;
-                }}
+                }
             </style>
         </head>
         <body>
@@ -113,16 +65,16 @@ class EmailService:
                 <h1>🎉 팀 초대</h1>
             </div>
             <div class="content">
-                <p>안녕하세요 {to_name}님,</p>
-                <p><strong>{inviter_name}</strong>님이 <strong>{company_name}</strong>의 R&D 프로젝트 팀에 초대했습니다.</p>
+                <p>안녕하세요 $to_name님,</p>
+                <p><strong>$inviter_name</strong>님이 <strong>$company_name</strong>의 R&D 프로젝트 팀에 초대했습니다.</p>
                 <p>아래 버튼을 클릭하여 초대를 수락하고 계정을 생성하세요:</p>
                 <div style="text-align: center;">
-                    <a href="{invitation_link}" class="button">초대 수락하기</a>
+                    <a href="$invitation_link" class="button">초대 수락하기</a>
                 </div>
                 <p style="margin-top: 30px; font-size: 14px; color: #6b7280;">
                     또는 아래 링크를 복사하여 브라우저에 붙여넣으세요:<br>
                     <code style="background: #e5e7eb; padding: 5px 10px; border-radius: 4px; display: inline-block; margin-top: 10px;">
-                        {invitation_link}
+                        $invitation_link
                     </code>
                 </p>
             </div>
@@ -132,21 +84,186 @@ class EmailService:
             </div>
         </body>
         </html>
-        """
-        
-        text_content = f"""
-        안녕하세요 {to_name}님,
+        """)
+
+TEAM_INVITATION_TEXT = Template("""
+        안녕하세요 $to_name님,
         
-        {inviter_name}님이 {company_name}의 R&D 프로젝트 팀에 초대했습니다.
+        $inviter_name님이 $company_name의 R&D 프로젝트 팀에 초대했습니다.
         
         아래 링크를 클릭하여 초대를 수락하고 계정을 생성하세요:
-        {invitation_link}
+        $invitation_link
         
         이 이메일은 R&D SaaS Platform에서 자동으로 발송되었습니다.
         초대를 요청하지 않으셨다면 이 이메일을 무시하세요.
+        """)
+
+
+class EmailService:
+    """Service for sending emails using Gmail SMTP."""
+    
+    def __init__(self):
+        self.smtp_host = settings.SMTP_HOST
+        self.smtp_port = settings.SMTP_PORT
+        self.smtp_user = settings.SMTP_USER
+        self.smtp_password = settings.SMTP_PASSWORD
+        self.from_email = settings.FROM_EMAIL or settings.SMTP_USER
+        self.from_name = settings.FROM_NAME
+    
+    def build_message(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Build a multipart (text + HTML) message."""
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = f"{self.from_name} <{self.from_email}>"
+        msg["To"] = to_email
+        
+        # Add text and HTML parts
+        if text_content:
+            part1 = MIMEText(text_content, "plain")
+            msg.attach(part1)
+        
+        part2 = MIMEText(html_content, "html")
+        msg.attach(part2)
+        return msg
+    
+    def connect(self) -> smtplib.SMTP:
+        """Open an SMTP connection, with STARTTLS and login as configured."""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if settings.SMTP_STARTTLS:
+                server.starttls()
+            if self.smtp_user and self.smtp_password:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+    
+    def send_email(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> bool:
+        """Send an email right away over a new connection.
+        
+        Request handlers should use queue_email instead.
         """
+        try:
+            msg = self.build_message(to_email, subject, html_content, text_content)
+            with self.connect() as server:
+                server.send_message(msg)
+            
+            print(f"Email sent successfully to {to_email}")
+            return True
+        except Exception as e:
+            print(f"Failed to send email to {to_email}. Error: {e}")
+            return False
+    
+    def queue_email(
+        self,
+        db: Session,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> EmailOutboxEx:
+        """Add an email to the outbox; it is sent once the caller commits.
         
-        return self.send_email(to_email, subject, html_content, text_content)
+        Call email_outbox.notify() after the commit to send it without
+        waiting for the next poll.
+        """
+        message = EmailOutboxEx(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+            status="Pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        db.add(message)
+        return message
+    
+    def queue_emails(
+        self,
+        db: Session,
+        messages: List[Tuple[str, str, str, Optional[str]]]
+    ) -> None:
+        """Add many (to_email, subject, html_content, text_content) emails to the outbox in one insert."""
+        if not messages:
+            return
+        now = datetime.utcnow()
+        db.execute(insert(EmailOutboxEx), [
+            {
+                "to_email": to_email,
+                "subject": subject,
+                "html_content": html_content,
+                "text_content": text_content,
+                "status": "Pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for to_email, subject, html_content, text_content in messages
+        ])
+    
+    def send_team_invitation(
+        self,
+        to_email: str,
+        to_name: Optional[str],
+        inviter_name: Optional[str],
+        company_name: str,
+        invitation_link: str
+    ) -> bool:
+        """Send team invitation email."""
+        content = self.team_invitation_content(to_name, inviter_name, company_name, invitation_link)
+        return self.send_email(to_email, *content)
+    
+    def queue_team_invitation(
+        self,
+        db: Session,
+        to_email: str,
+        to_name: Optional[str],
+        inviter_name: Optional[str],
+        company_name: str,
+        invitation_link: str
+    ) -> EmailOutboxEx:
+        """Add a team invitation email to the outbox."""
+        content = self.team_invitation_content(to_name, inviter_name, company_name, invitation_link)
+        return self.queue_email(db, to_email, *content)
+    
+    def team_invitation_content(
+        self,
+        to_name: Optional[str],
+        inviter_name: Optional[str],
+        company_name: str,
+        invitation_link: str
+    ) -> Tuple[str, str, str]:
+        """Subject, HTML and text of a team invitation email.
+
+        users.full_name is nullable; callers pass the email address when a
+        user has no name, and a missing value renders as empty.
+        """
+        values = {
+            "to_name": to_name or "",
+            "inviter_name": inviter_name or "",
+            "company_name": company_name or "",
+            "invitation_link": invitation_link,
+        }
+        escaped = {key: escape(value) for key, value in values.items()}
+        return (
+            TEAM_INVITATION_SUBJECT.substitute(values),
+            TEAM_INVITATION_HTML.substitute(escaped),
+            TEAM_INVITATION_TEXT.substitute(values),
+        )
     
     def send_verification_email(
         self,
@@ -155,6 +272,24 @@ class EmailService:
         verification_link: str
     ) -> bool:
         """Send email verification email."""
+        return self.send_email(to_email, *self.verification_email_content(to_name, verification_link))
+    
+    def queue_verification_email(
+        self,
+        db: Session,
+        to_email: str,
+        to_name: str,
+        verification_link: str
+    ) -> EmailOutboxEx:
+        """Add an email verification email to the outbox."""
+        return self.queue_email(db, to_email, *self.verification_email_content(to_name, verification_link))
+    
+    def verification_email_content(
+        self,
+        to_name: str,
+        verification_link: str
+    ) -> Tuple[str, str, str]:
+        """Subject, HTML and text of an email verification email."""
         subject = "이메일 주소를 인증해주세요"
         
         html_content = f"""
@@ -243,7 +378,7 @@ class EmailService:
         계정을 만들지 않으셨다면 이 이메일을 무시하세요.
         """
         
-        return self.send_email(to_email, subject, html_content, text_content)
+        return subject, html_content, text_content
 
 
 # Singleton instance
@@ -0,0 +1,144 @@
+"""Bulk import of company financials and project history from CSV/XLSX files.
+
+Rows are read one at a time from the uploaded file (which Starlette has
+already spooled to disk), validated with the same schemas as the single-row
+endpoints, and written in multi-row INSERTs of IMPORT_CHUNK_SIZE rows, so
+memory use does not grow with the file. Invalid rows are reported with
+their row number and skipped; the valid ones are still imported.
+"""
+import csv
+import io
+import os
+from typing import Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+try:
+    import openpyxl
+except ImportError:  # optional: only needed for .xlsx uploads
+    openpyxl = None
+
+SUPPORTED_FORMATS = ("csv", "xlsx")
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be read at all (unsupported type, bad header, ...)."""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension in SUPPORTED_FORMATS:
+        return extension
+    if content_type and "spreadsheetml" in content_type:
+        return "xlsx"
+    if content_type and content_type.startswith("text/"):
+        return "csv"
+    raise ImportFormatError("Unsupported file type; upload a .csv or .xlsx file")
+
+
+def _normalize_header(header) -> List[str]:
+    return [str(name).strip().lower() if name is not None else "" for name in header]
+
+
+def _iter_csv(file) -> Iterator[Tuple[int, dict]]:
+    # utf-8-sig drops the BOM Excel writes in front of CSV exports
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise ImportFormatError("The file is empty")
+        columns = _normalize_header(header)
+        for values in reader:
+            yield reader.line_num, dict(zip(columns, values))
+    except UnicodeDecodeError:
+        raise ImportFormatError("CSV files must be UTF-8 encoded")
+    finally:
+        text.detach()
+
+
+def _iter_xlsx(file) -> Iterator[Tuple[int, dict]]:
+    if openpyxl is None:
+        raise ImportFormatError("XLSX import requires the openpyxl package; upload a CSV instead")
+    try:
+        # read_only streams rows from the sheet XML instead of building the workbook
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFormatError("The file is not a valid XLSX workbook")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFormatError("The file is empty")
+        columns = _normalize_header(header)
+        for row_number, values in enumerate(rows, start=2):
+            yield row_number, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def iter_rows(file, file_format: str) -> Iterator[Tuple[int, dict]]:
+    """(row number, {column: value}) for each data row; blank cells are left out."""
+    reader = _iter_xlsx if file_format == "xlsx" else _iter_csv
+    for row_number, raw in reader(file):
+        row = {
+            column: value.strip() if isinstance(value, str) else value
+            for column, value in raw.items()
+            if column and value is not None and value != ""
+        }
+        if row:
+            yield row_number, row
+
+
+def _error_messages(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    ]
+
+
+def import_rows(
+    db: Session,
+    rows: Iterator[Tuple[int, dict]],
+    schema: Type[BaseModel],
+    model,
+    company_id: str
+) -> dict:
+    """Validate and insert rows for a company; the caller commits.
+
+    Returns counts and the first IMPORT_MAX_ERRORS row errors.
+    """
+    table = insert(model)
+    chunk = []
+    imported = failed = 0
+    errors = []
+
+    for row_number, row in rows:
+        try:
+            values = schema(**row).dict()
+        except ValidationError as e:
+            failed += 1
+            if len(errors) < settings.IMPORT_MAX_ERRORS:
+                errors.append({"row": row_number, "errors": _error_messages(e)})
+            continue
+        values["company_id"] = company_id
+        chunk.append(values)
+        if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+            db.execute(table, chunk)
+            imported += len(chunk)
+            chunk = []
+
+    if chunk:
+        db.execute(table, chunk)
+        imported += len(chunk)
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
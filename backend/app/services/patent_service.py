@@ -0,0 +1,147 @@
+"""Patent data: bulk loading registry dumps and per-company counts.
+
+Scoring reads ``CompanyEx.patents_registered`` / ``patents_pending``
+instead of counting patents. The counts are recomputed here, for the
+companies a load touched, in the same transaction as the load.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.company import CompanyEx, PatentEx
+from app.services.company_service import store_company_score
+
+# Registry status (Korean or English) -> stored status
+STATUS_ALIASES = {
+    "등록": "registered",
+    "registered": "registered",
+    "granted": "registered",
+    "출원": "pending",
+    "공개": "pending",
+    "심사중": "pending",
+    "pending": "pending",
+    "published": "pending",
+    "소멸": "expired",
+    "expired": "expired",
+    "거절": "rejected",
+    "rejected": "rejected",
+    "취하": "withdrawn",
+    "포기": "withdrawn",
+    "withdrawn": "withdrawn",
+}
+
+CHUNK_SIZE = 1000
+
+
+def _parse_row(row: dict, company_ids: Dict[str, str]) -> Tuple[Optional[dict], Optional[str]]:
+    """Patent values for a dump row, or an error message."""
+    application_number = str(row.get("application_number") or "").strip()
+    if not application_number:
+        return None, "application_number is required"
+    status = STATUS_ALIASES.get(str(row.get("status") or "").strip().lower())
+    if status is None:
+        return None, f"unknown status {row.get('status')!r}"
+    company_id = company_ids.get(str(row.get("company_id") or row.get("business_id") or "").strip())
+    if company_id is None:
+        return None, "no company matches company_id/business_id"
+    return {
+        "company_id": company_id,
+        "application_number": application_number,
+        "registration_number": str(row["registration_number"]).strip() if row.get("registration_number") else None,
+        "title": str(row.get("title") or "")[:500],
+        "status": status,
+        "application_date": str(row["application_date"]) if row.get("application_date") else None,
+        "registration_date": str(row["registration_date"]) if row.get("registration_date") else None,
+    }, None
+
+
+def _company_ids(db: Session, rows: List[dict]) -> Dict[str, str]:
+    """Map the company_id / business_id values in a chunk to company ids."""
+    keys = {str(row.get("company_id") or row.get("business_id") or "").strip() for row in rows} - {""}
+    if not keys:
+        return {}
+    mapping = {}
+    for company_id, business_id in db.query(CompanyEx.id, CompanyEx.business_id).filter(
+        (CompanyEx.id.in_(keys)) | (CompanyEx.business_id.in_(keys))
+    ):
+        mapping[company_id] = company_id
+        if business_id:
+            mapping[business_id] = company_id
+    return mapping
+
+
+def _load_chunk(db: Session, chunk: List[Tuple[int, dict]], stats: dict, touched: Set[str]) -> None:
+    company_ids = _company_ids(db, [row for _, row in chunk])
+    patents = {}
+    for row_number, row in chunk:
+        values, error = _parse_row(row, company_ids)
+        if error:
+            stats["failed"] += 1
+            if len(stats["errors"]) < 100:
+                stats["errors"].append({"row": row_number, "error": error})
+            continue
+        patents[values["application_number"]] = values  # Later rows for the same number win
+
+    existing = dict(
+        db.query(PatentEx.application_number, PatentEx.id).filter(PatentEx.application_number.in_(patents))
+    )
+    previous_companies = {
+        company_id for (company_id,) in db.query(PatentEx.company_id).filter(PatentEx.id.in_(existing.values()))
+    } if existing else set()
+    inserts = [values for number, values in patents.items() if number not in existing]
+    updates = [dict(values, id=existing[number]) for number, values in patents.items() if number in existing]
+    if inserts:
+        db.execute(insert(PatentEx), inserts)
+    if updates:
+        db.execute(update(PatentEx), updates)
+    stats["inserted"] += len(inserts)
+    stats["updated"] += len(updates)
+    touched.update(values["company_id"] for values in patents.values())
+    touched.update(previous_companies)
+
+
+def refresh_patent_counts(db: Session, company_ids: Iterable[str]) -> None:
+    """Recount patents by status for the given companies and rescore them."""
+    company_ids = list(company_ids)
+    for start in range(0, len(company_ids), CHUNK_SIZE):
+        ids = company_ids[start:start + CHUNK_SIZE]
+        counts = {company_id: {"registered": 0, "pending": 0} for company_id in ids}
+        for company_id, status, count in (
+            db.query(PatentEx.company_id, PatentEx.status, func.count())
+            .filter(PatentEx.company_id.in_(ids), PatentEx.status.in_(("registered", "pending")))
+            .group_by(PatentEx.company_id, PatentEx.status)
+        ):
+            counts[company_id][status] = count
+        companies = (
+            db.query(CompanyEx)
+            .options(selectinload(CompanyEx.financials), selectinload(CompanyEx.projects))
+            .filter(CompanyEx.id.in_(ids))
+            .all()
+        )
+        for company in companies:
+            company.patents_registered = counts[company.id]["registered"]
+            company.patents_pending = counts[company.id]["pending"]
+            store_company_score(company)
+        db.flush()
+
+
+def load_patents(db: Session, rows: Iterator[Tuple[int, dict]]) -> dict:
+    """Insert or update patents from registry dump rows; the caller commits.
+
+    Rows are matched to companies by ``company_id`` or ``business_id`` and
+    to existing patents by ``application_number``.
+    """
+    stats = {"inserted": 0, "updated": 0, "failed": 0, "errors": [], "companies": 0}
+    touched: Set[str] = set()
+    chunk: List[Tuple[int, dict]] = []
+    for row_number, row in rows:
+        chunk.append((row_number, row))
+        if len(chunk) >= CHUNK_SIZE:
+            _load_chunk(db, chunk, stats, touched)
+            chunk = []
+    if chunk:
+        _load_chunk(db, chunk, stats, touched)
+    refresh_patent_counts(db, touched)
+    stats["companies"] = len(touched)
+    return stats
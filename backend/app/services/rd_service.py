@@ -125,10 +125,10 @@ def _calculate_age_score(company_age: int, min_year: int, max_year: int) -> tupl
 
 def _calculate_financial_score(company: CompanyEx) -> tuple[int, str]:
     """Calculate financial health score (max 20 points)."""
-    if not company.financials or len(company.financials) == 0:
+    latest_financial = company.latest_financial
+    if latest_financial is None:
         return 5, "재무 정보 미등록"
     
-    latest_financial = company.financials[0]
     debt_ratio = latest_financial.debt_ratio
     revenue = latest_financial.revenue
     
@@ -155,9 +155,7 @@ def _calculate_financial_score(company: CompanyEx) -> tuple[int, str]:
 
 def _calculate_tech_score(company: CompanyEx) -> tuple[int, str]:
     """Calculate technology level score (max 15 points)."""
-    # Currently using mock patent data
-    # In production, this would query actual patent database
-    patent_count = 0  # In production, this would query actual patent database
+    patent_count = company.patents_registered or 0  # Kept by patent_service, no COUNT here
     
     if patent_count >= 5:
         return 15, "특허 보유 우수"
@@ -194,10 +192,10 @@ def _calculate_history_score(company: CompanyEx) -> tuple[int, str]:
 
 def _calculate_grant_fit_score(company: CompanyEx, grant_amount: int) -> tuple[int, str]:
     """Calculate grant size fit score (max 5 points)."""
-    if not company.financials or len(company.financials) == 0:
+    if company.latest_financial is None:
         return 0, ""
     
-    revenue = company.financials[0].revenue
+    revenue = company.latest_financial.revenue
     
     # Grant should be reasonable compared to company size
     if revenue == 0:
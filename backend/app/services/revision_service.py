@@ -0,0 +1,87 @@
+"""Document revision history stored as periodic snapshots plus deltas."""
+import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session, undefer
+
+from app.core.config import settings
+from app.models.document import DocumentEx, DocumentRevisionEx
+from app.services.text_delta import apply_ops, decode_ops, diff_ops, encode_ops
+
+
+def record_revision(
+    db: Session,
+    doc: DocumentEx,
+    previous_content: Optional[str],
+    author: Optional[str] = None,
+) -> DocumentRevisionEx:
+    """Append a revision for the document's current title and content.
+
+    ``previous_content`` is the body of the latest recorded revision (None
+    for a new document). The caller commits.
+    """
+    if previous_content is None:
+        revision = doc.revision or 1
+    else:
+        revision = (doc.revision or 1) + 1
+    content = doc.content or ""
+
+    # Snapshot on the interval boundary, so reconstruction never applies
+    # more than DOCUMENT_SNAPSHOT_INTERVAL - 1 deltas
+    interval = max(1, settings.DOCUMENT_SNAPSHOT_INTERVAL)
+    is_snapshot = previous_content is None or (revision - 1) % interval == 0
+    data = content
+    if not is_snapshot:
+        data = encode_ops(diff_ops(previous_content, content))
+        # A rewrite of most of the document is cheaper stored in full
+        if len(data) >= len(content):
+            is_snapshot = True
+            data = content
+
+    doc.revision = revision
+    db_revision = DocumentRevisionEx(
+        document_id=doc.id,
+        revision=revision,
+        title=doc.title,
+        is_snapshot=is_snapshot,
+        data=data,
+        size=len(content),
+        created_by=author,
+        created_at=datetime.datetime.now().isoformat(),
+    )
+    db.add(db_revision)
+    return db_revision
+
+
+def list_revisions(db: Session, document_id: int) -> List[DocumentRevisionEx]:
+    """List revision metadata, newest first, without loading any bodies."""
+    return db.query(DocumentRevisionEx).filter(
+        DocumentRevisionEx.document_id == document_id
+    ).order_by(DocumentRevisionEx.revision.desc()).all()
+
+
+def get_revision(db: Session, document_id: int, revision: int) -> Optional[Tuple[DocumentRevisionEx, str]]:
+    """Reconstruct a revision from the nearest snapshot at or before it.
+
+    Returns the revision row and its full content, or None if it does not exist.
+    """
+    snapshot_rev = db.query(DocumentRevisionEx.revision).filter(
+        DocumentRevisionEx.document_id == document_id,
+        DocumentRevisionEx.revision <= revision,
+        DocumentRevisionEx.is_snapshot.is_(True),
+    ).order_by(DocumentRevisionEx.revision.desc()).limit(1).scalar()
+    if snapshot_rev is None:
+        return None
+
+    rows = db.query(DocumentRevisionEx).options(undefer(DocumentRevisionEx.data)).filter(
+        DocumentRevisionEx.document_id == document_id,
+        DocumentRevisionEx.revision >= snapshot_rev,
+        DocumentRevisionEx.revision <= revision,
+    ).order_by(DocumentRevisionEx.revision).all()
+    if not rows or rows[-1].revision != revision:
+        return None
+
+    content = rows[0].data or ""
+    for row in rows[1:]:
+        content = apply_ops(content, decode_ops(row.data))
+    return rows[-1], content
@@ -0,0 +1,351 @@
+"""Full-text search over company documents.
+
+Two interchangeable backends:
+
+- ``MySQLFulltextSearch`` keeps a plain-text copy of each document in
+  ``document_search`` under a FULLTEXT index built with MySQL's ngram parser.
+- ``InMemorySearchIndex`` is a pure-Python BM25 inverted index per company,
+  built lazily from the database on the first search. It serves SQLite and
+  tests, and single-process deployments; each worker process keeps its own
+  copy, so use the MySQL backend when running several workers.
+
+Both are updated incrementally when a document is created or updated: the
+MySQL backend's row is written in the saving transaction, and the
+in-memory index is changed once that transaction commits, so a rolled
+back save never shows up in search results.
+"""
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, undefer
+
+from app.core.config import settings
+from app.models.document import DocumentEx, DocumentSearchEx
+from app.services.document_service import make_preview
+
+SNIPPET_RADIUS = 60
+
+# Session.info key of in-memory index updates waiting for the commit
+_PENDING_KEY = "search_index_pending"
+
+_WORD_RE = re.compile(r"\w+")
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㆎ]")
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+# Title matches count this many times a body match
+_TITLE_WEIGHT = 3
+
+# Terms in more documents than this are "common": they add to the scores of
+# documents found through rarer terms, and a query of common terms only
+# ranks the COMMON_TERM_CANDIDATES best documents of each (kept up to date
+# as documents change). Bounds the work per query at any index size; the
+# ranking of common-only queries is then approximate
+COMMON_TERM_DOCS = 1000
+COMMON_TERM_CANDIDATES = 500
+
+
+@dataclass
+class SearchHit:
+    document_id: int
+    title: str
+    created_at: Optional[str]
+    score: float
+    snippet: str
+
+
+def normalize(value: str) -> str:
+    """Strip markup and fold width/case so queries match stored text."""
+    return unicodedata.normalize("NFKC", make_preview(value, length=None)).lower()
+
+
+def tokenize(value: str) -> Iterator[str]:
+    """Whitespace/word tokens plus character bi-grams of Korean words.
+
+    Korean attaches particles and builds compounds without spaces
+    ("연구개발을"), so bi-grams let "연구개발" or "개발" match inside them.
+    Expects normalized input.
+    """
+    for word in _WORD_RE.findall(value):
+        yield word
+        if len(word) > 2 and _HANGUL_RE.search(word):
+            for i in range(len(word) - 1):
+                yield word[i:i + 2]
+
+
+def make_snippet(body: str, terms: List[str], radius: int = SNIPPET_RADIUS) -> str:
+    """Text window around the earliest query term found in the body."""
+    positions = [pos for pos in (body.find(term) for term in terms) if pos >= 0]
+    if not positions:
+        return body[:radius * 2]
+    pos = min(positions)
+    start = max(0, pos - radius)
+    end = min(len(body), pos + radius)
+    return ("…" if start > 0 else "") + body[start:end] + ("…" if end < len(body) else "")
+
+
+def _query_terms(query: str) -> Tuple[List[str], List[str]]:
+    """Index terms of a query, and the whole words used to place snippets."""
+    normalized = normalize(query)
+    return list(dict.fromkeys(tokenize(normalized))), _WORD_RE.findall(normalized)
+
+
+class _CompanyIndex:
+    """Inverted index for one company's documents."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: Dict[int, int] = {}
+        self.docs: Dict[int, Tuple[str, Optional[str], str]] = {}  # id -> (title, created_at, body)
+        self.total_length = 0
+        # Common term -> min-heap of (score, doc id) of its best documents
+        self.champions: Dict[str, List[Tuple[float, int]]] = {}
+        self._champion_ids: Dict[str, set] = {}
+
+    def _impact(self, tf: int, doc_id: int, avg_length: float) -> float:
+        """A term's BM25 score in a document, before multiplying by its idf."""
+        norm = _K1 * (1 - _B + _B * self.lengths[doc_id] / avg_length)
+        return tf * (_K1 + 1) / (tf + norm)
+
+    def _build_champions(self, term: str) -> None:
+        avg_length = self.total_length / len(self.docs)
+        heap = heapq.nlargest(COMMON_TERM_CANDIDATES, (
+            (self._impact(tf, doc_id, avg_length), doc_id) for doc_id, tf in self.postings[term].items()
+        ))
+        heapq.heapify(heap)
+        self.champions[term] = heap
+        self._champion_ids[term] = {doc_id for _, doc_id in heap}
+
+    def _add_champion(self, term: str, doc_id: int, tf: int) -> None:
+        heap, ids = self.champions[term], self._champion_ids[term]
+        entry = (self._impact(tf, doc_id, self.total_length / len(self.docs)), doc_id)
+        if len(heap) < COMMON_TERM_CANDIDATES:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            ids.discard(heapq.heapreplace(heap, entry)[1])
+        else:
+            return
+        ids.add(doc_id)
+
+    def _remove_champion(self, term: str, doc_id: int) -> None:
+        postings = self.postings.get(term)
+        if postings is None or len(postings) <= COMMON_TERM_DOCS:
+            # Rare again: scored in full
+            del self.champions[term], self._champion_ids[term]
+            return
+        if doc_id not in self._champion_ids[term]:
+            return
+        self._champion_ids[term].discard(doc_id)
+        heap = [entry for entry in self.champions[term] if entry[1] != doc_id]
+        if len(heap) < COMMON_TERM_CANDIDATES // 2:
+            # Removals thinned it out; the next best documents are unknown
+            self._build_champions(term)
+        else:
+            heapq.heapify(heap)
+            self.champions[term] = heap
+
+    def add(self, doc_id: int, title: str, created_at: Optional[str], content: str) -> None:
+        self.remove(doc_id)
+        body = normalize(content)
+        counts = Counter(tokenize(body))
+        for term in tokenize(normalize(title or "")):
+            counts[term] += _TITLE_WEIGHT
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+        self.docs[doc_id] = (title, created_at, body)
+        for term, tf in counts.items():
+            if term in self.champions:
+                self._add_champion(term, doc_id, tf)
+            elif len(self.postings[term]) > COMMON_TERM_DOCS:
+                self._build_champions(term)
+
+    def remove(self, doc_id: int) -> None:
+        if doc_id not in self.docs:
+            return
+        for term in set(tokenize(self.docs[doc_id][2])) | set(tokenize(normalize(self.docs[doc_id][0] or ""))):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+            if term in self.champions:
+                self._remove_champion(term, doc_id)
+        self.total_length -= self.lengths.pop(doc_id)
+        del self.docs[doc_id]
+
+    def search(self, terms: List[str], snippet_terms: List[str], limit: int) -> List[SearchHit]:
+        n = len(self.docs)
+        matched = [(term, self.postings[term]) for term in terms if term in self.postings]
+        if n == 0 or not matched:
+            return []
+        avg_length = self.total_length / n
+
+        rare = [postings for term, postings in matched if term not in self.champions]
+        if rare:
+            candidates = set().union(*rare)
+        else:
+            candidates = set().union(*(self._champion_ids[term] for term, _ in matched))
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for term, postings in matched:
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id in candidates:
+                tf = postings.get(doc_id)
+                if tf:
+                    scores[doc_id] += idf * self._impact(tf, doc_id, avg_length)
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        hits = []
+        for doc_id, score in ranked:
+            title, created_at, body = self.docs[doc_id]
+            hits.append(SearchHit(doc_id, title, created_at, round(score, 4), make_snippet(body, snippet_terms or terms)))
+        return hits
+
+
+class InMemorySearchIndex:
+    """Pure-Python search backend with one lazily built index per company."""
+
+    def __init__(self):
+        self._companies: Dict[str, _CompanyIndex] = {}
+        # company id -> updates committed while its index is being built
+        self._loading: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, company_id: str) -> _CompanyIndex:
+        # The lock only guards the dicts: the documents are read without it,
+        # so a slow query never blocks searches and saves of other companies
+        with self._lock:
+            index = self._companies.get(company_id)
+            if index is not None:
+                return index
+            self._loading.setdefault(company_id, [])
+
+        index = _CompanyIndex()
+        try:
+            docs = db.query(DocumentEx).options(undefer(DocumentEx.content)).filter(
+                DocumentEx.company_id == company_id
+            ).yield_per(500)
+            for doc in docs:
+                index.add(doc.id, doc.title, doc.created_at, doc.content or "")
+        except Exception:
+            with self._lock:
+                self._loading.pop(company_id, None)
+            raise
+
+        with self._lock:
+            existing = self._companies.get(company_id)
+            if existing is not None:
+                # Another search built it first
+                return existing
+            for values in self._loading.pop(company_id, ()):
+                index.add(*values)
+            self._companies[company_id] = index
+            return index
+
+    def index_document(self, db: Session, doc: DocumentEx) -> None:
+        # Values are copied now: after the commit the instance may be expired
+        db.info.setdefault(_PENDING_KEY, []).append(
+            (self, doc.company_id, (doc.id, doc.title, doc.created_at, doc.content or ""))
+        )
+
+    def _apply(self, company_id: str, values: tuple) -> None:
+        with self._lock:
+            index = self._companies.get(company_id)
+            if index is not None:
+                index.add(*values)
+            elif company_id in self._loading:
+                # The build may have read the document before this commit
+                self._loading[company_id].append(values)
+            # Otherwise the company picks the document up when first searched
+
+    def search(self, db: Session, company_id: str, query: str, limit: int) -> List[SearchHit]:
+        terms, snippet_terms = _query_terms(query)
+        if not terms:
+            return []
+        index = self._load(db, company_id)
+        with self._lock:
+            return index.search(terms, snippet_terms, limit)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._companies.clear()
+
+
+class MySQLFulltextSearch:
+    """Search backend on a MySQL FULLTEXT index with the ngram parser."""
+
+    def index_document(self, db: Session, doc: DocumentEx) -> None:
+        db.merge(DocumentSearchEx(
+            document_id=doc.id,
+            company_id=doc.company_id,
+            title=doc.title,
+            body=normalize(doc.content or ""),
+        ))
+
+    def search(self, db: Session, company_id: str, query: str, limit: int) -> List[SearchHit]:
+        terms, snippet_terms = _query_terms(query)
+        if not terms:
+            return []
+        rows = db.execute(text("""
+            SELECT s.document_id, d.title, d.created_at, s.body,
+                   MATCH(s.title, s.body) AGAINST (:query IN NATURAL LANGUAGE MODE) AS score
+            FROM document_search s
+            JOIN documents d ON d.id = s.document_id
+            WHERE s.company_id = :company_id
+              AND MATCH(s.title, s.body) AGAINST (:query IN NATURAL LANGUAGE MODE)
+            ORDER BY score DESC
+            LIMIT :limit
+        """), {"query": normalize(query), "company_id": company_id, "limit": limit}).fetchall()
+        return [
+            SearchHit(doc_id, title, created_at, round(float(score), 4), make_snippet(body or "", snippet_terms or terms))
+            for doc_id, title, created_at, body, score in rows
+        ]
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_index_updates(session: Session) -> None:
+    for backend, company_id, values in session.info.pop(_PENDING_KEY, ()):
+        backend._apply(company_id, values)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending_index_updates(session: Session, transaction) -> None:
+    # Rolled back or closed without committing; a commit has already applied them
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _select_backend():
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        backend = "mysql" if settings.DATABASE_URL.startswith("mysql") else "memory"
+    return MySQLFulltextSearch() if backend == "mysql" else InMemorySearchIndex()
+
+
+search_backend = _select_backend()
+
+
+def index_document(db: Session, doc: DocumentEx) -> None:
+    """Update the search index for a created or updated document.
+
+    Call after the document is flushed and before the caller commits, so the
+    MySQL backend's row lands in the same transaction as the document. The
+    in-memory index takes the change when the session commits.
+    """
+    search_backend.index_document(db, doc)
+
+
+def search_documents(db: Session, company_id: str, query: str, limit: int = 20) -> List[SearchHit]:
+    """Ranked documents of a company matching the query."""
+    return search_backend.search(db, company_id, query, limit)
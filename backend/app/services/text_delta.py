@@ -0,0 +1,234 @@
+"""Compact text deltas.
+
+A delta is a list of operations applied left to right over the source text:
+
+- positive int ``n``: keep the next ``n`` characters
+- negative int ``-n``: delete the next ``n`` characters
+- str ``s``: insert ``s``
+
+Characters not covered by the operations are kept, so ``[5, "x"]`` inserts
+"x" after the fifth character and leaves the rest untouched.
+"""
+import difflib
+import json
+import re
+from typing import List, Union
+
+Op = Union[int, str]
+
+# Chunk boundaries for the middle-region diff: line ends and HTML tag ends,
+# since the editor stores HTML with few or no newlines
+_CHUNK_RE = re.compile(r"(?<=[\n>])")
+
+# Middle regions smaller than this are stored as a single replace
+_MIN_CHUNKED_DIFF = 256
+
+
+class DeltaError(ValueError):
+    """Raised when a delta does not fit the text it is applied to."""
+
+
+def diff_ops(old: str, new: str) -> List[Op]:
+    """Build a delta turning ``old`` into ``new``.
+
+    The common prefix and suffix are trimmed first, which alone gives a
+    minimal delta for the usual single-region edit. What remains is diffed
+    at line/tag granularity so edits far apart do not become one large
+    replace.
+    """
+    if old == new:
+        return []
+
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+
+    ops: List[Op] = [prefix]
+    ops.extend(_diff_middle(old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]))
+    return _compact(ops)
+
+
+def _diff_middle(old: str, new: str) -> List[Op]:
+    if not old or not new or len(old) + len(new) < _MIN_CHUNKED_DIFF:
+        return [-len(old), new]
+
+    old_chunks = _CHUNK_RE.split(old)
+    new_chunks = _CHUNK_RE.split(new)
+    matcher = difflib.SequenceMatcher(None, old_chunks, new_chunks, autojunk=False)
+    ops: List[Op] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(sum(len(c) for c in old_chunks[i1:i2]))
+            continue
+        if tag in ("delete", "replace"):
+            ops.append(-sum(len(c) for c in old_chunks[i1:i2]))
+        if tag in ("insert", "replace"):
+            ops.append("".join(new_chunks[j1:j2]))
+    return ops
+
+
+def _compact(ops: List[Op]) -> List[Op]:
+    """Drop no-op entries, merge neighbours of the same kind and trailing keeps."""
+    out: List[Op] = []
+    for op in ops:
+        if op == 0 or op == "":
+            continue
+        if out and type(out[-1]) is type(op) and (isinstance(op, str) or (out[-1] > 0) == (op > 0)):
+            out[-1] += op
+        else:
+            out.append(op)
+    if out and isinstance(out[-1], int) and out[-1] > 0:
+        out.pop()
+    return out
+
+
+def transform(ops: List[Op], applied: List[Op], base_length: int) -> List[Op]:
+    """Rewrite ``ops`` to apply after ``applied``; both were made on the same base text.
+
+    Where both insert at the same position, ``applied`` (the one the server
+    took first) keeps its text first.
+    """
+    a = iter(_cover(ops, base_length))
+    b = iter(_cover(applied, base_length))
+    op_a, op_b = next(a, None), next(b, None)
+    out: List[Op] = []
+    while op_a is not None or op_b is not None:
+        if isinstance(op_b, str):
+            out.append(len(op_b))  # Keep the text the other side inserted
+            op_b = next(b, None)
+            continue
+        if isinstance(op_a, str):
+            out.append(op_a)
+            op_a = next(a, None)
+            continue
+        if op_a is None or op_b is None:
+            raise DeltaError("Concurrent deltas cover different text lengths")
+
+        n = min(abs(op_a), abs(op_b))
+        if op_a > 0 and op_b > 0:
+            out.append(n)
+        elif op_a < 0 and op_b > 0:
+            out.append(-n)
+        # Text the other side already deleted needs neither a keep nor a delete
+
+        op_a = _advance(op_a, n) or next(a, None)
+        op_b = _advance(op_b, n) or next(b, None)
+    return _compact(out)
+
+
+def _cover(ops: List[Op], base_length: int) -> List[Op]:
+    """Make the implicit trailing keep explicit so ops span the whole base text."""
+    consumed = sum(abs(op) for op in ops if isinstance(op, int))
+    if consumed > base_length:
+        raise DeltaError(f"Delta covers {consumed} characters but the text has {base_length}")
+    if consumed < base_length:
+        return list(ops) + [base_length - consumed]
+    return list(ops)
+
+
+def _advance(op: int, n: int) -> int:
+    """What is left of a keep/delete after consuming ``n`` characters (0 if none)."""
+    return op - n if op > 0 else op + n
+
+
+def apply_ops(text: str, ops: List[Op]) -> str:
+    """Apply a delta to ``text``."""
+    pos = 0
+    out = []
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif isinstance(op, int) and not isinstance(op, bool) and op != 0:
+            count = abs(op)
+            if pos + count > len(text):
+                raise DeltaError(f"Operation {op} at offset {pos} runs past end of text ({len(text)} chars)")
+            if op > 0:
+                out.append(text[pos:pos + count])
+            pos += count
+        else:
+            raise DeltaError(f"Invalid operation: {op!r}")
+    out.append(text[pos:])
+    return "".join(out)
+
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def apply_unified_diff(text: str, diff: str) -> str:
+    """Apply a line-based unified diff (as produced by unified_diff) to ``text``.
+
+    Context and removed lines must match exactly; raises DeltaError otherwise.
+    """
+    source = text.splitlines(keepends=True)
+    out: List[str] = []
+    pos = 0  # Next unconsumed source line
+    lines = diff.splitlines(keepends=True)
+    i = 0
+    while i < len(lines) and not lines[i].startswith("@@"):
+        i += 1  # Skip ---/+++ headers
+    if i == len(lines) and diff.strip():
+        raise DeltaError("Diff contains no hunks")
+
+    while i < len(lines):
+        match = _HUNK_RE.match(lines[i])
+        if not match:
+            raise DeltaError(f"Malformed hunk header: {lines[i].rstrip()!r}")
+        start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        # An empty old range is reported at the line before the insertion
+        hunk_start = start - 1 if old_count else start
+        if hunk_start < pos or hunk_start > len(source):
+            raise DeltaError(f"Hunk at line {start} is out of order or past end of text")
+        out.extend(source[pos:hunk_start])
+        pos = hunk_start
+        i += 1
+
+        while i < len(lines) and not lines[i].startswith("@@"):
+            line = lines[i]
+            tag, body = line[:1], line[1:]
+            if i + 1 < len(lines) and lines[i + 1].startswith("\\"):
+                body = body.rstrip("\n")  # "\ No newline at end of file"
+            if tag in (" ", "-"):
+                if pos >= len(source) or source[pos] != body:
+                    raise DeltaError(f"Diff does not match text at line {pos + 1}")
+                if tag == " ":
+                    out.append(body)
+                pos += 1
+            elif tag == "+":
+                out.append(body)
+            elif tag != "\\":
+                raise DeltaError(f"Malformed diff line: {line.rstrip()!r}")
+            i += 1
+
+    out.extend(source[pos:])
+    return "".join(out)
+
+
+def encode_ops(ops: List[Op]) -> str:
+    """Serialize a delta as compact JSON."""
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_ops(data: str) -> List[Op]:
+    """Inverse of encode_ops."""
+    return json.loads(data)
+
+
+def unified_diff(old: str, new: str, from_label: str = "a", to_label: str = "b") -> str:
+    """Line-based unified diff between two texts."""
+    out = []
+    for line in difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile=from_label,
+        tofile=to_label,
+    ):
+        out.append(line)
+        if not line.endswith("\n"):
+            out.append("\n\\ No newline at end of file\n")
+    return "".join(out)
@@ -0,0 +1,120 @@
+"""Add stored score columns to companies and backfill them.
+
+Safe to re-run: existing columns and the index are skipped, and the
+backfill recomputes every company's score (use it after changing the
+scoring rules too).
+"""
+import os
+import sys
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import load_only, sessionmaker, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.models.company import CompanyEx
+from app.services.company_service import store_company_score
+from migrations.schema import existing_columns
+
+BATCH_SIZE = 200
+
+
+def run_migration():
+    """Add score columns and the ranking index, then backfill scores."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    migrations = [
+        ("score_total", "ALTER TABLE companies ADD COLUMN score_total INT NULL"),
+        ("score_grade", "ALTER TABLE companies ADD COLUMN score_grade VARCHAR(2) NULL"),
+        ("score_financial", "ALTER TABLE companies ADD COLUMN score_financial INT NULL"),
+        ("score_technology", "ALTER TABLE companies ADD COLUMN score_technology INT NULL"),
+        ("score_experience", "ALTER TABLE companies ADD COLUMN score_experience INT NULL"),
+    ]
+
+    with engine.connect() as conn:
+        existing = set(conn.execute(text("""
+            SELECT COLUMN_NAME
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'companies'
+        """)).scalars())
+
+        for i, (column, migration) in enumerate(migrations, 1):
+            if column in existing:
+                print(f"⊙ Migration {i}/{len(migrations)}: Column companies.{column} already exists, skipping")
+                continue
+            print(f"Running migration {i}/{len(migrations)}: Adding companies.{column}...")
+            conn.execute(text(migration))
+            conn.commit()
+            print(f"✓ Migration {i} completed successfully")
+
+        index_exists = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'companies'
+            AND INDEX_NAME = 'ix_companies_score_total'
+        """)).scalar()
+        if index_exists:
+            print("⊙ Index ix_companies_score_total already exists, skipping")
+        else:
+            conn.execute(text("CREATE INDEX ix_companies_score_total ON companies (score_total)"))
+            conn.commit()
+            print("✓ Created index ix_companies_score_total")
+
+    print("\nBackfilling scores...")
+    backfill_scores(engine)
+
+    print("\n✅ Migration completed!")
+
+
+def backfill_scores(engine):
+    """Recompute and store every company's score, a batch per transaction.
+
+    Only the company columns that exist are loaded, so this also runs on a
+    database that create_patents (migration 11) has not reached yet: the
+    patent counts are then taken as 0, and that migration rescores.
+    """
+    with engine.connect() as conn:
+        has_patent_counts = "patents_registered" in existing_columns(conn).get("companies", set())
+    columns = [CompanyEx.id]
+    if has_patent_counts:
+        columns += [CompanyEx.patents_registered, CompanyEx.patents_pending]
+
+    Session = sessionmaker(bind=engine)
+    updated = 0
+    last_id = ""
+    while True:
+        db = Session()
+        try:
+            companies = (
+                db.query(CompanyEx)
+                .options(
+                    load_only(*columns),
+                    selectinload(CompanyEx.financials),
+                    selectinload(CompanyEx.projects),
+                )
+                .filter(CompanyEx.id > last_id)
+                .order_by(CompanyEx.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not companies:
+                break
+            for company in companies:
+                if not has_patent_counts:
+                    set_committed_value(company, "patents_registered", 0)
+                    set_committed_value(company, "patents_pending", 0)
+                store_company_score(company)
+            # Before the commit expires it, which would reload every column
+            last_id = companies[-1].id
+            db.commit()
+            updated += len(companies)
+        finally:
+            db.close()
+    print(f"✓ Backfilled {updated} companies")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,84 @@
+"""Add document revision history: documents.revision and the document_revisions table."""
+import datetime
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.compression import decompress_text
+from app.models.document import DocumentRevisionEx
+
+BATCH_SIZE = 500
+
+
+def run_migration():
+    """Create the revision table and seed a baseline snapshot for every document."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.connect() as conn:
+        exists = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'documents'
+            AND COLUMN_NAME = 'revision'
+        """)).scalar()
+        if exists:
+            print("⊙ Column documents.revision already exists, skipping")
+        else:
+            print("Adding documents.revision...")
+            conn.execute(text("ALTER TABLE documents ADD COLUMN revision INT NOT NULL DEFAULT 1"))
+            conn.commit()
+            print("✓ Added documents.revision")
+
+    print("Creating document_revisions table...")
+    DocumentRevisionEx.__table__.create(engine, checkfirst=True)
+    print("✓ document_revisions table ready")
+
+    with engine.connect() as conn:
+        # Documents saved before history existed get their current body as revision 1
+        now = datetime.datetime.now().isoformat()
+        seeded = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(text("""
+                SELECT d.id, d.title, d.content
+                FROM documents d
+                LEFT JOIN document_revisions r ON r.document_id = d.id
+                WHERE r.id IS NULL AND d.id > :last_id
+                ORDER BY d.id
+                LIMIT :limit
+            """), {"last_id": last_id, "limit": BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+
+            # documents.content and document_revisions.data share the same encoding
+            conn.execute(text("""
+                INSERT INTO document_revisions
+                    (document_id, revision, title, is_snapshot, data, size, created_at)
+                VALUES (:document_id, 1, :title, 1, :data, :size, :created_at)
+            """), [
+                {
+                    "document_id": doc_id,
+                    "title": title,
+                    "data": content,
+                    "size": len(decompress_text(bytes(content))) if content is not None else 0,
+                    "created_at": now,
+                }
+                for doc_id, title, content in rows
+            ])
+            ids = ",".join(str(int(doc_id)) for doc_id, _, _ in rows)
+            conn.execute(text(f"UPDATE documents SET revision = 1 WHERE id IN ({ids})"))
+            conn.commit()
+            seeded += len(rows)
+            last_id = rows[-1][0]
+
+        print(f"✓ Seeded baseline snapshots for {seeded} documents")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
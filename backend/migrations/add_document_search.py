@@ -0,0 +1,63 @@
+"""Create the document_search table with its ngram FULLTEXT index and backfill it."""
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.compression import decompress_text
+from app.models.document import DocumentSearchEx
+from app.services.search_service import normalize
+
+BATCH_SIZE = 500
+
+
+def run_migration():
+    """Create document_search (FULLTEXT WITH PARSER ngram) and index existing documents."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    print("Creating document_search table...")
+    # The after_create hook on the table adds the FULLTEXT index
+    DocumentSearchEx.__table__.create(engine, checkfirst=True)
+    print("✓ document_search table ready")
+
+    with engine.connect() as conn:
+        indexed = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(text("""
+                SELECT d.id, d.company_id, d.title, d.content
+                FROM documents d
+                LEFT JOIN document_search s ON s.document_id = d.id
+                WHERE s.document_id IS NULL AND d.id > :last_id
+                ORDER BY d.id
+                LIMIT :limit
+            """), {"last_id": last_id, "limit": BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+
+            conn.execute(text("""
+                INSERT INTO document_search (document_id, company_id, title, body)
+                VALUES (:document_id, :company_id, :title, :body)
+            """), [
+                {
+                    "document_id": doc_id,
+                    "company_id": company_id,
+                    "title": title,
+                    "body": normalize(decompress_text(bytes(blob))) if blob is not None else "",
+                }
+                for doc_id, company_id, title, blob in rows
+            ])
+            conn.commit()
+            indexed += len(rows)
+            last_id = rows[-1][0]
+            print(f"  indexed {indexed} documents...")
+
+        print(f"✓ Indexed {indexed} documents")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,82 @@
+"""Add documents.size/preview summary columns and the keyset pagination index."""
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.compression import decompress_text
+from app.services.document_service import make_preview
+
+BATCH_SIZE = 500
+
+
+def run_migration():
+    """Add summary columns, backfill them from content and create the index."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    migrations = [
+        ("size", "ALTER TABLE documents ADD COLUMN size INT DEFAULT 0"),
+        ("preview", "ALTER TABLE documents ADD COLUMN preview VARCHAR(200) DEFAULT ''"),
+    ]
+
+    with engine.connect() as conn:
+        existing = set(conn.execute(text("""
+            SELECT COLUMN_NAME
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'documents'
+        """)).scalars())
+
+        for i, (column, migration) in enumerate(migrations, 1):
+            if column in existing:
+                print(f"⊙ Migration {i}/{len(migrations)}: Column documents.{column} already exists, skipping")
+                continue
+            print(f"Running migration {i}/{len(migrations)}: Adding documents.{column}...")
+            conn.execute(text(migration))
+            conn.commit()
+            print(f"✓ Migration {i} completed successfully")
+
+        print("\nBackfilling summaries...")
+        updated = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                text("SELECT id, content FROM documents WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+
+            params = []
+            for doc_id, blob in rows:
+                content = decompress_text(bytes(blob)) if blob is not None else ""
+                params.append({"id": doc_id, "size": len(content), "preview": make_preview(content)})
+            conn.execute(text("UPDATE documents SET size = :size, preview = :preview WHERE id = :id"), params)
+            conn.commit()
+            updated += len(rows)
+            last_id = rows[-1][0]
+        print(f"✓ Backfilled {updated} documents")
+
+        index_exists = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'documents'
+            AND INDEX_NAME = 'ix_documents_company_created'
+        """)).scalar()
+        if index_exists:
+            print("⊙ Index ix_documents_company_created already exists, skipping")
+        else:
+            conn.execute(text(
+                "CREATE INDEX ix_documents_company_created ON documents (company_id, created_at, id)"
+            ))
+            conn.commit()
+            print("✓ Created index ix_documents_company_created")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,34 @@
+"""Add the (company_id, year) index on financials."""
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+
+def run_migration():
+    """Create ix_financials_company_year if it is missing."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.connect() as conn:
+        index_exists = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'financials'
+            AND INDEX_NAME = 'ix_financials_company_year'
+        """)).scalar()
+        if index_exists:
+            print("⊙ Index ix_financials_company_year already exists, skipping")
+        else:
+            conn.execute(text("CREATE INDEX ix_financials_company_year ON financials (company_id, year)"))
+            conn.commit()
+            print("✓ Created index ix_financials_company_year")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,37 @@
+"""Add indexes on the foreign keys and lookup columns hot queries filter on.
+
+documents.company_id and financials.company_id are covered by the leading
+column of ix_documents_company_created and ix_financials_company_year;
+they are ensured here too for databases that skipped those migrations.
+"""
+import os
+import sys
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from migrations.schema import ensure_indexes
+
+INDEXES = [
+    ("ix_documents_company_created", "documents", ("company_id", "created_at", "id")),
+    ("ix_financials_company_year", "financials", ("company_id", "year")),
+    ("ix_team_members_company_email", "team_members", ("company_id", "email")),
+    ("ix_team_members_email", "team_members", ("email",)),
+    ("ix_project_histories_company", "project_histories", ("company_id",)),
+    ("ix_rd_notices_sector", "rd_notices", ("sector",)),
+]
+
+
+def run_migration():
+    """Create the missing hot-path indexes."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.connect() as conn:
+        ensure_indexes(conn, INDEXES)
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
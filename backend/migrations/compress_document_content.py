@@ -0,0 +1,107 @@
+"""Move documents.content from VARCHAR(10000) to a compressed LONGBLOB column."""
+import os
+import sys
+import time
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.compression import compress_text, decompress_text
+
+BATCH_SIZE = 500
+
+
+def run_migration():
+    """Compress existing document bodies and report storage saved and read latency."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    with engine.connect() as conn:
+        column_type = conn.execute(text("""
+            SELECT DATA_TYPE
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'documents'
+            AND COLUMN_NAME = 'content'
+        """)).scalar()
+
+        if column_type is None:
+            print("⊙ documents.content does not exist, nothing to migrate")
+            return
+        if column_type.lower() == "longblob":
+            print("⊙ documents.content is already compressed, skipping")
+            return
+
+        staging_exists = conn.execute(text("""
+            SELECT COUNT(*)
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'documents'
+            AND COLUMN_NAME = 'content_z'
+        """)).scalar()
+        if staging_exists:
+            # Left by an interrupted run; every row is compressed again below
+            print("⊙ documents.content_z already exists, reusing it")
+        else:
+            print("Adding documents.content_z...")
+            conn.execute(text("ALTER TABLE documents ADD COLUMN content_z LONGBLOB NULL"))
+            conn.commit()
+
+        raw_bytes = 0
+        stored_bytes = 0
+        migrated = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                text("SELECT id, content FROM documents WHERE id > :last_id ORDER BY id LIMIT :limit"),
+                {"last_id": last_id, "limit": BATCH_SIZE},
+            ).fetchall()
+            if not rows:
+                break
+
+            params = []
+            for doc_id, content in rows:
+                blob = compress_text(content) if content is not None else None
+                if content is not None:
+                    raw_bytes += len(content.encode("utf-8"))
+                    stored_bytes += len(blob)
+                params.append({"id": doc_id, "blob": blob})
+
+            conn.execute(text("UPDATE documents SET content_z = :blob WHERE id = :id"), params)
+            conn.commit()
+            migrated += len(rows)
+            last_id = rows[-1][0]
+            print(f"  compressed {migrated} documents...")
+
+        print("Swapping columns...")
+        conn.execute(text("ALTER TABLE documents DROP COLUMN content"))
+        conn.execute(text("ALTER TABLE documents CHANGE COLUMN content_z content LONGBLOB NULL"))
+        conn.commit()
+        print(f"✓ Migrated {migrated} documents")
+
+        # Storage report
+        if raw_bytes:
+            saved = raw_bytes - stored_bytes
+            print(f"\nStorage: {raw_bytes:,} bytes → {stored_bytes:,} bytes "
+                  f"({saved:,} saved, {saved / raw_bytes:.1%})")
+
+        # Read latency report: time single-document reads including decompression
+        sample = conn.execute(text("SELECT id FROM documents ORDER BY id DESC LIMIT 100")).scalars().all()
+        if sample:
+            timings = []
+            for doc_id in sample:
+                start = time.perf_counter()
+                blob = conn.execute(text("SELECT content FROM documents WHERE id = :id"), {"id": doc_id}).scalar()
+                if blob is not None:
+                    decompress_text(bytes(blob))
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p50 = timings[len(timings) // 2]
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"Read latency over {len(timings)} documents: p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,44 @@
+"""Create email_outbox table for background email delivery."""
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+def run_migration():
+    """Create email_outbox table."""
+    engine = create_engine(settings.DATABASE_URL)
+    
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        to_email VARCHAR(100) NOT NULL,
+        subject VARCHAR(255) NOT NULL,
+        html_content TEXT NOT NULL,
+        text_content TEXT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+        attempts INT NOT NULL DEFAULT 0,
+        next_attempt_at DATETIME NOT NULL,
+        claim_token VARCHAR(32) NULL,
+        last_error VARCHAR(500) NULL,
+        created_at DATETIME NOT NULL,
+        sent_at DATETIME NULL,
+        INDEX ix_email_outbox_status_due (status, next_attempt_at)
+    )
+    """
+    
+    with engine.connect() as conn:
+        try:
+            print("Creating email_outbox table...")
+            conn.execute(text(create_table_sql))
+            conn.commit()
+            print("✓ email_outbox table created successfully")
+        except Exception as e:
+            print(f"⊙ Table creation: {e}")
+    
+    print("\n✅ Migration completed!")
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,88 @@
+"""Create the patents table and the per-company patent count columns.
+
+Afterwards load data with scripts/load_patents.py. Scores are recomputed
+here because the technology score now depends on the patent counts.
+"""
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from migrations.add_company_scores import backfill_scores
+
+
+def run_migration():
+    """Create patents, add companies.patents_registered/pending, refresh counts and scores."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS patents (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        company_id VARCHAR(36) NOT NULL,
+        application_number VARCHAR(30) NOT NULL UNIQUE,
+        registration_number VARCHAR(30) NULL,
+        title VARCHAR(500) NULL,
+        status VARCHAR(20) NOT NULL,
+        application_date VARCHAR(20) NULL,
+        registration_date VARCHAR(20) NULL,
+        INDEX ix_patents_company_status (company_id, status),
+        FOREIGN KEY (company_id) REFERENCES companies(id)
+    )
+    """
+
+    migrations = [
+        ("patents_registered", "ALTER TABLE companies ADD COLUMN patents_registered INT NOT NULL DEFAULT 0"),
+        ("patents_pending", "ALTER TABLE companies ADD COLUMN patents_pending INT NOT NULL DEFAULT 0"),
+    ]
+
+    with engine.connect() as conn:
+        try:
+            print("Creating patents table...")
+            conn.execute(text(create_table_sql))
+            conn.commit()
+            print("✓ patents table created successfully")
+        except Exception as e:
+            print(f"⊙ Table creation: {e}")
+
+        existing = set(conn.execute(text("""
+            SELECT COLUMN_NAME
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'companies'
+        """)).scalars())
+
+        for i, (column, migration) in enumerate(migrations, 1):
+            if column in existing:
+                print(f"⊙ Migration {i}/{len(migrations)}: Column companies.{column} already exists, skipping")
+                continue
+            print(f"Running migration {i}/{len(migrations)}: Adding companies.{column}...")
+            conn.execute(text(migration))
+            conn.commit()
+            print(f"✓ Migration {i} completed successfully")
+
+        print("\nRecounting patents...")
+        conn.execute(text("""
+            UPDATE companies c
+            LEFT JOIN (
+                SELECT company_id,
+                       SUM(status = 'registered') AS registered,
+                       SUM(status = 'pending') AS pending
+                FROM patents
+                GROUP BY company_id
+            ) p ON p.company_id = c.id
+            SET c.patents_registered = COALESCE(p.registered, 0),
+                c.patents_pending = COALESCE(p.pending, 0)
+        """))
+        conn.commit()
+        print("✓ Patent counts refreshed")
+
+    print("\nRecomputing scores...")
+    backfill_scores(engine)
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,71 @@
+"""Create company_metrics and sector_benchmarks tables and build the benchmarks.
+
+Safe to re-run: the tables are created if missing and the benchmarks are
+rebuilt from the current financials and projects (use it after changing
+how metrics are derived, too).
+"""
+import os
+import sys
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.benchmark_service import rebuild_sector_benchmarks
+
+
+def run_migration():
+    """Create the benchmark tables and rebuild their contents."""
+    engine = create_engine(settings.DATABASE_URL)
+
+    tables = [
+        ("company_metrics", """
+        CREATE TABLE IF NOT EXISTS company_metrics (
+            company_id VARCHAR(36) PRIMARY KEY,
+            sector VARCHAR(100) NULL,
+            revenue DOUBLE NULL,
+            operating_profit DOUBLE NULL,
+            debt_ratio DOUBLE NULL,
+            growth DOUBLE NULL,
+            project_success_rate DOUBLE NULL,
+            INDEX ix_company_metrics_sector (sector),
+            FOREIGN KEY (company_id) REFERENCES companies(id)
+        )
+        """),
+        ("sector_benchmarks", """
+        CREATE TABLE IF NOT EXISTS sector_benchmarks (
+            sector VARCHAR(100) NOT NULL,
+            metric VARCHAR(50) NOT NULL,
+            sketch TEXT NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            updated_at DATETIME NULL,
+            PRIMARY KEY (sector, metric)
+        )
+        """),
+    ]
+
+    with engine.connect() as conn:
+        for table, create_table_sql in tables:
+            try:
+                print(f"Creating {table} table...")
+                conn.execute(text(create_table_sql))
+                conn.commit()
+                print(f"✓ {table} table created successfully")
+            except Exception as e:
+                print(f"⊙ Table creation: {e}")
+
+    print("\nRebuilding sector benchmarks...")
+    db = sessionmaker(bind=engine)()
+    try:
+        processed = rebuild_sector_benchmarks(db)
+        db.commit()
+        print(f"✓ Benchmarked {processed} companies")
+    finally:
+        db.close()
+
+    print("\n✅ Migration completed!")
+
+
+if __name__ == "__main__":
+    run_migration()
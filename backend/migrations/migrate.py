@@ -0,0 +1,140 @@
+"""Versioned schema migrations.
+
+    python migrations/migrate.py              # apply pending migrations in order
+    python migrations/migrate.py status       # recorded version and pending migrations
+    python migrations/migrate.py baseline 11  # record 1..11 as applied without running them
+    python migrations/migrate.py check        # EXPLAIN the hot queries; exit 1 if one scans
+
+Each migration is a script in this directory with a ``run_migration()``
+that is safe to re-run. The applied versions are recorded in the
+``schema_migrations`` table, so each one runs once per database. A
+database brought up to date by running the scripts by hand should be
+baselined at the last version it has, and one created by
+``Base.metadata.create_all`` at the latest version.
+
+New migrations are appended to MIGRATIONS; never renumber or reorder it.
+"""
+import argparse
+import importlib
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+# (version, script in migrations/)
+MIGRATIONS = [
+    (1, "create_pending_users"),
+    (2, "add_email_verification"),
+    (3, "compress_document_content"),
+    (4, "add_document_revisions"),
+    (5, "add_document_summaries"),
+    (6, "add_document_search"),
+    (7, "create_email_outbox"),
+    (8, "add_financials_company_year_index"),
+    (9, "add_company_scores"),
+    (10, "create_sector_benchmarks"),
+    (11, "create_patents"),
+    (12, "add_hot_path_indexes"),
+]
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    conn.commit()
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def record(conn, version: int, name: str) -> None:
+    conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+    conn.commit()
+
+
+def upgrade(engine) -> bool:
+    """Run every migration not recorded yet, stopping at the first failure."""
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    pending = [(version, name) for version, name in MIGRATIONS if version not in applied]
+    if not pending:
+        print(f"⊙ Schema is up to date (version {max(applied, default=0)})")
+        return True
+
+    for version, name in pending:
+        print(f"\n=== Migration {version}: {name} ===")
+        try:
+            importlib.import_module(f"migrations.{name}").run_migration()
+        except Exception as e:
+            print(f"❌ Migration {version} ({name}) failed: {e}")
+            return False
+        with engine.connect() as conn:
+            record(conn, version, name)
+        print(f"✓ Schema version {version}")
+
+    print(f"\n✅ Schema is at version {pending[-1][0]}")
+    return True
+
+
+def status(engine) -> None:
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    print(f"Schema version: {max(applied, default=0)}")
+    for version, name in MIGRATIONS:
+        print(f"  {'✓' if version in applied else '·'} {version:>3} {name}")
+
+
+def baseline(engine, up_to: int) -> None:
+    """Record migrations up to a version as applied, for databases migrated by hand."""
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+        for version, name in MIGRATIONS:
+            if version <= up_to and version not in applied:
+                record(conn, version, name)
+                print(f"✓ Recorded {version} {name}")
+    print(f"\n✅ Baselined at version {up_to}")
+
+
+def check(engine) -> bool:
+    from migrations.query_plans import check_query_plans
+
+    with engine.connect() as conn:
+        failures = check_query_plans(conn)
+    if failures:
+        print(f"\n❌ {len(failures)} hot queries scan a whole table: {', '.join(failures)}")
+        return False
+    print("\n✅ Every hot query uses an index")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "baseline", "check"])
+    parser.add_argument("version", nargs="?", type=int, help="Last version to record (baseline)")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    if args.command == "status":
+        status(engine)
+    elif args.command == "baseline":
+        if args.version is None:
+            parser.error("baseline needs the version the database is at")
+        baseline(engine, args.version)
+    elif args.command == "check":
+        sys.exit(0 if check(engine) else 1)
+    else:
+        sys.exit(0 if upgrade(engine) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Schema inspection and idempotent DDL for migration scripts.
+
+Columns and indexes are read for the whole database in one query each,
+instead of one information_schema query per column or index.
+"""
+from typing import Dict, Iterable, Set, Tuple
+
+from sqlalchemy import inspect, text
+
+
+def existing_columns(conn) -> Dict[str, Set[str]]:
+    """{table: {column, ...}} for every table in the database."""
+    if conn.dialect.name == "mysql":
+        rows = conn.execute(text("""
+            SELECT TABLE_NAME, COLUMN_NAME
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """))
+    else:
+        inspector = inspect(conn)
+        rows = [
+            (table, column["name"])
+            for table in inspector.get_table_names()
+            for column in inspector.get_columns(table)
+        ]
+    columns: Dict[str, Set[str]] = {}
+    for table, column in rows:
+        columns.setdefault(table, set()).add(column)
+    return columns
+
+
+def existing_indexes(conn) -> Dict[str, Set[str]]:
+    """{table: {index name, ...}} for every table in the database."""
+    if conn.dialect.name == "mysql":
+        rows = conn.execute(text("""
+            SELECT DISTINCT TABLE_NAME, INDEX_NAME
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """))
+    else:
+        inspector = inspect(conn)
+        rows = [
+            (table, index["name"])
+            for table in inspector.get_table_names()
+            for index in inspector.get_indexes(table)
+        ]
+    indexes: Dict[str, Set[str]] = {}
+    for table, name in rows:
+        indexes.setdefault(table, set()).add(name)
+    return indexes
+
+
+def ensure_indexes(conn, indexes: Iterable[Tuple[str, str, Tuple[str, ...]]]) -> None:
+    """Create each (name, table, columns) index that does not exist yet."""
+    indexes = list(indexes)
+    tables = existing_columns(conn)
+    present = existing_indexes(conn)
+    for i, (name, table, columns) in enumerate(indexes, 1):
+        if table not in tables:
+            print(f"⊙ Index {i}/{len(indexes)}: Table {table} does not exist, skipping {name}")
+            continue
+        if name in present.get(table, set()):
+            print(f"⊙ Index {i}/{len(indexes)}: {name} already exists, skipping")
+            continue
+        conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+        conn.commit()
+        print(f"✓ Index {i}/{len(indexes)}: Created {name} on {table} ({', '.join(columns)})")
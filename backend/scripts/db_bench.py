@@ -0,0 +1,186 @@
+"""Compare sync and async route throughput under high concurrency.
+
+Serves two copies of the same read route (the /companies/{id} query: a
+company with its financials and projects) on a local uvicorn server:
+
+- ``/sync/{company_id}``: a ``def`` handler on SessionLocal, which FastAPI
+  runs on its threadpool (40 threads by default)
+- ``/async/{company_id}``: an ``async def`` handler on AsyncSessionLocal
+
+and drives each with the given number of concurrent clients, reporting
+requests per second and latency percentiles as JSON:
+
+    python scripts/db_bench.py --company-id <id> --concurrency 50,200,500 --duration 10
+
+The database is the one in DATABASE_URL. ``--db-latency`` adds a
+``SELECT SLEEP()`` to every request (MySQL only) to stand in for a remote
+database, which is where the threadpool cap shows: sync throughput stops
+at about threads / latency requests per second. Give the connection pools
+room for the concurrency under test (or the pool becomes the limit for
+both), and run against a database with data in it.
+
+Requires the httpx package.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import async_engine, engine, get_async_db, get_db
+from app.services.company_service import company_response, get_company, get_company_async
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def build_app(db_latency: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync/{company_id}")
+    def sync_company(company_id: str, db: Session = Depends(get_db)):
+        if db_latency:
+            db.execute(text("SELECT SLEEP(:s)"), {"s": db_latency})
+        company = get_company(db, company_id)
+        if company is None:
+            raise HTTPException(status_code=404)
+        return company_response(company)
+
+    @app.get("/async/{company_id}")
+    async def async_company(company_id: str, db: AsyncSession = Depends(get_async_db)):
+        if db_latency:
+            await db.execute(text("SELECT SLEEP(:s)"), {"s": db_latency})
+        company = await get_company_async(db, company_id)
+        if company is None:
+            raise HTTPException(status_code=404)
+        return company_response(company)
+
+    @app.on_event("shutdown")
+    async def dispose_async_engine():
+        # Its connections belong to the server's event loop
+        await async_engine.dispose()
+
+    return app
+
+
+def start_server(app: FastAPI) -> tuple:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * p))], 2)
+
+
+async def run_load(url: str, concurrency: int, duration: float, warmup: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: List[float] = []
+    errors = 0
+    measuring = False
+
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        async def worker(deadline: float):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if measuring:
+                    if ok:
+                        latencies.append((time.perf_counter() - started) * 1000)
+                    else:
+                        errors += 1
+
+        deadline = time.perf_counter() + warmup + duration
+        tasks = [asyncio.create_task(worker(deadline)) for _ in range(concurrency)]
+        await asyncio.sleep(warmup)
+        measuring = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - measured_from
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async route throughput")
+    parser.add_argument("--company-id", required=True, help="Company to load on every request")
+    parser.add_argument("--concurrency", default="50,200,500", help="Comma-separated client counts to try")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of load before measuring")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Seconds of SELECT SLEEP() per request (MySQL)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if httpx is None:
+        print("❌ httpx is required: pip install httpx")
+        sys.exit(1)
+    if args.db_latency and engine.dialect.name != "mysql":
+        print("❌ --db-latency needs a MySQL DATABASE_URL")
+        sys.exit(1)
+
+    server, thread, base_url = start_server(build_app(args.db_latency))
+    report = {"database": engine.dialect.name, "db_latency": args.db_latency, "runs": []}
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            for mode in ("sync", "async"):
+                print(f"🚀 {mode}, {concurrency} concurrent clients...")
+                result = asyncio.run(run_load(
+                    f"{base_url}/{mode}/{args.company_id}", concurrency, args.duration, args.warmup
+                ))
+                result["mode"] = mode
+                report["runs"].append(result)
+                print(f"   {result['rps']} req/s, p50 {result['p50_ms']} ms, "
+                      f"p99 {result['p99_ms']} ms, {result['errors']} errors")
+    finally:
+        server.should_exit = True
+        thread.join()
+        engine.dispose()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"✅ Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
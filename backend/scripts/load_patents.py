@@ -0,0 +1,61 @@
+"""Load patent registry dumps (CSV or XLSX) into the patents table.
+
+    python scripts/load_patents.py dumps/patents-2024.csv dumps/patents-2025.xlsx
+
+Columns: application_number, status, company_id or business_id, and
+optionally title, registration_number, application_date,
+registration_date. Status may be Korean (등록, 출원, 공개, 심사중, 소멸,
+거절, 취하, 포기) or English (registered, pending, expired, rejected,
+withdrawn).
+
+Patents are matched by application_number, so re-loading a newer dump
+updates them in place. Each file is loaded in one transaction, after which
+the registered/pending counts and stored scores of the companies it
+touched are refreshed.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.import_service import ImportFormatError, detect_format, iter_rows
+from app.services.patent_service import load_patents
+
+
+def load_file(path: str) -> bool:
+    print(f"📄 Loading {path}...")
+    db = SessionLocal()
+    try:
+        with open(path, "rb") as f:
+            stats = load_patents(db, iter_rows(f, detect_format(path, None)))
+        db.commit()
+    except ImportFormatError as e:
+        db.rollback()
+        print(f"❌ {path}: {e}")
+        return False
+    finally:
+        db.close()
+
+    print(f"✓ {stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['failed']} skipped; {stats['companies']} companies recounted")
+    for error in stats["errors"][:20]:
+        print(f"  ⊙ row {error['row']}: {error['error']}")
+    if stats["failed"] > 20:
+        print(f"  ⊙ ... and {stats['failed'] - 20} more skipped rows")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="CSV or XLSX patent dumps")
+    args = parser.parse_args()
+
+    ok = all([load_file(path) for path in args.files])
+    print("\n✅ Patent load completed!" if ok else "\n⚠️  Some files could not be loaded")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Local SMTP sink for trying out email delivery without a real mail server.
+
+Accepts every message and prints a one-line summary (or the whole message
+with --verbose). Point the backend at it with:
+
+    SMTP_HOST=localhost SMTP_PORT=1025 SMTP_STARTTLS=false SMTP_USER= \\
+        uvicorn app.main:app
+
+    python scripts/smtp_sink.py --port 1025
+
+--fail-rate answers a share of messages with a temporary 451 error and
+--reject rejects recipients matching a pattern with a permanent 550, to
+watch the outbox retry and give up. The summary on exit shows how many
+connections carried how many messages (pooled connections carry many).
+
+No dependencies beyond the standard library; no STARTTLS or AUTH.
+"""
+import argparse
+import asyncio
+import fnmatch
+import itertools
+import random
+from email import message_from_bytes
+from email.header import decode_header, make_header
+
+connection_ids = itertools.count(1)
+stats = {"connections": 0, "messages": 0, "temp_failures": 0, "rejected": 0}
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, args) -> None:
+    conn = next(connection_ids)
+    stats["connections"] += 1
+    sent_here = 0
+
+    async def reply(line: str) -> None:
+        writer.write((line + "\r\n").encode())
+        await writer.drain()
+
+    await reply("220 smtp-sink ready")
+    sender, recipients = None, []
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                await reply("250 smtp-sink" if verb == "HELO" else "250-smtp-sink\r\n250 8BITMIME")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(), []
+                await reply("250 OK")
+            elif verb == "RCPT":
+                recipient = command[8:].strip().strip("<>")
+                if args.reject and fnmatch.fnmatch(recipient, args.reject):
+                    stats["rejected"] += 1
+                    await reply("550 Mailbox unavailable")
+                else:
+                    recipients.append(recipient)
+                    await reply("250 OK")
+            elif verb == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = await reader.readline()
+                    if data in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                if random.random() < args.fail_rate:
+                    stats["temp_failures"] += 1
+                    await reply("451 Temporary failure, try again later")
+                    continue
+                sent_here += 1
+                stats["messages"] += 1
+                raw = b"".join(lines)
+                message = message_from_bytes(raw)
+                subject = str(make_header(decode_header(message.get("Subject", ""))))
+                print(f"📨 [conn {conn} #{sent_here}] {sender} -> {', '.join(recipients)}: {subject}")
+                if args.verbose:
+                    print(raw.decode(errors="replace"))
+                await reply("250 OK: queued")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                await reply("250 OK")
+            elif verb == "NOOP":
+                await reply("250 OK")
+            elif verb == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+    finally:
+        writer.close()
+        print(f"   connection {conn} closed after {sent_here} message(s)")
+
+
+async def serve(args) -> None:
+    server = await asyncio.start_server(lambda r, w: handle(r, w, args), args.host, args.port)
+    print(f"📬 SMTP sink listening on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of messages answered with 451")
+    parser.add_argument("--reject", default="", help="recipient pattern answered with 550, e.g. '*@bounce.test'")
+    parser.add_argument("--verbose", action="store_true", help="print whole messages")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    print(f"\n✅ {stats['messages']} message(s) over {stats['connections']} connection(s); "
+          f"{stats['temp_failures']} temporary failure(s), {stats['rejected']} rejected recipient(s)")
+
+
+if __name__ == "__main__":
+    main()
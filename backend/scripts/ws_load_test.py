@@ -0,0 +1,523 @@
+"""Load test for collaborative editing rooms (/ws/docs/{document_id}).
+
+Starts N simulated editors spread over M rooms against a running server,
+drives edits and cursor moves at the given rates, and reports:
+
+- end-to-end broadcast latency (sender -> every other member) percentiles
+- edit loss: deliveries missing against the members present at send time
+- ack round trips, resyncs, disconnects
+- server CPU and memory (with --server-pid) and the server's /ws/metrics
+
+The report is JSON so runs can be compared between releases:
+
+    python scripts/ws_load_test.py --email load@example.com --password secret \\
+        --clients 200 --rooms 20 --duration 60 --server-pid $(pgrep -f "uvicorn app.main") \\
+        --output report-1.json
+    python scripts/ws_load_test.py ... --output report-2.json --compare report-1.json
+
+Edit and cursor timings come from a seeded generator, so runs with the same
+arguments send the same schedule. Run the generator on a different machine
+than the server (or watch its own CPU in the report) so it is not the
+bottleneck.
+
+Requires the websockets package; psutil is used for process stats when
+installed, /proc otherwise.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import requests
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+REPORT_VERSION = 1
+ROOM_TEXT = "Load test document.\n" * 20
+
+
+def percentiles(values: List[float]) -> dict:
+    """p50/p90/p99/max/mean of latencies in milliseconds."""
+    if not values:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None, "mean": None}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+        "mean": round(sum(ordered) / len(ordered), 3),
+    }
+
+
+class Stats:
+    """Counters shared by all simulated clients."""
+
+    def __init__(self):
+        self.measuring = False
+        # probe -> number of other members present when it was sent
+        self.edit_expected: Dict[str, int] = {}
+        self.edit_delivered: Dict[str, int] = {}
+        self.edit_latency: List[float] = []
+        self.ack_latency: List[float] = []
+        self.cursor_sent = 0
+        self.cursor_expected = 0
+        self.cursor_delivered = 0
+        self.cursor_latency: List[float] = []
+        self.edits_deferred = 0
+        self.resyncs = 0
+        self.rejected = 0
+        self.disconnects = 0
+        self.connect_failures = 0
+        self.connected = 0
+
+
+class SimClient:
+    """One simulated editor speaking the ops protocol."""
+
+    def __init__(self, index: int, room: int, url: str, args, stats: Stats, rooms: Dict[int, set]):
+        self.index = index
+        self.room = room
+        self.url = url
+        self.args = args
+        self.stats = stats
+        self.rooms = rooms
+        self.name = f"load-{index}"
+        self.rng = random.Random(args.seed * 100003 + index)
+        self.seq = 0
+        self.awaiting: Optional[float] = None  # send time of the unacknowledged edit
+        self.inserted = False
+        self.probes = 0
+        self.ready = asyncio.Event()
+        self.ws = None
+
+    def _encode(self, message: dict):
+        if self.args.encoding == "msgpack":
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message, separators=(",", ":"))
+
+    def _decode(self, data):
+        if isinstance(data, bytes):
+            return msgpack.unpackb(data, raw=False)
+        return json.loads(data)
+
+    async def run(self, start: asyncio.Event, stop_at: List[float]):
+        subprotocols = ["rnd.msgpack"] if self.args.encoding == "msgpack" else ["rnd.json"]
+        try:
+            self.ws = await websockets.connect(self.url, subprotocols=subprotocols, max_size=None,
+                                               open_timeout=self.args.connect_timeout)
+        except Exception as e:
+            self.stats.connect_failures += 1
+            if self.args.verbose:
+                print(f"[{self.name}] connect failed: {e}")
+            return
+        reader = asyncio.create_task(self._read())
+        try:
+            await asyncio.wait_for(self.ready.wait(), self.args.connect_timeout)
+            self.rooms[self.room].add(self.index)
+            self.stats.connected += 1
+            await start.wait()
+            await self._drive(stop_at[0])
+            # Let in-flight broadcasts arrive before leaving
+            await asyncio.sleep(self.args.drain)
+        except (asyncio.TimeoutError, websockets.ConnectionClosed):
+            pass
+        finally:
+            self.rooms[self.room].discard(self.index)
+            reader.cancel()
+            await self.ws.close()
+
+    async def _drive(self, stop_at: float):
+        edit_rate, cursor_rate = self.args.edit_rate, self.args.cursor_rate
+        total_rate = edit_rate + cursor_rate
+        if total_rate <= 0:
+            await asyncio.sleep(max(0.0, stop_at - time.perf_counter()))
+            return
+        while True:
+            # Poisson arrivals from a seeded generator: same schedule every run
+            await asyncio.sleep(self.rng.expovariate(total_rate))
+            if time.perf_counter() >= stop_at:
+                return
+            if self.rng.random() * total_rate < edit_rate:
+                await self._send_edit()
+            else:
+                await self._send_cursor()
+
+    def _probe(self) -> dict:
+        self.probes += 1
+        return {"name": self.name, "probe": f"{self.index}:{self.probes}", "t": time.perf_counter()}
+
+    def _peers(self) -> int:
+        return len(self.rooms[self.room]) - 1
+
+    async def _send_edit(self):
+        if self.awaiting is not None:
+            # The ops protocol allows one unacknowledged edit per client
+            self.stats.edits_deferred += 1
+            return
+        # Alternate inserting and deleting so documents stay the same size
+        ops = [-1] if self.inserted else ["x"]
+        self.inserted = not self.inserted
+        user = self._probe()
+        if self.stats.measuring:
+            self.stats.edit_expected[user["probe"]] = self._peers()
+        self.awaiting = user["t"]
+        await self.ws.send(self._encode({"type": "op", "base_seq": self.seq, "ops": ops, "user": user}))
+
+    async def _send_cursor(self):
+        user = self._probe()
+        if self.stats.measuring:
+            self.stats.cursor_sent += 1
+            self.stats.cursor_expected += self._peers()
+        await self.ws.send(self._encode({
+            "type": "cursor",
+            "x": round(self.rng.random() * 100, 2),
+            "y": round(self.rng.random() * 100, 2),
+            "user": user,
+        }))
+
+    async def _read(self):
+        stats = self.stats
+        try:
+            async for data in self.ws:
+                now = time.perf_counter()
+                message = self._decode(data)
+                kind = message.get("type")
+                if kind in ("sync", "catchup"):
+                    if self.ready.is_set():
+                        stats.resyncs += 1
+                    if message.get("error"):
+                        stats.rejected += 1
+                        self.awaiting = None
+                    self.seq = message["seq"]
+                    self.ready.set()
+                elif kind == "ack":
+                    self.seq = message["seq"]
+                    if self.awaiting is not None and stats.measuring:
+                        stats.ack_latency.append((now - self.awaiting) * 1000)
+                    self.awaiting = None
+                elif kind == "op":
+                    self.seq = message["seq"]
+                    self._delivered(message.get("user"), now, edit=True)
+                elif kind == "cursor":
+                    self._delivered(message.get("user"), now, edit=False)
+                elif kind == "ping":
+                    await self.ws.send(self._encode({"type": "pong"}))
+        except websockets.ConnectionClosed:
+            stats.disconnects += 1
+
+    def _delivered(self, user: Optional[dict], now: float, edit: bool):
+        if not user or "probe" not in user:
+            return
+        stats = self.stats
+        latency = (now - user["t"]) * 1000
+        if edit:
+            if user["probe"] in stats.edit_expected:
+                stats.edit_delivered[user["probe"]] = stats.edit_delivered.get(user["probe"], 0) + 1
+                stats.edit_latency.append(latency)
+        elif stats.measuring:
+            stats.cursor_delivered += 1
+            stats.cursor_latency.append(latency)
+
+
+class ProcessSampler:
+    """Samples CPU % and RSS of a process once per second."""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.cpu: List[float] = []
+        self.rss_mb: List[float] = []
+        self._process = psutil.Process(pid) if (psutil and pid) else None
+        self._last = None
+
+    def _read_proc(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = int(fields[11]) + int(fields[12])  # utime + stime
+        with open(f"/proc/{self.pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        return ticks / os.sysconf("SC_CLK_TCK"), rss_kb / 1024
+
+    def sample(self):
+        if not self.pid:
+            return
+        try:
+            if self._process is not None:
+                self.cpu.append(self._process.cpu_percent(None))
+                self.rss_mb.append(self._process.memory_info().rss / 1024 / 1024)
+                return
+            cpu_seconds, rss = self._read_proc()
+            now = time.perf_counter()
+            if self._last is not None:
+                self.cpu.append((cpu_seconds - self._last[0]) / (now - self._last[1]) * 100)
+            self._last = (cpu_seconds, now)
+            self.rss_mb.append(rss)
+        except (OSError, StopIteration, ValueError) as e:
+            print(f"[WARN] Cannot sample process {self.pid}: {e}")
+            self.pid = None
+
+    def report(self) -> dict:
+        def summary(values):
+            return {"mean": round(sum(values) / len(values), 2), "max": round(max(values), 2)} if values else None
+        return {"pid": self.pid, "cpu_pct": summary(self.cpu), "rss_mb": summary(self.rss_mb)}
+
+
+def fetch_metrics(base_url: str, token: Optional[str]) -> Optional[dict]:
+    try:
+        response = requests.get(f"{base_url}/ws/metrics", headers={"X-Metrics-Token": token or ""}, timeout=5)
+        return response.json() if response.ok else None
+    except requests.RequestException:
+        return None
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    response = requests.post(f"{base_url}/auth/login", data={"username": email, "password": password}, timeout=30)
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def create_rooms(base_url: str, token: str, count: int) -> List[int]:
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = []
+    for i in range(count):
+        response = requests.post(f"{base_url}/documents", headers=headers, timeout=30,
+                                 json={"title": f"Load test room {i + 1}", "content": ROOM_TEXT})
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    return ids
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_load(args, token: str, document_ids: List[int]) -> dict:
+    stats = Stats()
+    rooms: Dict[int, set] = {room: set() for room in range(len(document_ids))}
+    ws_base = args.url.replace("http://", "ws://").replace("https://", "wss://")
+    clients = [
+        SimClient(i, i % len(document_ids),
+                  f"{ws_base}/ws/docs/{document_ids[i % len(document_ids)]}?token={token}&protocol=ops",
+                  args, stats, rooms)
+        for i in range(args.clients)
+    ]
+
+    server = ProcessSampler(args.server_pid)
+    start = asyncio.Event()
+    stop_at = [0.0]
+    tasks = []
+    for i, client in enumerate(clients):
+        tasks.append(asyncio.create_task(client.run(start, stop_at)))
+        if args.connect_rate and i % args.connect_rate == args.connect_rate - 1:
+            await asyncio.sleep(1)
+    # Wait until every client has connected or failed
+    deadline = time.perf_counter() + args.connect_timeout
+    while stats.connected + stats.connect_failures < args.clients and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+    print(f"Connected {stats.connected}/{args.clients} clients in {len(document_ids)} rooms")
+
+    metrics_before = fetch_metrics(args.url, args.metrics_token)
+    cpu_start = os.times()
+    stop_at[0] = time.perf_counter() + args.warmup + args.duration
+    start.set()
+    await asyncio.sleep(args.warmup)
+    stats.measuring = True
+    measure_start = time.perf_counter()
+
+    queue_depth_max = 0
+    server.sample()
+    while time.perf_counter() < stop_at[0]:
+        await asyncio.sleep(1)
+        server.sample()
+        live = fetch_metrics(args.url, args.metrics_token) if args.poll_metrics else None
+        if live:
+            queue_depth_max = max(queue_depth_max, live.get("queue_depth", {}).get("max", 0))
+    stats.measuring = False
+    measured = time.perf_counter() - measure_start
+    await asyncio.gather(*tasks, return_exceptions=True)
+    cpu_end = os.times()
+    metrics_after = fetch_metrics(args.url, args.metrics_token)
+
+    expected = sum(stats.edit_expected.values())
+    delivered = sum(min(stats.edit_delivered.get(p, 0), n) for p, n in stats.edit_expected.items())
+    client_cpu = (cpu_end.user + cpu_end.system - cpu_start.user - cpu_start.system) / measured * 100
+
+    return {
+        "clients_connected": stats.connected,
+        "connect_failures": stats.connect_failures,
+        "measured_seconds": round(measured, 2),
+        "edits": {
+            "sent": len(stats.edit_expected),
+            "sent_per_second": round(len(stats.edit_expected) / measured, 2),
+            "expected_deliveries": expected,
+            "delivered": delivered,
+            "loss_pct": round((1 - delivered / expected) * 100, 4) if expected else 0.0,
+            "latency_ms": percentiles(stats.edit_latency),
+            "ack_latency_ms": percentiles(stats.ack_latency),
+            "deferred_awaiting_ack": stats.edits_deferred,
+            "rejected": stats.rejected,
+        },
+        "cursors": {
+            "sent": stats.cursor_sent,
+            "expected_deliveries": stats.cursor_expected,
+            "delivered": stats.cursor_delivered,
+            # Below 1 by design: the server coalesces cursor moves per tick
+            "delivery_ratio": round(stats.cursor_delivered / stats.cursor_expected, 4) if stats.cursor_expected else None,
+            "latency_ms": percentiles(stats.cursor_latency),
+        },
+        "resyncs": stats.resyncs,
+        "disconnects": stats.disconnects,
+        "server": {
+            **server.report(),
+            "queue_depth_max": queue_depth_max if args.poll_metrics else None,
+            "metrics_before": metrics_before,
+            "metrics_after": metrics_after,
+        },
+        "generator_cpu_pct": round(client_cpu, 2),
+    }
+
+
+def flatten(data, prefix=""):
+    items = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in ("metrics_before", "metrics_after", "pid"):
+                continue
+            items.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        items[prefix[:-1]] = data
+    return items
+
+
+def compare(previous: dict, current: dict):
+    """Print the numeric results of two reports side by side."""
+    old, new = flatten(previous["results"]), flatten(current["results"])
+    print(f"\n{'metric':45} {'previous':>12} {'current':>12} {'change':>9}")
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        change = f"{(b - a) / a * 100:+.1f}%" if a not in (None, 0) and b is not None else ""
+        print(f"{key:45} {str(a):>12} {str(b):>12} {change:>9}")
+    if previous.get("config") != current.get("config"):
+        print("\n⚠️  The runs used different settings; compare with care.")
+
+
+def print_summary(results: dict):
+    edits, cursors, server = results["edits"], results["cursors"], results["server"]
+    latency = edits["latency_ms"]
+    print(f"\nEdits: {edits['sent']} sent ({edits['sent_per_second']}/s), "
+          f"{edits['delivered']}/{edits['expected_deliveries']} delivered, loss {edits['loss_pct']}%")
+    print(f"  broadcast latency ms: p50 {latency['p50']}  p90 {latency['p90']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"  ack round trip ms:    p50 {edits['ack_latency_ms']['p50']}  p99 {edits['ack_latency_ms']['p99']}")
+    print(f"Cursors: {cursors['sent']} sent, delivery ratio {cursors['delivery_ratio']}, "
+          f"p99 {cursors['latency_ms']['p99']} ms")
+    print(f"Resyncs {results['resyncs']}, disconnects {results['disconnects']}, "
+          f"connect failures {results['connect_failures']}")
+    if server.get("cpu_pct"):
+        print(f"Server CPU % mean {server['cpu_pct']['mean']} max {server['cpu_pct']['max']}, "
+              f"RSS MB mean {server['rss_mb']['mean']} max {server['rss_mb']['max']}")
+    print(f"Generator CPU % {results['generator_cpu_pct']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test collaborative editing rooms")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--token", help="JWT to connect with (or use --email/--password)")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--documents", help="Comma-separated document IDs to use as rooms (default: create them)")
+    parser.add_argument("--clients", type=int, default=50, help="Simulated editors")
+    parser.add_argument("--rooms", type=int, default=5, help="Rooms to create when --documents is not given")
+    parser.add_argument("--edit-rate", type=float, default=2.0, help="Edits per second per client")
+    parser.add_argument("--cursor-rate", type=float, default=10.0, help="Cursor moves per second per client")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait for in-flight messages")
+    parser.add_argument("--connect-rate", type=int, default=100, help="New connections per second (0: all at once)")
+    parser.add_argument("--connect-timeout", type=float, default=15.0)
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-pid", type=int, help="Server process to sample CPU and memory of")
+    parser.add_argument("--metrics-token", help="X-Metrics-Token for /ws/metrics")
+    parser.add_argument("--poll-metrics", action="store_true", help="Poll /ws/metrics every second for queue depth")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if websockets is None:
+        sys.exit("❌ This tool needs the websockets package: pip install websockets")
+    if args.encoding == "msgpack" and msgpack is None:
+        sys.exit("❌ --encoding msgpack needs the msgpack package")
+
+    token = args.token
+    if not token:
+        if not (args.email and args.password):
+            sys.exit("❌ Give --token or --email and --password")
+        token = login(args.url, args.email, args.password)
+    if args.documents:
+        document_ids = [int(d) for d in args.documents.split(",")]
+    else:
+        document_ids = create_rooms(args.url, token, args.rooms)
+        print(f"✓ Created {len(document_ids)} rooms: {document_ids}")
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("token", "password", "output", "compare", "server_pid", "metrics_token", "verbose",
+                             "documents")}
+    config["rooms"] = len(document_ids)
+    started_at = datetime.now(timezone.utc).isoformat()
+    results = asyncio.run(run_load(args, token, document_ids))
+
+    report = {
+        "version": REPORT_VERSION,
+        "started_at": started_at,
+        "config": config,
+        "environment": {
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "host": socket.gethostname(),
+        },
+        "results": results,
+    }
+    print_summary(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Shared fixtures: the app on a throwaway SQLite database, with one company and user.
+
+DATABASE_URL is set before anything from ``app`` is imported, since the
+engines are created at import time.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="rnd-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.pop("DATABASE_REPLICA_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+# Emails queued by the routes must not leave the machine: nothing listens here
+os.environ["SMTP_HOST"] = "127.0.0.1"
+os.environ["SMTP_PORT"] = "9"
+os.environ["SMTP_STARTTLS"] = "false"
+
+from fastapi.testclient import TestClient
+
+from app.api.deps import decode_token, resolve_principal
+from app.core.database import SessionLocal
+from app.core.security import create_access_token, get_password_hash, user_token_claims
+from app.main import app
+from app.models.company import CompanyEx
+from app.models.user import UserEx
+
+COMPANY_ID = "test-company"
+USER_EMAIL = "owner@example.com"
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        db = SessionLocal()
+        db.add(CompanyEx(
+            id=COMPANY_ID, name="Acme", ceo="Kim", address="Seoul",
+            sector="IT/Software", founded_date="2018-01-01"
+        ))
+        db.add(UserEx(
+            email=USER_EMAIL, hashed_password=get_password_hash("password"),
+            full_name="Owner", company_id=COMPANY_ID, email_verified="true"
+        ))
+        db.commit()
+        db.close()
+        yield client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    db = SessionLocal()
+    try:
+        user = db.query(UserEx).filter(UserEx.email == USER_EMAIL).one()
+        token = create_access_token(user_token_claims(user))
+        # Warm the principal cache, as any earlier request would have
+        resolve_principal(decode_token(token), db)
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
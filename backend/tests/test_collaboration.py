@@ -0,0 +1,148 @@
+"""Collaborative editing rooms (ConnectionManager) driven by in-memory websockets."""
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.websocket import ConnectionManager
+from app.core.config import settings
+from app.models.document import DocumentEx
+from app.services.backplane import InProcessBackplane, LocalBroker
+from app.services.document_service import set_document_content
+
+from conftest import COMPANY_ID
+
+
+class FakeWebSocket:
+    """The parts of a Starlette WebSocket the manager uses; records what it is sent."""
+
+    def __init__(self):
+        self.scope = {"subprotocols": []}
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def send_bytes(self, data):
+        raise AssertionError("JSON client was sent a binary frame")
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+    def of_type(self, *kinds):
+        return [message for message in self.sent if message["type"] in kinds]
+
+
+async def settle(seconds=0.1):
+    """Let backplane deliveries, coalescing ticks and sender tasks run."""
+    for _ in range(5):
+        await asyncio.sleep(seconds / 5)
+
+
+@pytest.fixture
+def document(client, db):
+    doc = DocumentEx(title="Shared", company_id=COMPANY_ID, created_at="2024-01-01T00:00:00", revision=1)
+    set_document_content(doc, "hello world")
+    db.add(doc)
+    db.commit()
+    return str(doc.id)
+
+
+def test_only_client_message_types_are_relayed(document):
+    async def scenario():
+        manager = ConnectionManager(InProcessBackplane(batch_window=0))
+        sender, peer = FakeWebSocket(), FakeWebSocket()
+        assert await manager.connect(sender, document, {"email": "a@example.com"})
+        assert await manager.connect(peer, document, {"email": "b@example.com"})
+        await settle()
+        peer.sent.clear()
+
+        for kind in ("sync", "ack", "catchup", "ping", None):
+            manager.handle_message(document, sender, {"type": kind, "seq": 99, "content": "forged"})
+        manager.handle_message(document, sender, {"type": "chat", "text": "hi"})
+        manager.handle_message(document, sender, {"type": "cursor", "index": 3})
+        await settle()
+
+        assert [message["type"] for message in peer.sent] == ["chat", "cursor"]
+        await manager.shutdown()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def two_workers(monkeypatch):
+    """Factory of two managers linked by one LocalBroker, as two workers on a shared backplane."""
+    monkeypatch.setattr(settings, "WS_BACKPLANE_SNAPSHOT_TIMEOUT", 0.05)
+
+    def make():
+        broker = LocalBroker()
+        return (
+            ConnectionManager(InProcessBackplane(broker, batch_window=0)),
+            ConnectionManager(InProcessBackplane(broker, batch_window=0)),
+        )
+    return make
+
+
+def test_room_snapshot_is_handed_to_the_second_worker(document, two_workers, monkeypatch):
+    async def scenario():
+        first, second = two_workers()
+        editor = FakeWebSocket()
+        assert await first.connect(editor, document, {"email": "a@example.com"}, protocol="ops")
+        await settle()
+        first.handle_message(document, editor, {"type": "op", "base_seq": 0, "ops": [5, ","]})
+        await settle()
+        assert first.documents[document].text == "hello, world"
+
+        # The edit is not saved yet: the second worker must get it from the first, not the database
+        def no_database(document_id):
+            raise AssertionError("room loaded from the database despite a live peer")
+        monkeypatch.setattr("app.api.v1.websocket.load_document_state", no_database)
+        joiner = FakeWebSocket()
+        assert await second.connect(joiner, document, {"email": "b@example.com"}, protocol="ops")
+        await settle()
+
+        state = second.documents[document]
+        assert (state.text, state.seq, state.session) == ("hello, world", 1, first.documents[document].session)
+        assert joiner.of_type("sync")[0]["content"] == "hello, world"
+        await first.shutdown()
+        await second.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_edits_apply_in_the_same_order_on_both_workers(document, two_workers):
+    async def scenario():
+        first, second = two_workers()
+        a, b, viewer = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        assert await first.connect(a, document, {"email": "a@example.com"}, protocol="ops")
+        await settle()
+        assert await second.connect(b, document, {"email": "b@example.com"}, protocol="ops")
+        assert await second.connect(viewer, document, {"email": "c@example.com"})
+        await settle()
+
+        # Concurrent edits, each based on the text its sender last saw
+        for i in range(5):
+            first.handle_message(document, a, {"type": "op", "base_seq": 0, "ops": [f"a{i}"]})
+            second.handle_message(document, b, {"type": "op", "base_seq": 0, "ops": [11, f"b{i}"]})
+        await settle(0.3)
+
+        one, two = first.documents[document], second.documents[document]
+        assert one.seq == two.seq == 10
+        assert one.text == two.text
+        assert all(f"a{i}" in one.text and f"b{i}" in one.text for i in range(5))
+        assert one.ops_since(0) == two.ops_since(0)
+
+        # Each client sees every edit exactly once, in sequence order
+        for websocket in (a, b):
+            seqs = sorted(m["seq"] for m in websocket.of_type("op", "ack"))
+            assert seqs == list(range(1, 11))
+            assert [m["seq"] for m in websocket.of_type("op", "ack")] == seqs
+        assert viewer.of_type("content")[-1]["content"] == two.text
+        await first.shutdown()
+        await second.shutdown()
+
+    asyncio.run(scenario())
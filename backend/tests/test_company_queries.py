@@ -0,0 +1,36 @@
+"""Company reads load financials and projects in a fixed number of queries."""
+from app.core.query_stats import query_budget
+from app.models.company import FinancialEx, ProjectHistoryEx
+
+from conftest import COMPANY_ID
+
+
+def _query_counts(client, headers, path, times=1):
+    with query_budget(100) as seen:
+        for _ in range(times):
+            assert client.get(path, headers=headers).status_code == 200
+    return [stats.count for stats in seen]
+
+
+def _add_history(db):
+    for year in (2021, 2023, 2020, 2022):
+        db.add(FinancialEx(company_id=COMPANY_ID, year=year, revenue=year - 2000, operating_profit=1, debt_ratio=50))
+    for result in ("성공", "실패", "성공"):
+        db.add(ProjectHistoryEx(company_id=COMPANY_ID, title="Project", result=result))
+    db.commit()
+
+
+def test_company_reads_cost_the_same_with_more_history(client, auth_headers, db):
+    before = _query_counts(client, auth_headers, "/companies/me")
+    _add_history(db)
+    after = _query_counts(client, auth_headers, "/companies/me", times=2)
+    # Principal from the cache, the company, then financials and projects in one query each
+    assert before == after[:1] == after[1:] == [3]
+
+    years = [f["year"] for f in client.get("/companies/me", headers=auth_headers).json()["financials"]]
+    assert years[:4] == [2023, 2022, 2021, 2020]
+
+
+def test_recommendations_query_count(client, auth_headers):
+    assert _query_counts(client, auth_headers, "/recommendations", times=2) == [4, 4]
+
@@ -0,0 +1,59 @@
+"""Incremental document saves (PATCH /documents/{id})."""
+import pytest
+
+from app.services.text_delta import unified_diff
+
+ORIGINAL = "첫 줄\n둘째 줄\n셋째 줄\n"
+
+
+@pytest.fixture
+def document(client, auth_headers):
+    response = client.post("/documents", json={"title": "초안", "content": ORIGINAL}, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _patch(client, auth_headers, document, **body):
+    return client.patch(f"/documents/{document['id']}", json=body, headers=auth_headers)
+
+
+def _content(client, auth_headers, document):
+    return client.get(f"/documents/{document['id']}", headers=auth_headers).json()["content"]
+
+
+def test_ops_and_diff_apply_to_the_current_revision(client, auth_headers, document):
+    response = _patch(client, auth_headers, document, base_revision=1, ops=[3, " (수정)"])
+    assert response.status_code == 200
+    assert response.json()["revision"] == 2
+    assert _content(client, auth_headers, document) == "첫 줄 (수정)\n둘째 줄\n셋째 줄\n"
+
+    edited = "첫 줄 (수정)\n둘째 줄\n넷째 줄\n"
+    diff = unified_diff("첫 줄 (수정)\n둘째 줄\n셋째 줄\n", edited)
+    response = _patch(client, auth_headers, document, base_revision=2, diff=diff)
+    assert response.status_code == 200
+    assert response.json() == {"id": document["id"], "revision": 3, "size": len(edited)}
+    assert _content(client, auth_headers, document) == edited
+
+
+def test_stale_base_revision_is_a_conflict(client, auth_headers, document):
+    assert _patch(client, auth_headers, document, base_revision=1, ops=["머리말\n"]).status_code == 200
+
+    response = _patch(client, auth_headers, document, base_revision=1, ops=[-3, "1"])
+    assert response.status_code == 409
+    assert response.headers["X-Document-Revision"] == "2"
+    assert _content(client, auth_headers, document) == "머리말\n" + ORIGINAL
+
+
+@pytest.mark.parametrize("body", [
+    {"ops": [len(ORIGINAL) + 1]},
+    {"ops": [3, -100]},
+    {"ops": [0]},
+    {"diff": unified_diff("다른 글\n", "바뀐 글\n")},
+    {"diff": "@@ not a hunk @@\n"},
+    {"diff": "no hunks at all\n"},
+])
+def test_patch_that_does_not_apply_is_a_bad_request(client, auth_headers, document, body):
+    response = _patch(client, auth_headers, document, base_revision=1, **body)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Patch does not apply to revision 1")
+    assert _content(client, auth_headers, document) == ORIGINAL
@@ -0,0 +1,165 @@
+"""Outbox delivery against the in-process SMTP sink of scripts/smtp_sink.py."""
+import argparse
+import asyncio
+import smtplib
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.email_outbox import EmailOutboxEx
+from app.services.email_outbox import EmailOutbox, is_permanent, retry_delay
+from app.services.email_service import EmailService
+from scripts import smtp_sink
+
+
+@pytest.fixture
+def sink():
+    """The SMTP sink on a free local port, served from its own thread."""
+    for key in smtp_sink.stats:
+        smtp_sink.stats[key] = 0
+    args = argparse.Namespace(fail_rate=0.0, reject="", verbose=False)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        asyncio.start_server(lambda r, w: smtp_sink.handle(r, w, args), "127.0.0.1", 0)
+    )
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    args.port = server.sockets[0].getsockname()[1]
+    yield args
+    loop.call_soon_threadsafe(server.close)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def outbox_db(tmp_path):
+    """Session factory on a database of its own, out of reach of the app's running sender."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    EmailOutboxEx.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def service(sink):
+    service = EmailService()
+    service.smtp_host, service.smtp_port = "127.0.0.1", sink.port
+    service.smtp_user = service.smtp_password = ""
+    return service
+
+
+def _queue(session_factory, service, *recipients):
+    db = session_factory()
+    try:
+        service.queue_emails(db, [(to, "Subject", "<p>Hello</p>", "Hello") for to in recipients])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _deliver(service, session_factory, rounds=1):
+    async def run():
+        outbox = EmailOutbox(service, session_factory)
+        # Start the pool and executor without the polling task
+        outbox.start()
+        outbox._task.cancel()
+        outbox._task = None
+        try:
+            return [await outbox.deliver_due() for _ in range(rounds)]
+        finally:
+            await outbox.stop()
+    return asyncio.run(run())
+
+
+def _rows(session_factory):
+    db = session_factory()
+    try:
+        return db.query(EmailOutboxEx).order_by(EmailOutboxEx.id).all()
+    finally:
+        db.close()
+
+
+def test_queued_message_is_sent(service, outbox_db):
+    _queue(outbox_db, service, "to@example.com")
+    assert _deliver(service, outbox_db) == [1]
+    [row] = _rows(outbox_db)
+    assert (row.status, row.attempts, row.claim_token, row.last_error) == ("Sent", 1, None, None)
+    assert row.sent_at is not None
+    assert smtp_sink.stats["messages"] == 1
+
+
+def test_pooled_connection_is_reused(service, outbox_db, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_SMTP_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 3)
+    _queue(outbox_db, service, *(f"to{i}@example.com" for i in range(5)))
+    assert _deliver(service, outbox_db, rounds=3) == [3, 2, 0]
+    assert {row.status for row in _rows(outbox_db)} == {"Sent"}
+    assert (smtp_sink.stats["messages"], smtp_sink.stats["connections"]) == (5, 1)
+
+
+def test_temporary_failure_is_retried_later(service, outbox_db, sink):
+    sink.fail_rate = 1.0
+    _queue(outbox_db, service, "to@example.com")
+    before = datetime.utcnow()
+    _deliver(service, outbox_db)
+    [row] = _rows(outbox_db)
+    assert (row.status, row.attempts) == ("Pending", 1)
+    assert "451" in row.last_error
+    delay = (row.next_attempt_at - before).total_seconds()
+    assert settings.EMAIL_RETRY_BASE_DELAY * 0.8 <= delay <= settings.EMAIL_RETRY_BASE_DELAY * 1.2 + 5
+    # Not due yet: the next round leaves it alone
+    assert _deliver(service, outbox_db) == [0]
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr("app.services.email_outbox.random.uniform", lambda low, high: 1.0)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_DELAY", 30.0)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_MAX_DELAY", 200.0)
+    assert [retry_delay(attempts) for attempts in range(1, 6)] == [30.0, 60.0, 120.0, 200.0, 200.0]
+
+
+def test_rejected_recipient_fails_at_once(service, outbox_db, sink):
+    sink.reject = "*@bounce.test"
+    _queue(outbox_db, service, "nobody@bounce.test", "to@example.com")
+    _deliver(service, outbox_db)
+    bounced, delivered = _rows(outbox_db)
+    assert (bounced.status, bounced.attempts) == ("Failed", 1)
+    assert "550" in bounced.last_error
+    # The connection survived the rejection
+    assert delivered.status == "Sent"
+
+
+def test_is_permanent():
+    assert is_permanent(smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"no")}))
+    assert is_permanent(smtplib.SMTPDataError(554, b"rejected"))
+    assert not is_permanent(smtplib.SMTPDataError(451, b"try later"))
+    assert not is_permanent(smtplib.SMTPAuthenticationError(535, b"bad credentials"))
+    assert not is_permanent(smtplib.SMTPServerDisconnected())
+
+
+def test_expired_lease_is_reclaimed(service, outbox_db):
+    _queue(outbox_db, service, "to@example.com")
+    first, second = EmailOutbox(service, outbox_db), EmailOutbox(service, outbox_db)
+
+    [claimed] = first._claim()
+    assert claimed.claim_token
+    # Leased to the first sender: nobody else gets it
+    assert second._claim() == []
+
+    # The first sender dies; once its lease runs out the message is claimed again
+    db = outbox_db()
+    db.query(EmailOutboxEx).update({EmailOutboxEx.next_attempt_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+    [reclaimed] = second._claim()
+    assert reclaimed.id == claimed.id and reclaimed.claim_token != claimed.claim_token
+
+    # A late report from the first sender no longer applies
+    first._record([claimed], [None])
+    second._record([reclaimed], [smtplib.SMTPDataError(451, b"try later")])
+    [row] = _rows(outbox_db)
+    assert (row.status, row.attempts) == ("Pending", 1)
@@ -0,0 +1,30 @@
+"""Access to the metrics endpoints."""
+import pytest
+
+from app.core.config import settings
+
+METRICS_PATHS = ["/metrics/db", "/ws/metrics"]
+
+
+@pytest.mark.parametrize("path", METRICS_PATHS)
+def test_metrics_are_closed_without_a_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    monkeypatch.setattr(settings, "DEBUG", False)
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Metrics-Token": ""}).status_code == 403
+
+
+@pytest.mark.parametrize("path", METRICS_PATHS)
+def test_metrics_are_open_in_debug_without_a_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    monkeypatch.setattr(settings, "DEBUG", True)
+    assert client.get(path).status_code == 200
+
+
+@pytest.mark.parametrize("path", METRICS_PATHS)
+def test_metrics_require_the_configured_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "DEBUG", True)
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Metrics-Token": "wrong"}).status_code == 403
+    assert client.get(path, headers={"X-Metrics-Token": "s3cret"}).status_code == 200
@@ -0,0 +1,53 @@
+"""Query budgets of the hot endpoints, checked with query_budget()."""
+import pytest
+from fastapi import Depends
+from sqlalchemy import text
+
+from app.core.database import get_db
+from app.core.query_stats import query_budget, route_template
+from app.main import app
+
+
+def test_company_me_budget(client, auth_headers):
+    with query_budget(3):
+        assert client.get("/companies/me", headers=auth_headers).status_code == 200
+
+
+def test_recommendations_budget(client, auth_headers):
+    with query_budget(4):
+        assert client.get("/recommendations", headers=auth_headers).status_code == 200
+
+
+def test_budget_exceeded_names_the_route(client, auth_headers):
+    with pytest.raises(AssertionError, match=r"GET /companies/me: \d+ queries \(budget 1\)"):
+        with query_budget(1):
+            client.get("/companies/me", headers=auth_headers)
+
+
+def test_repeated_statement_is_reported(client):
+    @app.get("/_test/repeat/{n}")
+    def repeat(n: int, db=Depends(get_db)):
+        for i in range(n):
+            db.execute(text("SELECT :i"), {"i": i})
+        return {}
+
+    try:
+        with pytest.raises(AssertionError, match=r"GET /_test/repeat/\{n\}: ran 4 times \(max 2\)"):
+            with query_budget(10, max_repeats=2):
+                client.get("/_test/repeat/4")
+    finally:
+        app.router.routes.pop()
+
+
+def test_route_template_uses_route_path(client, auth_headers):
+    with query_budget(100) as seen:
+        client.get("/documents/1/revisions/1", headers=auth_headers)
+        client.get("/companies/me", headers=auth_headers)
+    assert [stats.route for stats in seen] == [
+        "GET /documents/{doc_id}/revisions/{revision}",
+        "GET /companies/me",
+    ]
+
+
+def test_route_template_without_route():
+    assert route_template({"type": "http", "method": "GET", "path": "/missing"}) is None
@@ -0,0 +1,37 @@
+"""EXPLAIN checks of the hot queries (migrations/query_plans.py)."""
+from sqlalchemy import select
+
+from app.core.database import engine
+from app.models.user import UserEx
+from migrations.query_plans import _mysql_plan, check_query_plans, explain
+
+
+def test_hot_queries_use_indexes(client):
+    with engine.connect() as conn:
+        assert check_query_plans(conn) == []
+
+
+def test_unindexed_lookup_fails(client):
+    with engine.connect() as conn:
+        ok, plan = explain(conn, select(UserEx.id).where(UserEx.full_name == "Owner"))
+    assert not ok
+    assert "SCAN" in plan
+
+
+class _ExplainRows:
+    """Connection stand-in returning fixed MySQL EXPLAIN rows."""
+
+    def __init__(self, *rows):
+        self.rows = rows
+
+    def execute(self, statement):
+        return [type("Row", (), {"_mapping": row})() for row in self.rows]
+
+
+def test_mysql_plan_requires_a_chosen_index():
+    used = {"table": "team_members", "type": "ref", "possible_keys": "ix_team_members_email", "key": "ix_team_members_email"}
+    unused = {"table": "team_members", "type": "ALL", "possible_keys": "ix_team_members_email", "key": None}
+    none = {"table": "team_members", "type": "ALL", "possible_keys": None, "key": None}
+    assert _mysql_plan(_ExplainRows(used), "SELECT 1")[0]
+    assert not _mysql_plan(_ExplainRows(unused), "SELECT 1")[0]
+    assert not _mysql_plan(_ExplainRows(none), "SELECT 1")[0]
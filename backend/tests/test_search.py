@@ -0,0 +1,128 @@
+"""Pure-Python search backend (InMemorySearchIndex) and the search endpoint."""
+from app.models.company import CompanyEx
+from app.models.document import DocumentEx
+from app.services import search_service
+from app.services.search_service import (
+    InMemorySearchIndex, _CompanyIndex, _query_terms, make_snippet, normalize, tokenize,
+)
+from app.services.document_service import set_document_content
+
+from conftest import COMPANY_ID
+
+
+def _search(index, query, limit=10):
+    terms, snippet_terms = _query_terms(query)
+    return index.search(terms, snippet_terms, limit)
+
+
+def test_korean_words_are_split_into_bigrams():
+    assert list(tokenize(normalize("연구개발을 추진"))) == ["연구개발을", "연구", "구개", "개발", "발을", "추진"]
+    # Short Korean words and other scripts stay whole
+    assert list(tokenize(normalize("AI 개발 Plan"))) == ["ai", "개발", "plan"]
+
+
+def test_korean_query_matches_inside_compounds():
+    index = _CompanyIndex()
+    index.add(1, "사업계획서", None, "올해 연구개발을 확대합니다")
+    index.add(2, "회의록", None, "마케팅 예산 검토")
+
+    assert [hit.document_id for hit in _search(index, "개발")] == [1]
+    assert [hit.document_id for hit in _search(index, "연구개발")] == [1]
+    assert _search(index, "특허") == []
+
+
+def test_bm25_ranks_by_term_frequency_rarity_and_title():
+    index = _CompanyIndex()
+    index.add(1, "Notes", None, "battery cell supplier meeting")
+    index.add(2, "Notes", None, "battery battery supplier")
+    index.add(3, "Battery", None, "supplier roadmap")
+    index.add(4, "Notes", None, "supplier audit schedule")
+
+    # A title match outweighs repeats in the body, which outweigh a single one
+    assert [hit.document_id for hit in _search(index, "battery")] == [3, 2, 1]
+    # Documents matching the rare term rank above those matching only the common one
+    ranked = [hit.document_id for hit in _search(index, "supplier audit")]
+    assert ranked[0] == 4 and sorted(ranked) == [1, 2, 3, 4]
+    scores = [hit.score for hit in _search(index, "supplier audit")]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_updates_and_removals_change_the_results():
+    index = _CompanyIndex()
+    index.add(1, "Draft", None, "hydrogen storage")
+    index.add(1, "Draft", None, "solar panels")
+    assert _search(index, "hydrogen") == []
+    assert [hit.document_id for hit in _search(index, "solar")] == [1]
+
+    index.remove(1)
+    assert _search(index, "solar") == []
+    assert index.total_length == 0 and not index.postings
+
+
+def test_common_terms_are_ranked_from_their_best_documents(monkeypatch):
+    monkeypatch.setattr(search_service, "COMMON_TERM_DOCS", 20)
+    monkeypatch.setattr(search_service, "COMMON_TERM_CANDIDATES", 6)
+    index = _CompanyIndex()
+    for doc_id in range(1, 41):
+        # Documents 1-3 say "report" most often; 40 is the only one with "patent"
+        body = "report " * (5 if doc_id <= 3 else 1) + ("patent" if doc_id == 40 else "filler text")
+        index.add(doc_id, "Doc", None, body)
+
+    assert "report" in index.champions and len(index.champions["report"]) == 6
+    assert {hit.document_id for hit in _search(index, "report", limit=3)} == {1, 2, 3}
+    # A rare term picks the candidates; the common one still adds to the score
+    assert [hit.document_id for hit in _search(index, "report patent")] == [40]
+
+    # Champions follow edits and removals
+    index.add(41, "Doc", None, "report " * 20)
+    assert _search(index, "report", limit=1)[0].document_id == 41
+    index.remove(41)
+    assert 41 not in index._champion_ids["report"]
+    assert {hit.document_id for hit in _search(index, "report", limit=3)} == {1, 2, 3}
+
+    # Falling back under the threshold scores the term in full again
+    for doc_id in range(4, 30):
+        index.remove(doc_id)
+    assert "report" not in index.champions
+    assert len(_search(index, "report", limit=20)) == 14
+
+
+def test_snippet_is_centered_on_the_earliest_term():
+    body = "a" * 100 + " 연구개발 " + "b" * 100
+    snippet = make_snippet(body, ["연구개발"], radius=10)
+    assert snippet.startswith("…") and snippet.endswith("…")
+    assert "연구개발" in snippet and len(snippet) == 22
+
+    assert make_snippet("short text", ["missing"], radius=3) == "short "
+    assert make_snippet("budget plan", ["plan", "budget"]) == "budget plan"
+
+
+def test_index_is_scoped_to_the_company(client, db):
+    db.merge(CompanyEx(id="search-other-company", name="Other"))
+    for company_id, title in ((COMPANY_ID, "Ours"), ("search-other-company", "Theirs")):
+        doc = DocumentEx(title=title, company_id=company_id, created_at="2024-01-01T00:00:00", revision=1)
+        set_document_content(doc, "quantum sensor prototype")
+        db.add(doc)
+    db.commit()
+
+    index = InMemorySearchIndex()
+    assert [hit.title for hit in index.search(db, COMPANY_ID, "quantum", 10)] == ["Ours"]
+    assert [hit.title for hit in index.search(db, "search-other-company", "quantum", 10)] == ["Theirs"]
+    assert index.search(db, "no-such-company", "quantum", 10) == []
+
+
+def test_search_endpoint_returns_only_own_documents(client, db, auth_headers):
+    db.merge(CompanyEx(id="search-other-company", name="Other"))
+    for company_id, title in ((COMPANY_ID, "Lidar calibration"), ("search-other-company", "Lidar secrets")):
+        doc = DocumentEx(title=title, company_id=company_id, created_at="2024-01-02T00:00:00", revision=1)
+        set_document_content(doc, "라이다 보정 절차")
+        db.add(doc)
+        db.flush()
+        search_service.index_document(db, doc)
+    db.commit()
+
+    response = client.get("/documents/search", params={"q": "라이다 보정"}, headers=auth_headers)
+    assert response.status_code == 200
+    hits = response.json()
+    assert [hit["title"] for hit in hits] == ["Lidar calibration"]
+    assert "라이다 보정" in hits[0]["snippet"]
@@ -0,0 +1,51 @@
+"""Team invitations."""
+from app.models.email_outbox import EmailOutboxEx
+from app.models.team import TeamMemberEx
+from app.models.user import UserEx
+
+from conftest import COMPANY_ID
+
+
+def _user(db, email, full_name=None):
+    db.add(UserEx(email=email, hashed_password="x", full_name=full_name, company_id=None, email_verified="true"))
+
+
+def test_bulk_invite_users_without_names(client, auth_headers, db):
+    _user(db, "nameless-new@example.com")
+    _user(db, "nameless-resent@example.com")
+    _user(db, "named@example.com", "Named")
+    db.add(TeamMemberEx(
+        name=None, email="nameless-resent@example.com", role="Member",
+        company_id=COMPANY_ID, status="Pending", invitation_token="resent-token"
+    ))
+    db.commit()
+
+    response = client.post("/team/invite/bulk", headers=auth_headers, json={"invitations": [
+        {"email": "nameless-new@example.com"},
+        {"email": "nameless-resent@example.com"},
+        {"email": "named@example.com"},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["invited"], body["failed"]) == (3, 0)
+    assert [(r["status"], r["member"]["name"]) for r in body["results"]] == [
+        ("invited", "nameless-new@example.com"),
+        ("resent", "nameless-resent@example.com"),
+        ("invited", "Named"),
+    ]
+    emails = ["nameless-new@example.com", "nameless-resent@example.com", "named@example.com"]
+    subjects = [row.subject for row in db.query(EmailOutboxEx).filter(EmailOutboxEx.to_email.in_(emails))]
+    assert len(subjects) == 3 and all(subject.startswith("Owner님이") for subject in subjects)
+
+
+def test_invite_user_without_name(client, auth_headers, db):
+    _user(db, "nameless-single@example.com")
+    db.commit()
+
+    response = client.post("/team/invite", headers=auth_headers, json={
+        "email": "nameless-single@example.com", "name": "Someone", "role": "Member"
+    })
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "nameless-single@example.com"
@@ -0,0 +1,144 @@
+"""Text deltas (text_delta) and revision history rebuilt from them (revision_service)."""
+import pytest
+
+from app.core.config import settings
+from app.models.document import DocumentEx, DocumentRevisionEx
+from app.services.document_service import set_document_content
+from app.services.revision_service import get_revision, record_revision
+from app.services.text_delta import (
+    DeltaError, apply_ops, apply_unified_diff, decode_ops, diff_ops, encode_ops, transform, unified_diff,
+)
+
+from conftest import COMPANY_ID
+
+LONG_HTML = "".join(f"<p>{i}번째 문단: 연구개발 과제의 진행 상황을 정리합니다.</p>" for i in range(40))
+
+ROUND_TRIPS = [
+    ("", ""),
+    ("", "새 문서"),
+    ("지울 내용", ""),
+    ("연구개발 계획서", "연구개발 사업 계획서"),
+    ("가나다라마바사", "가나라마사아"),
+    ("첫 줄\n둘째 줄\n셋째 줄\n", "첫 줄\n둘째 줄 (수정)\n셋째 줄\n넷째 줄"),
+    ("line one\nline two\nline three", "line zero\nline one\nline three\n"),
+    ("😀 이모지와 한글", "😀😀 이모지와 한국어"),
+    # Long enough for the chunked diff of the middle region
+    (LONG_HTML, LONG_HTML.replace("3번째", "셋째").replace("<p>27번째", "<p>추가</p><p>27번째")),
+    (LONG_HTML, "\n".join(LONG_HTML.split("</p>")[::-1])),
+]
+
+
+@pytest.mark.parametrize("old, new", ROUND_TRIPS)
+def test_diff_ops_round_trips(old, new):
+    ops = diff_ops(old, new)
+    assert apply_ops(old, ops) == new
+    assert apply_ops(old, decode_ops(encode_ops(ops))) == new
+
+
+def test_diff_ops_is_minimal_for_a_single_edit():
+    assert diff_ops("연구개발 계획서", "연구개발 사업 계획서") == [5, "사업 "]
+    assert diff_ops("same", "same") == []
+    # Distant edits in long text stay separate instead of one large replace
+    ops = diff_ops(LONG_HTML, LONG_HTML.replace("<p>1번째", "<p>일번째").replace("<p>38번째", "<p>삼팔번째"))
+    assert sum(len(op) for op in ops if isinstance(op, str)) < 200
+
+
+@pytest.mark.parametrize("ops", [[100], [-100], [3, -50], [1.5], [True], [None]])
+def test_apply_ops_rejects_deltas_that_do_not_fit(ops):
+    with pytest.raises(DeltaError):
+        apply_ops("짧은 글", ops)
+
+
+BASE = "연구개발 과제 계획서"
+
+CONCURRENT = [
+    # Inserts at different positions
+    ([2, "사업"], [7, "초안 "]),
+    # Insert and delete elsewhere
+    (["[검토] "], [5, -3]),
+    # Overlapping deletes
+    ([2, -5], [4, -6]),
+    # The same delete on both sides
+    ([5, -3], [5, -3]),
+    # Insert inside a range the other side deletes
+    ([8, "수정"], [5, -5]),
+    # Both replace neighbouring words
+    ([-4, "R&D"], [5, -2, "업무"]),
+]
+
+
+@pytest.mark.parametrize("ops_a, ops_b", CONCURRENT)
+def test_transform_converges_for_concurrent_edits(ops_a, ops_b):
+    # Either side applied first, the other transformed over it: same text
+    a_then_b = apply_ops(apply_ops(BASE, ops_a), transform(ops_b, ops_a, len(BASE)))
+    b_then_a = apply_ops(apply_ops(BASE, ops_b), transform(ops_a, ops_b, len(BASE)))
+    assert a_then_b == b_then_a
+
+
+def test_transform_keeps_the_applied_insert_first_at_the_same_position():
+    first, second = [5, "첫째 "], [5, "둘째 "]
+    text = apply_ops(apply_ops(BASE, first), transform(second, first, len(BASE)))
+    assert text == "연구개발 첫째 둘째 과제 계획서"
+
+
+def test_transform_over_a_chain_of_applied_edits():
+    # A client's edit made on BASE, while the server applied two others in turn
+    applied = [["[초안] "], [5, -4, "R&D"]]
+    ops = [11, " v2"]
+    text, base_length = BASE, len(BASE)
+    for other in applied:
+        ops = transform(ops, other, base_length)
+        text = apply_ops(text, other)
+        base_length = len(text)
+    assert apply_ops(text, ops) == "[초안] R&D 과제 계획서 v2"
+
+
+def test_transform_rejects_deltas_longer_than_the_base():
+    with pytest.raises(DeltaError):
+        transform([len(BASE) + 1], [1, "x"], len(BASE))
+
+
+def test_unified_diff_round_trips():
+    for old, new in ROUND_TRIPS:
+        assert apply_unified_diff(old, unified_diff(old, new)) == new
+
+
+def test_apply_unified_diff_rejects_a_diff_of_other_text():
+    diff = unified_diff("첫 줄\n둘째 줄\n", "첫 줄\n바뀐 줄\n")
+    with pytest.raises(DeltaError):
+        apply_unified_diff("다른 줄\n둘째 줄\n", diff)
+    with pytest.raises(DeltaError):
+        apply_unified_diff("첫 줄\n", "@@ bogus @@\n-첫 줄\n")
+    with pytest.raises(DeltaError):
+        apply_unified_diff("첫 줄\n", "not a diff\n")
+
+
+def test_revisions_are_rebuilt_across_snapshot_intervals(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "DOCUMENT_SNAPSHOT_INTERVAL", 5)
+    doc = DocumentEx(title="이력", company_id=COMPANY_ID, created_at="2024-01-01T00:00:00", revision=1)
+    # Long enough that each delta is smaller than the text, so only the interval snapshots
+    set_document_content(doc, "연구개발 과제의 변경 이력을 확인합니다.\n" * 3)
+    db.add(doc)
+    db.flush()
+    record_revision(db, doc, None)
+    db.commit()
+
+    history = {1: doc.content}
+    for revision in range(2, 14):
+        previous = doc.content
+        set_document_content(doc, previous + f"{revision}번째 판\n")
+        record_revision(db, doc, previous)
+        db.commit()
+        history[revision] = doc.content
+    assert doc.revision == 13
+
+    snapshots = [row.revision for row in db.query(DocumentRevisionEx).filter(
+        DocumentRevisionEx.document_id == doc.id, DocumentRevisionEx.is_snapshot.is_(True),
+    ).order_by(DocumentRevisionEx.revision)]
+    assert snapshots == [1, 6, 11]
+
+    for revision, content in history.items():
+        row, rebuilt = get_revision(db, doc.id, revision)
+        assert row.revision == revision
+        assert rebuilt == content
+    assert get_revision(db, doc.id, 14) is None
@@ -57,6 +57,11 @@ function AcceptInviteContent() {
             });
 
             if (res.ok) {
+                // 소속 회사가 바뀌었으므로 새 토큰으로 교체
+                const data = await res.json();
+                if (data.access_token) {
+                    localStorage.setItem("token", data.access_token);
+                }
                 setAccepted(true);
                 toast.success("초대가 성공적으로 수락되었습니다!");
                 setTimeout(() => {
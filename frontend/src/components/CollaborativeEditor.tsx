@@ -62,7 +62,9 @@ export default function CollaborativeEditor({
         // previous code used: typeof window !== 'undefined' ? `${wsProtocol}//${window.location.hostname}:8000` : ...
         // Let's stick to the previous pattern which seemed to work for connection
         const backendHost = typeof window !== 'undefined' ? `${wsProtocol}//${window.location.hostname}:8000` : 'ws://localhost:8000';
-        const fullWsUrl = `${backendHost}/ws/docs/${documentId}?user_email=${encodeURIComponent(userName)}`;
+        // 서버가 문서 상태를 직접 관리하므로 접속 시 토큰으로 인증
+        const token = typeof window !== 'undefined' ? localStorage.getItem("token") || "" : "";
+        const fullWsUrl = `${backendHost}/ws/docs/${documentId}?token=${encodeURIComponent(token)}`;
 
         const websocket = new WebSocket(fullWsUrl);
 
@@ -80,7 +82,10 @@ export default function CollaborativeEditor({
             try {
                 const message = JSON.parse(event.data);
 
-                if (message.type === "presence") {
+                if (message.type === "ping") {
+                    // 서버 heartbeat에 응답 (응답이 없으면 연결이 정리됨)
+                    websocket.send(JSON.stringify({ type: "pong" }));
+                } else if (message.type === "presence") {
                     if (message.action === "join") {
                         // 새로운 유저가 들어옴 -> 내 목록에 추가
                         if (message.user && message.user.name) {